@@ -0,0 +1,492 @@
+from typing import Dict, List, Optional, Set
+import json
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import threading
+
+import numpy as np
+from .filters import ChunkFilter
+from .quantization import make_quantizer
+from .vector_backend import BaseVectorBackend
+from ..utils.config import config
+
+_BLOCK_ROWS = 65536
+
+
+class LocalANNBackend(BaseVectorBackend):
+    """
+    Memory-mapped vector index with an IVF (inverted file) layer.
+
+    Vectors are L2-normalised and stored row by row in a float16 or float32
+    memmap, so the OS pages them in on demand instead of the process
+    holding the whole corpus. Ids, documents and metadata live in SQLite
+    next to it. Below `config.ANN_TRAIN_MIN` vectors search is exact; above
+    it k-means centroids partition the rows into inverted lists and a query
+    scans only the `nprobe` closest lists. Filtered queries that match few
+    rows are answered exactly over just those rows.
+
+    With `quantization` ("int8" or "pq") the trained index also keeps
+    compact codes for every row. Candidates are ranked on the codes, and
+    only the best `rescore_factor * k` are re-scored against the
+    full-precision vectors, which stay on disk until needed.
+    """
+
+    def __init__(self, path: str, dtype: str = None, nlist: int = None, nprobe: int = None,
+                 quantization: str = None, rescore_factor: int = None):
+        self.path = path
+        self.nlist = nlist or config.ANN_NLIST
+        self.nprobe = nprobe or config.ANN_NPROBE
+        self.quantization = quantization or config.ANN_QUANTIZATION
+        self.rescore_factor = max(1, rescore_factor or config.ANN_RESCORE_FACTOR)
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(path, "rows.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                document TEXT,
+                metadata TEXT,
+                source TEXT,
+                page INTEGER,
+                type TEXT,
+                list_id INTEGER NOT NULL DEFAULT -1
+            );
+            CREATE INDEX IF NOT EXISTS rows_source ON rows(source, page);
+            CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._conn.commit()
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        stored_dtype = meta.get("dtype")
+        self.dtype = np.dtype(stored_dtype or dtype or config.ANN_DTYPE)
+        if stored_dtype and dtype and np.dtype(dtype) != self.dtype:
+            logging.warning(f"ANN index at {path} is stored as {stored_dtype}; ignoring requested {dtype}")
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        self.capacity = int(meta.get("capacity", 0))
+        self.next_row = int(meta.get("next_row", 0))
+        self.trained_on = int(meta.get("trained_on", 0))
+
+        self._vectors: Optional[np.memmap] = None
+        if self.dim:
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim))
+
+        centroids_path = os.path.join(path, "centroids.npy")
+        self._centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+
+        self._quantizer = None
+        self._codes: Optional[np.memmap] = None
+        if self.trained and meta.get("quantization", "none") == self.quantization:
+            self._load_quantizer()
+
+        # Per-row liveness and inverted lists are small and kept in memory
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._row_list = np.full(self.capacity, -1, dtype=np.int32)
+        self._lists: Dict[int, Set[int]] = {}
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        for row, list_id in self._conn.execute("SELECT row, list_id FROM rows"):
+            self._valid[row] = True
+            self._move_to_list(row, list_id)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.bin")
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def count(self) -> int:
+        return int(self._valid.sum())
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self._create(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}; "
+                    f"clear the collection before switching embedding models"
+                )
+
+            existing = self._rows_for(ids)
+            rows = []
+            for chunk_id in ids:
+                row = existing.get(chunk_id)
+                if row is None:
+                    row = self._allocate_row()
+                    existing[chunk_id] = row
+                rows.append(row)
+            rows = np.asarray(rows, dtype=np.int64)
+
+            self._ensure_capacity(int(rows.max()) + 1)
+            self._vectors[rows] = vectors.astype(self.dtype)
+            self._vectors.flush()
+            if self._quantizer is not None:
+                self._codes[rows] = self._quantizer.encode(vectors)
+                self._codes.flush()
+            self._valid[rows] = True
+
+            list_ids = self._assign(vectors) if self.trained else np.full(len(rows), -1)
+            for row, list_id in zip(rows.tolist(), list_ids.tolist()):
+                self._move_to_list(row, list_id)
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, chunk_id, document, metadata, source, page, type, list_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row, chunk_id, document, json.dumps(metadata), metadata.get("source"),
+                     metadata.get("page"), metadata.get("type"), list_id)
+                    for row, chunk_id, document, metadata, list_id
+                    in zip(rows.tolist(), ids, documents, metadatas, list_ids.tolist())
+                ]
+            )
+            self._save_meta()
+            self._conn.commit()
+
+            count = self.count()
+            stale_codes = self.trained and self.quantization != "none" and self._quantizer is None
+            if count >= config.ANN_TRAIN_MIN and (not self.trained or stale_codes or count >= 4 * self.trained_on):
+                self.train()
+
+    def train(self) -> None:
+        """(Re)build the IVF centroids with spherical k-means and reassign every row"""
+        with self._lock:
+            live = np.flatnonzero(self._valid)
+            if not len(live):
+                return
+            nlist = max(1, min(self.nlist, int(4 * math.sqrt(len(live)))))
+            logging.info(f"Training IVF index with {nlist} lists on {len(live)} vectors")
+
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(live, size=min(len(live), nlist * 32), replace=False))
+            sample = self._vectors[sample_rows].astype(np.float32)
+            centroids = _kmeans(sample, nlist, rng)
+
+            self._centroids = centroids
+            np.save(os.path.join(self.path, "centroids.npy"), centroids)
+
+            self._quantizer = make_quantizer(self.quantization, self.dim, config.ANN_PQ_SUBVECTORS)
+            self._codes = None
+            if self._quantizer is not None:
+                self._quantizer.train(sample, rng)
+                np.savez(os.path.join(self.path, "quantizer.npz"), **self._quantizer.state())
+                self._codes = self._open_codes("w+")
+            self._lists, self._list_arrays = {}, {}
+            self._row_list[:] = -1
+            updates = []
+            for start in range(0, len(live), _BLOCK_ROWS):
+                block_rows = live[start:start + _BLOCK_ROWS]
+                block = self._vectors[block_rows].astype(np.float32)
+                list_ids = self._assign(block)
+                if self._quantizer is not None:
+                    self._codes[block_rows] = self._quantizer.encode(block)
+                for row, list_id in zip(block_rows.tolist(), list_ids.tolist()):
+                    self._move_to_list(row, list_id)
+                    updates.append((list_id, row))
+            self._conn.executemany("UPDATE rows SET list_id = ? WHERE row = ?", updates)
+            if self._codes is not None:
+                self._codes.flush()
+            self.trained_on = len(live)
+            self._save_meta()
+            self._conn.commit()
+
+    def query(self, embedding, n_results, chunk_filter=None):
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        with self._lock:
+            if self._vectors is None or not self.count():
+                return empty
+            query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+
+            allowed = None
+            if chunk_filter is not None:
+                condition, params = chunk_filter.to_sql()
+                if condition:
+                    allowed = np.fromiter(
+                        (row for (row,) in self._conn.execute(f"SELECT row FROM rows WHERE {condition}", params)),
+                        dtype=np.int64
+                    )
+                    if not len(allowed):
+                        return empty
+
+            if allowed is not None and len(allowed) <= config.ANN_EXACT_FILTER_ROWS:
+                rows, scores = self._score_rows(np.sort(allowed), query, n_results)
+            elif self.trained:
+                rows, scores = self._search_ivf(query, n_results, allowed)
+            else:
+                rows, scores = self._search_flat(query, n_results, allowed)
+
+            records = self._fetch(rows.tolist())
+        ids, documents, metadatas, distances = [], [], [], []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            if row not in records:
+                continue
+            chunk_id, document, metadata = records[row]
+            ids.append(chunk_id)
+            documents.append(document)
+            metadatas.append(metadata)
+            distances.append(1.0 - score)
+        return {"ids": [ids], "documents": [documents], "metadatas": [metadatas], "distances": [distances]}
+
+    def get(self, ids=None, limit=None, offset=0):
+        with self._lock:
+            if ids is not None:
+                rows = list(self._rows_for(list(ids)).values())
+            else:
+                rows = [row for (row,) in self._conn.execute(
+                    "SELECT row FROM rows ORDER BY row LIMIT ? OFFSET ?", (limit if limit is not None else -1, offset)
+                )]
+            records = self._fetch(rows)
+        result = {"ids": [], "documents": [], "metadatas": []}
+        for row in rows:
+            chunk_id, document, metadata = records[row]
+            result["ids"].append(chunk_id)
+            result["documents"].append(document)
+            result["metadatas"].append(metadata)
+        return result
+
+    def delete(self, ids):
+        with self._lock:
+            rows = list(self._rows_for(list(ids)).values())
+            if not rows:
+                return
+            for row in rows:
+                self._move_to_list(row, -1)
+            self._valid[rows] = False
+            self._conn.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+            self._conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for row in rows])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._codes = None
+            self._quantizer = None
+            self._conn.executescript("DELETE FROM rows; DELETE FROM free_rows; DELETE FROM meta;")
+            self._conn.commit()
+            for name in ("vectors.bin", "centroids.npy", "codes.bin", "quantizer.npz"):
+                file_path = os.path.join(self.path, name)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            self.dim, self.capacity, self.next_row, self.trained_on = None, 0, 0, 0
+            self._centroids = None
+            self._valid = np.zeros(0, dtype=bool)
+            self._row_list = np.zeros(0, dtype=np.int32)
+            self._lists, self._list_arrays = {}, {}
+
+    def destroy(self) -> None:
+        """Close the index and delete its directory"""
+        with self._lock:
+            self._vectors = None
+            self._codes = None
+            self._conn.close()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def _search_flat(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray]):
+        mask = self._valid[:self.next_row].copy()
+        if allowed is not None:
+            allowed_mask = np.zeros_like(mask)
+            allowed_mask[allowed] = True
+            mask &= allowed_mask
+
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, self.next_row, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, self.next_row)
+            scores = self._vectors[start:end].astype(np.float32) @ query
+            scores[~mask[start:end]] = -np.inf
+            rows, scores = _top_k(np.arange(start, end), scores, k)
+            best_rows, best_scores = _top_k(
+                np.concatenate([best_rows, rows]), np.concatenate([best_scores, scores]), k
+            )
+        keep = np.isfinite(best_scores)
+        return best_rows[keep], best_scores[keep]
+
+    def _search_ivf(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray]):
+        order = np.argsort(-(self._centroids @ query))
+        nprobe = min(self.nprobe, len(order))
+        while True:
+            rows = [self._list_array(int(list_id)) for list_id in order[:nprobe]]
+            rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+            if allowed is not None:
+                rows = rows[np.isin(rows, allowed)]
+            # A selective filter may leave the probed lists short of k; widen the probe
+            if len(rows) >= k or nprobe >= len(order):
+                break
+            nprobe = min(nprobe * 2, len(order))
+        return self._score_rows(np.sort(rows), query, k)
+
+    def _score_rows(self, rows: np.ndarray, query: np.ndarray, k: int):
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+        if self._quantizer is not None and len(rows) > k * self.rescore_factor:
+            # First stage on compact codes, then exact scores for the shortlist
+            approximate = self._quantizer.scorer(query)(self._codes[rows])
+            rows, _ = _top_k(rows, approximate, k * self.rescore_factor)
+            rows = np.sort(rows)
+        scores = self._vectors[rows].astype(np.float32) @ query
+        return _top_k(rows, scores, k)
+
+    def memory_stats(self) -> Dict:
+        """Bytes per vector of the first-stage search data and of the full vectors"""
+        full = self.dim * self.dtype.itemsize if self.dim else 0
+        first_stage = self._quantizer.code_size * self._quantizer.code_dtype.itemsize if self._quantizer else full
+        return {
+            "vectors": self.count(),
+            "quantization": self.quantization if self._quantizer else "none",
+            "first_stage_bytes_per_vector": first_stage,
+            "full_bytes_per_vector": full,
+            "first_stage_mb": first_stage * self.count() / 2 ** 20,
+            "full_mb": full * self.count() / 2 ** 20
+        }
+
+    def _load_quantizer(self) -> None:
+        quantizer_path = os.path.join(self.path, "quantizer.npz")
+        if not os.path.exists(quantizer_path) or not os.path.exists(self._codes_path):
+            return
+        self._quantizer = make_quantizer(self.quantization, self.dim, config.ANN_PQ_SUBVECTORS)
+        if self._quantizer is None:
+            return
+        with np.load(quantizer_path) as state:
+            self._quantizer.load_state(dict(state))
+        self._codes = self._open_codes("r+")
+
+    @property
+    def _codes_path(self) -> str:
+        return os.path.join(self.path, "codes.bin")
+
+    def _open_codes(self, mode: str) -> np.memmap:
+        return np.memmap(
+            self._codes_path, dtype=self._quantizer.code_dtype, mode=mode,
+            shape=(self.capacity, self._quantizer.code_size)
+        )
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.fromiter(self._lists.get(list_id, ()), dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    def _move_to_list(self, row: int, list_id: int) -> None:
+        current = int(self._row_list[row])
+        if current == list_id:
+            return
+        if current >= 0:
+            self._lists[current].discard(row)
+            self._list_arrays.pop(current, None)
+        if list_id >= 0:
+            self._lists.setdefault(list_id, set()).add(row)
+            self._list_arrays.pop(list_id, None)
+        self._row_list[row] = list_id
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def _rows_for(self, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(self._conn.execute(
+                f"SELECT chunk_id, row FROM rows WHERE chunk_id IN ({placeholders})", part
+            ).fetchall())
+        return found
+
+    def _fetch(self, rows: List[int]) -> Dict[int, tuple]:
+        records = {}
+        for start in range(0, len(rows), 500):
+            part = rows[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            for row, chunk_id, document, metadata in self._conn.execute(
+                f"SELECT row, chunk_id, document, metadata FROM rows WHERE row IN ({placeholders})", part
+            ):
+                records[row] = (chunk_id, document, json.loads(metadata))
+        return records
+
+    def _allocate_row(self) -> int:
+        free = self._conn.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+        if free is not None:
+            self._conn.execute("DELETE FROM free_rows WHERE row = ?", free)
+            return free[0]
+        self.next_row += 1
+        return self.next_row - 1
+
+    def _create(self, dim: int) -> None:
+        self.dim = dim
+        self.capacity = 0
+        self._ensure_capacity(1024)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        new_capacity = max(rows, self.capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * self.dtype.itemsize)
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(new_capacity, self.dim))
+        if self._codes is not None:
+            self._codes.flush()
+            self._codes = None
+            with open(self._codes_path, "ab") as f:
+                f.truncate(new_capacity * self._quantizer.code_size * self._quantizer.code_dtype.itemsize)
+        valid = np.zeros(new_capacity, dtype=bool)
+        valid[:len(self._valid)] = self._valid
+        self._valid = valid
+        row_list = np.full(new_capacity, -1, dtype=np.int32)
+        row_list[:len(self._row_list)] = self._row_list
+        self._row_list = row_list
+        self.capacity = new_capacity
+        if self._quantizer is not None:
+            self._codes = self._open_codes("r+")
+
+    def _save_meta(self) -> None:
+        self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("dim", str(self.dim)),
+            ("dtype", self.dtype.name),
+            ("capacity", str(self.capacity)),
+            ("next_row", str(self.next_row)),
+            ("trained_on", str(self.trained_on)),
+            ("quantization", self.quantization if self._quantizer is not None else "none")
+        ])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    """The k highest scores and their rows, best first"""
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+def _kmeans(sample: np.ndarray, k: int, rng: np.random.Generator, iterations: int = 10) -> np.ndarray:
+    """Spherical k-means: unit-norm centroids maximising cosine similarity"""
+    centroids = sample[rng.choice(len(sample), size=min(k, len(sample)), replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~np.bincount(assignment, minlength=len(centroids)).astype(bool)
+        # Reseed empty lists from random points so every centroid stays useful
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+__all__ = ["LocalANNBackend"]
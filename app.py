@@ -6,12 +6,15 @@ import sys
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.ingestion.ingest_pipeline import IngestionPipeline
+from src.ingestion.ingest_jobs import JobQueue, ensure_worker
+from src.ingestion.ingest_manifest import IngestManifest
 from src.embedding.vector_store import VectorStore
+from src.embedding.filters import ChunkFilter
 from src.retrieval.retriever import Retriever
 from src.retrieval.reranker import Reranker
 from src.retrieval.multimodal_merger import MultiModalMerger
-from src.generation.perplexity_llm import PerplexityLLM
+from src.retrieval.query_pipeline import QueryPipeline
+from src.generation.streaming_llm import StreamingLLM
 from src.generation.prompt_template import PromptTemplate
 from src.generation.answer_formatter import AnswerFormatter
 from src.utils.config import config
@@ -24,14 +27,19 @@ st.markdown("*Advanced Multi-Modal Document Intelligence System*")
 # Initialize components
 @st.cache_resource
 def init_components():
+    vector_store = VectorStore()
+    retriever = Retriever(vector_store=vector_store)
+    reranker = Reranker()
+    merger = MultiModalMerger()
     return {
-        'pipeline': IngestionPipeline(),
-        'vector_store': VectorStore(),
-        'retriever': Retriever(),
-        'reranker': Reranker(),
-        'merger': MultiModalMerger(),
-        'llm': PerplexityLLM(),
-        'formatter': AnswerFormatter()
+        'vector_store': vector_store,
+        'retriever': retriever,
+        'reranker': reranker,
+        'merger': merger,
+        'query_pipeline': QueryPipeline(retriever, reranker, merger),
+        'llm': StreamingLLM(),
+        'formatter': AnswerFormatter(),
+        'job_queue': JobQueue()
     }
 
 components = init_components()
@@ -43,36 +51,70 @@ if 'messages' not in st.session_state:
         "content": "Hello! Please upload a PDF document, and I'll help you answer questions about it."
     }]
 if 'doc_processed' not in st.session_state:
-    st.session_state.doc_processed = False
+    st.session_state.doc_processed = components['vector_store'].count() > 0
+if 'jobs_seen' not in st.session_state:
+    # Jobs that finished before this session don't announce themselves
+    st.session_state.jobs_seen = {
+        job.id for job in components['job_queue'].jobs(components['vector_store'].collection_name) if not job.active
+    }
 
 # Sidebar
 with st.sidebar:
     st.header("📁 Document Upload")
-    uploaded_file = st.file_uploader("Upload PDF", type=['pdf'])
+    uploaded_files = st.file_uploader("Upload PDF", type=['pdf'], accept_multiple_files=True)
     
-    if uploaded_file and st.button("Process Document"):
-        with st.spinner("Processing..."):
-            # Save uploaded file
-            save_path = Path("data/raw_documents") / uploaded_file.name
+    if uploaded_files and st.button("Process Document"):
+        # Save uploaded files and queue them; background workers ingest them,
+        # so this session stays responsive and survives a browser refresh
+        for uploaded_file in uploaded_files:
+            save_path = Path(config.RAW_DOCUMENTS_PATH) / uploaded_file.name
             save_path.parent.mkdir(parents=True, exist_ok=True)
             with open(save_path, 'wb') as f:
                 f.write(uploaded_file.getbuffer())
-            
-            # Process
-            chunks = components['pipeline'].process_document(str(save_path))
-
-            # Store in vector database
-            components['vector_store'].add_chunks(chunks)
-
-            st.success(f"✅ Document processed! Generated {len(chunks)} chunks.")
-            st.session_state.doc_processed = True
-            # Reset chat for new document
-            st.session_state.messages = [{
-                "role": "assistant",
-                "content": f"I've processed '{uploaded_file.name}'. What would you like to know?"
-            }]
+            components['job_queue'].submit(str(save_path), components['vector_store'].collection_name)
+        ensure_worker(components['job_queue'])
+        st.toast(f"Queued {len(uploaded_files)} document(s) for processing")
+
+    @st.fragment(run_every=2)
+    def job_status():
+        """Poll the job queue; the rest of the page is only rerun when a job finishes"""
+        jobs = components['job_queue'].jobs(components['vector_store'].collection_name, limit=10)
+        for job in jobs:
+            name = Path(job.source).name
+            if job.status == "running":
+                st.progress(job.progress, text=f"{name}: {job.pages_done}/{job.pages_total or '?'} pages")
+            elif job.status == "queued":
+                st.caption(f"⏳ {name}: queued")
+            elif job.status == "done":
+                st.caption(f"✅ {name}: {job.chunks} chunks")
+            else:
+                st.caption(f"⚠️ {name}: {job.error}")
+
+        finished = [job for job in jobs if not job.active and job.id not in st.session_state.jobs_seen]
+        if finished:
+            st.session_state.jobs_seen.update(job.id for job in finished)
+            components['vector_store'].refresh()
+            done = [Path(job.source).name for job in finished if job.status == "done"]
+            if done:
+                st.session_state.doc_processed = True
+                names = ", ".join(f"'{name}'" for name in done)
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": f"I've processed {names}. What would you like to know?"
+                })
             st.rerun()
 
+    job_status()
+
+    # Search scope, pushed down into retrieval
+    st.header("🔎 Search Scope")
+    known_sources = IngestManifest(components['vector_store'].manifest_path).sources()
+    selected_sources = st.multiselect(
+        "Documents", known_sources, format_func=lambda p: Path(p).name, help="Leave empty to search all documents"
+    )
+    selected_types = st.multiselect("Content types", ["text", "table", "ocr", "chart_metadata"])
+    search_filter = ChunkFilter(sources=selected_sources or None, chunk_types=selected_types or None)
+
 # Main content area
 st.header("🔍 Ask Questions")
 
@@ -90,44 +132,46 @@ if query := st.chat_input("What is your question?", disabled=not st.session_stat
 
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
-        with st.spinner("Thinking..."):
-            try:
-                # Retrieve relevant chunks
-                retrieved_chunks = components['retriever'].retrieve(query)
-
-                # Rerank if we have results
-                if retrieved_chunks:
-                    retrieved_chunks = components['reranker'].rerank(query, retrieved_chunks)
-
-                # Create context from retrieved chunks
-                context = components['merger'].create_context(retrieved_chunks)
-
-                # Generate answer
-                prompt = PromptTemplate.create_query_prompt(context, query)
-                raw_response = components['llm'].generate(prompt, PromptTemplate.SYSTEM_PROMPT)
-
-                # Format response
-                parsed_response = components['formatter'].parse_response(raw_response)
-                
-                confidence_color = {
-                    "High": "🟢",
-                    "Medium": "🟡",
-                    "Low": "🔴"
-                }.get(parsed_response.get('confidence', 'Unknown'), "⚪")
-
-                # Construct the full response with citations and confidence
-                full_response = (
-                    f"{parsed_response.get('answer', 'No answer found.')}\n\n"
-                    f"**Confidence:** {confidence_color} {parsed_response.get('confidence', 'Unknown')}\n\n"
-                    f"**Citations:** {parsed_response.get('citations', 'None')}"
-                )
-                message_placeholder.markdown(full_response)
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
-
-            except Exception as e:
-                error_message = f"An error occurred: {e}"
-                st.error(error_message)
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
+        try:
+            with st.spinner("Thinking..."):
+                # Retrieve, rerank and build the context (cached until the collection changes)
+                result = components['query_pipeline'].run(query, filters=search_filter)
+                context = result['context']
+
+            # Stream the answer into the placeholder as tokens arrive
+            prompt = PromptTemplate.create_query_prompt(context, query)
+            raw_response = ""
+            timing = {}
+            for token in components['llm'].stream(prompt, PromptTemplate.SYSTEM_PROMPT, timing):
+                raw_response += token
+                message_placeholder.markdown(raw_response + "▌")
+
+            # Format response once the stream is complete
+            parsed_response = components['formatter'].parse_response(raw_response)
+            
+            confidence_color = {
+                "High": "🟢",
+                "Medium": "🟡",
+                "Low": "🔴"
+            }.get(parsed_response.get('confidence', 'Unknown'), "⚪")
+
+            # Construct the full response with citations and confidence
+            full_response = (
+                f"{parsed_response.get('answer', 'No answer found.')}\n\n"
+                f"**Confidence:** {confidence_color} {parsed_response.get('confidence', 'Unknown')}\n\n"
+                f"**Citations:** {parsed_response.get('citations', 'None')}"
+            )
+            message_placeholder.markdown(full_response)
+            st.caption(
+                f"Context: {result['context_tokens']} tokens{' (cached)' if result['cached'] else ''} · "
+                f"first token {timing.get('first_token', 0):.2f}s, total {timing.get('total', 0):.2f}s"
+            )
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+
+        except Exception as e:
+            error_message = f"An error occurred: {e}"
+            st.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
 
 # Footer
 st.markdown("---")
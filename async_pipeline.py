@@ -0,0 +1,128 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copy
+import functools
+
+import httpx
+import numpy as np
+from .query_pipeline import QueryPipeline
+from .query_cache import QueryCache
+from ..embedding.filters import ChunkFilter
+from ..generation.streaming_llm import AsyncStreamingLLM
+from ..utils.config import config
+
+
+class AsyncQueryPipeline(QueryPipeline):
+    """
+    asyncio query path: embed query -> dense + lexical search -> rerank -> generate.
+
+    Completions are awaited on pooled `httpx.AsyncClient` connections, so
+    one process keeps many answers in flight. Blocking work (query
+    embedding, vector and lexical search, the cross-encoder) runs in a
+    bounded thread pool. Query embeddings go through the store's embedder,
+    so they share its rate limiter, retries and embedding cache, and its
+    batcher if the store batches queries
+    (`VectorStore.enable_query_batching`). The lexical search needs no
+    embedding and overlaps with the embedding request. Identical
+    concurrent questions share a single computation. Create one pipeline
+    per event loop and `aclose` it when the loop ends.
+    """
+
+    def __init__(self, retriever, reranker, merger, cache: Optional[QueryCache] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        super().__init__(retriever, reranker, merger, cache)
+        self.vector_store = retriever.vector_store
+        self._executor = executor or ThreadPoolExecutor(max_workers=config.ASYNC_EXECUTOR_WORKERS)
+        self._owns_executor = executor is None
+        connections = max(1, config.ASYNC_HTTP_CONNECTIONS)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            timeout=httpx.Timeout(config.LLM_TIMEOUT, connect=10.0)
+        )
+        self.llm = AsyncStreamingLLM(http_client=self._http)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, query: str, filters: Optional[ChunkFilter] = None, top_k: int = None) -> Dict:
+        """Returns {"chunks", "context", "context_tokens", "cached"} for the question"""
+        top_k = top_k or config.TOP_K
+        key = self._cache_key(query, filters, top_k)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        if key is not None and key in self._inflight:
+            result = await asyncio.shield(self._inflight[key])
+            # Like cache hits, every waiter gets chunks of its own
+            return {**copy.deepcopy(result), "cached": True}
+
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._inflight[key] = future
+        try:
+            chunks = await self.retrieve(query, top_k, filters)
+            result = await self._in_executor(self._finish, query, chunks, key)
+            # Waiters copy from a snapshot the caller of this run can't modify
+            future.set_result(copy.deepcopy(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; make sure an unobserved failure isn't logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            if key is not None:
+                self._inflight.pop(key, None)
+
+    async def retrieve(self, query: str, top_k: int = None, filters: Optional[ChunkFilter] = None) -> List[Dict]:
+        """Async counterpart of `Retriever.retrieve`"""
+        top_k = top_k or config.TOP_K
+        store = self.vector_store
+
+        if store.lexical_index is None:
+            embedding = await self.embed_query(query)
+            return self.retriever.format_dense(await self._in_executor(store.query_by_embedding, embedding, top_k, filters))
+
+        candidates = self.retriever.candidate_count(top_k)
+        lexical_task = asyncio.ensure_future(self._in_executor(store.lexical_query, query, candidates, filters))
+        try:
+            embedding = await self.embed_query(query)
+            dense = await self._in_executor(store.query_by_embedding, embedding, candidates, filters)
+        finally:
+            lexical = await lexical_task
+        # Fusion may fetch lexical-only chunks from the backend
+        return await self._in_executor(self.retriever.fuse, self.retriever.format_dense(dense), lexical, top_k)
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """(1, dim) query embedding; the row is NaN if embedding failed"""
+        return await self._in_executor(self.vector_store.embed_query, query)
+
+    async def stream_answer(self, query: str, filters: Optional[ChunkFilter] = None, top_k: int = None,
+                            timing: Optional[Dict[str, float]] = None) -> AsyncIterator[Any]:
+        """Yield the retrieval result dict first, then the answer's text deltas"""
+        from ..generation.prompt_template import PromptTemplate
+
+        result = await self.run(query, filters, top_k)
+        yield result
+        prompt = PromptTemplate.create_query_prompt(result["context"], query)
+        async for token in self.llm.stream(prompt, PromptTemplate.SYSTEM_PROMPT, timing):
+            yield token
+
+    async def answer(self, query: str, filters: Optional[ChunkFilter] = None, top_k: int = None) -> Dict:
+        """Retrieval result plus the complete answer text and its timings"""
+        timing: Dict[str, float] = {}
+        stream = self.stream_answer(query, filters, top_k, timing)
+        result = await stream.__anext__()
+        answer = "".join([token async for token in stream])
+        return {**result, "answer": answer, "timing": timing}
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def _in_executor(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+
+__all__ = ["AsyncQueryPipeline"]
@@ -1,23 +1,279 @@
-from typing import Optional
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import random
+import threading
+import time
+
+import httpx
+import numpy as np
+from openai import OpenAI, APIConnectionError, APIStatusError, RateLimitError
+from .embedding_backend import LocalEmbeddingBackend
+from .embedding_cache import EmbeddingCache
 from ..utils.config import config
+from ..utils.tokens import estimate_tokens
+
+
+class RateLimiter:
+    """Token-bucket limiter on requests and tokens per minute (0 disables a limit)."""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request carrying `tokens` tokens may be sent"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                if self.requests_per_minute:
+                    self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+                if self.tokens_per_minute:
+                    self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+                    # A batch larger than the whole budget would otherwise wait forever
+                    tokens = min(tokens, self.tokens_per_minute)
+
+                request_ok = not self.requests_per_minute or self._requests >= 1
+                tokens_ok = not self.tokens_per_minute or self._tokens >= tokens
+                if request_ok and tokens_ok:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+
+                wait = 0.0
+                if not request_ok:
+                    wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+                if not tokens_ok:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            time.sleep(wait)
+
+
+# One HTTP connection pool and one rate budget per process, shared by every embedder
+_shared_client: Optional[OpenAI] = None
+_shared_limiter: Optional[RateLimiter] = None
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def _get_client() -> Optional[OpenAI]:
+    global _shared_client
+    if not config.PERPLEXITY_API_KEY or config.PERPLEXITY_API_KEY == "test_key":
+        return None # For testing or if key is missing
+    with _shared_lock:
+        if _shared_client is None:
+            pool_size = max(1, config.EMBEDDING_MAX_CONCURRENCY)
+            _shared_client = OpenAI(
+                api_key=config.PERPLEXITY_API_KEY,
+                base_url=config.EMBEDDING_BASE_URL,
+                # Retries are handled per batch below, with rate-limit aware backoff
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                    timeout=config.EMBEDDING_TIMEOUT
+                )
+            )
+        return _shared_client
+
+
+def _get_rate_limiter() -> RateLimiter:
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(config.EMBEDDING_REQUESTS_PER_MINUTE, config.EMBEDDING_TOKENS_PER_MINUTE)
+        return _shared_limiter
+
+
+def _get_cache() -> Optional[EmbeddingCache]:
+    global _shared_cache
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = EmbeddingCache()
+            except Exception as e:
+                logging.warning(f"Embedding cache unavailable, continuing without it: {e}")
+                return None
+        return _shared_cache
+
 
 class BaseEmbedder:
     """
     Base class for embedders to handle common client initialization.
 
     Prefers the Perplexity API when `config.PERPLEXITY_API_KEY` is set,
-    and will raise an error if the key is not available.
+    and will raise an error if the key is not available. With
+    `config.EMBEDDING_BACKEND = "local"` a sentence-transformers model runs
+    in-process instead.
+
+    `embed_batch` is the shared embedding engine: inputs are split into
+    batches bounded by item count and estimated tokens, each batch is sent
+    through a bounded connection pool under the rate limiter and retried
+    with exponential backoff, and a batch that finally fails only empties
+    its own rows. Texts already embedded with the same model are served
+    from the `EmbeddingCache` and never reach the API.
     """
     def __init__(self, model: Optional[str] = None):
-        self.model = model or config.EMBEDDING_MODEL
+        self.backend = config.EMBEDDING_BACKEND
+        self.batch_size = max(1, config.EMBEDDING_BATCH_SIZE)
+        self.batch_tokens = max(1, config.EMBEDDING_BATCH_TOKENS)
+        self.max_concurrency = max(1, config.EMBEDDING_MAX_CONCURRENCY)
+        self.max_retries = max(0, config.EMBEDDING_MAX_RETRIES)
+        self.cache = _get_cache()
 
-        if not config.PERPLEXITY_API_KEY or config.PERPLEXITY_API_KEY == "test_key":
-            self.client = None # For testing or if key is missing
+        if self.backend == "local":
+            # No network, no per-token cost: embed in-process with sentence-transformers
+            self.local = LocalEmbeddingBackend(model)
+            self.model = self.local.model_name
+            self.client = None
+            self.rate_limiter = None
         else:
-            self.client = OpenAI(
-                api_key=config.PERPLEXITY_API_KEY,
-                base_url="https://api.perplexity.ai"
-            )
+            self.local = None
+            self.model = model or config.EMBEDDING_MODEL
+            self.client = _get_client()
+            self.rate_limiter = _get_rate_limiter()
+
+    @property
+    def available(self) -> bool:
+        """True if embeddings can actually be computed (local model or API key)"""
+        return self.local is not None or self.client is not None
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as an (n, dim) float32 array; rows that failed are NaN."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        cached = self.cache.get_many(self.model, texts) if self.cache is not None else [None] * len(texts)
+
+        # Each distinct missing text is embedded once, then fanned out
+        pending: Dict[str, List[int]] = {}
+        for i, vector in enumerate(cached):
+            if vector is None:
+                pending.setdefault(EmbeddingCache.normalize(texts[i]), []).append(i)
+
+        unique_texts = [texts[rows[0]] for rows in pending.values()]
+        fresh = self._encode(unique_texts) if unique_texts else np.empty((0, 0), dtype=np.float32)
+        fresh_valid = valid_rows(fresh)
+        if self.cache is not None and unique_texts:
+            self.cache.put_many(self.model, unique_texts, [v if ok else None for v, ok in zip(fresh, fresh_valid)])
+
+        dim = next((len(v) for v in cached if v is not None), fresh.shape[1] if fresh.ndim == 2 else 0)
+        vectors = np.full((len(texts), dim), np.nan, dtype=np.float32)
+        for i, vector in enumerate(cached):
+            if vector is not None:
+                vectors[i] = vector
+        for rows, vector, ok in zip(pending.values(), fresh, fresh_valid):
+            if ok:
+                vectors[rows] = vector
+        return vectors
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """List form of `embed_array`: rows that failed are returned as []."""
+        vectors = self.embed_array(texts)
+        return [v.tolist() if ok else [] for v, ok in zip(vectors, valid_rows(vectors))]
+
+    def cache_stats(self) -> Optional[Dict]:
+        return self.cache.stats() if self.cache is not None else None
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embed without the cache, as a float32 array with NaN rows for failures"""
+        if self.local is not None:
+            return self.local.encode(texts)
+
+        rows = self._embed_uncached(texts)
+        dim = next((len(r) for r in rows if r), 0)
+        vectors = np.full((len(rows), dim), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row:
+                vectors[i] = row
+        return vectors
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        if self.client is None:
+            logging.error(f"{type(self).__name__}: no embedding client configured (PERPLEXITY_API_KEY missing)")
+            return [[] for _ in texts]
+
+        results: List[List[float]] = [[] for _ in texts]
+        batches = self._make_batches(texts)
+
+        if len(batches) == 1 or self.max_concurrency == 1:
+            for start, batch in batches:
+                results[start:start + len(batch)] = self._embed_with_retry(batch)
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            futures = [(start, batch, pool.submit(self._embed_with_retry, batch)) for start, batch in batches]
+            for start, batch, future in futures:
+                results[start:start + len(batch)] = future.result()
+        return results
+
+    def _make_batches(self, texts: List[str]) -> List[Tuple[int, List[str]]]:
+        """Split into consecutive batches under both the item and the token limit"""
+        batches = []
+        start, current, current_tokens = 0, [], 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.batch_tokens):
+                batches.append((start, current))
+                start, current, current_tokens = i, [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append((start, current))
+        return batches
+
+    def _embed_with_retry(self, batch: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(t) for t in batch)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(tokens)
+            try:
+                response = self.client.embeddings.create(input=batch, model=self.model)
+                return [d.embedding for d in response.data]
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    logging.error(f"Error in {type(self).__name__} for a batch of {len(batch)}: {e}", exc_info=True)
+                    return [[] for _ in batch]
+                delay = _retry_delay(e, attempt)
+                logging.warning(f"{type(self).__name__}: embedding batch failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return [[] for _ in batch]
+
+
+def valid_rows(vectors: np.ndarray) -> np.ndarray:
+    """Boolean mask of rows holding a real embedding (not NaN, not zero-width)"""
+    if vectors.ndim != 2 or vectors.shape[1] == 0:
+        return np.zeros(len(vectors), dtype=bool)
+    return ~np.isnan(vectors).any(axis=1)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, RateLimitError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Honour Retry-After on rate limits, else exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return min(config.EMBEDDING_BACKOFF_MAX, config.EMBEDDING_BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
 
-__all__ = ["BaseEmbedder"]
\ No newline at end of file
+__all__ = ["BaseEmbedder", "RateLimiter", "valid_rows"]
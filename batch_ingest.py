@@ -0,0 +1,314 @@
+from typing import List, Dict, Optional, Iterable, Iterator, Callable, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+import logging
+import time
+
+from .ingest_pipeline import IngestionPipeline, pool_ocr_workers
+from .ingest_manifest import IngestManifest, DocumentPlan, plan_document
+from ..utils.config import config
+from ..utils.memory import PeakMemory
+
+
+@dataclass
+class DocumentResult:
+    """Outcome of ingesting a single document in a batch.
+
+    `chunks` is empty when the document was streamed straight into the
+    vector store (`stored`); `chunk_count` is set either way. `peak_rss_mb`
+    is the largest peak of the process(es) that extracted it. `failed_pages`
+    could not be extracted; they keep what was stored for them before and
+    are retried by the next ingest.
+    """
+    path: str
+    chunks: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None
+    seconds: float = 0.0
+    plan: Optional[DocumentPlan] = None
+    chunk_count: int = 0
+    stored: bool = False
+    unchanged: bool = False
+    deleted: int = 0
+    peak_rss_mb: Optional[float] = None
+    failed_pages: List[int] = field(default_factory=list)
+
+    @property
+    def skipped(self) -> bool:
+        return self.unchanged or (self.plan is not None and self.plan.unchanged)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# One pipeline per worker process, created by the pool initializer.
+# Work is already spread across processes, so pages are extracted serially.
+_worker_pipeline: Optional[IngestionPipeline] = None
+
+
+def _init_worker(ocr_workers: int = 1) -> None:
+    global _worker_pipeline
+    _worker_pipeline = IngestionPipeline(page_workers=1, ocr_workers=ocr_workers)
+
+
+def _ingest_one(pdf_path: str) -> DocumentResult:
+    """Run the pipeline on one whole document; never raises so one bad PDF can't stop the batch"""
+    start = time.perf_counter()
+    if not Path(pdf_path).exists():
+        return DocumentResult(pdf_path, error="File not found")
+
+    try:
+        pipeline = _worker_pipeline or IngestionPipeline()
+        failed_pages: List[int] = []
+        with PeakMemory() as memory:
+            chunks = pipeline.process_document(pdf_path, failed_pages=failed_pages)
+        return DocumentResult(
+            pdf_path, chunks=chunks, seconds=time.perf_counter() - start,
+            chunk_count=len(chunks), peak_rss_mb=memory.peak_mb, failed_pages=sorted(failed_pages)
+        )
+    except Exception as e:
+        return DocumentResult(pdf_path, error=str(e), seconds=time.perf_counter() - start)
+
+
+def _extract_window(pdf_path: str, pages: List[int]) -> Tuple[List[Dict], List[int], Optional[float]]:
+    """Chunks of a window of pages, the pages that failed to extract, and this process's peak RSS"""
+    pipeline = _worker_pipeline or IngestionPipeline()
+    failed_pages: List[int] = []
+    with PeakMemory() as memory:
+        chunks = pipeline.process_document(pdf_path, pages=pages, failed_pages=failed_pages)
+    return chunks, failed_pages, memory.peak_mb
+
+
+class BatchIngestor:
+    """Ingest many documents in parallel across a process pool.
+
+    With a vector store, documents are stored page by page instead of
+    being returned as one list of chunks. A single worker streams them
+    through its own pipeline; a pool extracts windows of pages on the
+    workers and this process stores each window as it arrives, so it
+    stays the collection's only writer.
+    """
+
+    def __init__(self, vector_store=None, workers: int = None, manifest: Optional[IngestManifest] = None):
+        self.vector_store = vector_store
+        self.workers = max(1, workers or config.INGEST_WORKERS)
+        # Incremental mode needs somewhere to store chunks; without a store every document is extracted
+        self.manifest = manifest or (IngestManifest(vector_store.manifest_path) if vector_store is not None else None)
+        self._serial_pipeline: Optional[IngestionPipeline] = None
+
+    @staticmethod
+    def expand_paths(paths: Iterable[str]) -> List[str]:
+        """Expand directories to the PDFs they contain, keeping the given order"""
+        expanded = []
+        for p in paths:
+            path = Path(p)
+            if path.is_dir():
+                expanded.extend(str(f) for f in sorted(path.rglob("*.pdf")))
+            else:
+                expanded.append(str(path))
+        return expanded
+
+    def iter_results(self, pdf_paths: List[str]) -> Iterator[DocumentResult]:
+        """Yield one result per document, in completion order.
+
+        The pool is fed two tasks per worker at a time, so finished results
+        (and their chunks) are only held until they are yielded or stored.
+        """
+        incremental = self.manifest is not None
+        if incremental:
+            self.manifest.sync(self.vector_store.count())
+
+        if self.workers == 1 or len(pdf_paths) <= 1:
+            for pdf_path in pdf_paths:
+                if incremental:
+                    yield self._stream_one(pdf_path)
+                else:
+                    yield _ingest_one(pdf_path)
+            return
+
+        pool_size = min(self.workers, len(pdf_paths))
+        with ProcessPoolExecutor(
+            max_workers=pool_size, initializer=_init_worker, initargs=(pool_ocr_workers(pool_size),)
+        ) as pool:
+            if incremental:
+                yield from self._stream_pool(pool, pool_size, pdf_paths)
+                return
+
+            pending = iter(pdf_paths)
+            futures = {}
+
+            def submit(pdf_path):
+                futures[pool.submit(_ingest_one, pdf_path)] = pdf_path
+
+            for pdf_path in islice(pending, pool_size * 2):
+                submit(pdf_path)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_path = futures.pop(future)
+                    following = next(pending, None)
+                    if following is not None:
+                        submit(following)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself died (e.g. a native crash in a PDF library)
+                        result = DocumentResult(pdf_path, error=f"Worker failed: {e}")
+                    yield result
+
+    def ingest(
+        self,
+        pdf_paths: List[str],
+        progress: Optional[Callable[[int, int, DocumentResult], None]] = None
+    ) -> Dict:
+        """Ingest documents, streaming each finished document into the vector store.
+
+        `progress(done, total, result)` is called after every document.
+        Returns a summary with chunk and failure counts.
+        """
+        total = len(pdf_paths)
+        summary = {"documents": total, "succeeded": 0, "skipped": 0, "failed": 0, "chunks": 0, "deleted": 0, "errors": {}}
+
+        for done, result in enumerate(self.iter_results(pdf_paths), 1):
+            if result.ok and result.stored:
+                summary["deleted"] += result.deleted
+            if result.ok and result.failed_pages:
+                # The other pages are stored; report the document so the failed ones get noticed
+                result.error = f"Extraction failed for pages {', '.join(map(str, result.failed_pages))}"
+
+            if result.ok and result.skipped:
+                summary["skipped"] += 1
+                logging.info(f"[{done}/{total}] ✓ {result.path}: unchanged, skipped")
+            elif result.ok:
+                summary["succeeded"] += 1
+                summary["chunks"] += result.chunk_count
+                logging.info(f"[{done}/{total}] ✓ {result.path}: {result.chunk_count} chunks in {result.seconds:.1f}s")
+            else:
+                summary["failed"] += 1
+                summary["errors"][result.path] = result.error
+                logging.error(f"[{done}/{total}] ✗ {result.path}: {result.error}")
+
+            if progress:
+                progress(done, total, result)
+
+        return summary
+
+    def _stream_one(self, pdf_path: str) -> DocumentResult:
+        """Ingest one document straight into the vector store, page by page"""
+        start = time.perf_counter()
+        if not Path(pdf_path).exists():
+            return DocumentResult(pdf_path, error="File not found")
+        try:
+            if self._serial_pipeline is None:
+                self._serial_pipeline = IngestionPipeline()
+            summary = self._serial_pipeline.ingest(pdf_path, self.vector_store, self.manifest)
+        except Exception as e:
+            return DocumentResult(pdf_path, error=str(e), seconds=time.perf_counter() - start)
+        return DocumentResult(
+            pdf_path, seconds=time.perf_counter() - start, chunk_count=summary["chunks"], stored=True,
+            unchanged=summary["skipped"], deleted=summary["deleted"], peak_rss_mb=summary["peak_rss_mb"],
+            failed_pages=summary["failed_pages"]
+        )
+
+    def _stream_pool(self, pool: ProcessPoolExecutor, pool_size: int, pdf_paths: List[str]) -> Iterator[DocumentResult]:
+        """Ingest documents on `pool`, storing each window of pages here as soon as it is extracted.
+
+        Workers plan a document, then extract its changed pages
+        `config.INGEST_STREAM_PAGES` at a time. Every window is written to
+        the vector store and recorded in the manifest on arrival, so an
+        interrupted batch resumes from the stored windows. Windows of
+        started documents are submitted before new documents are planned,
+        and at most two tasks per worker are in flight, so memory follows
+        the window size rather than the documents.
+        """
+        pending = iter(pdf_paths)
+        windows = deque()
+        results: Dict[str, DocumentResult] = {}
+        started: Dict[str, float] = {}
+        remaining: Dict[str, int] = {}
+        futures = {}
+
+        while True:
+            while len(futures) < pool_size * 2:
+                if windows:
+                    pdf_path, pages = windows.popleft()
+                    futures[pool.submit(_extract_window, pdf_path, pages)] = (pdf_path, pages)
+                    continue
+                pdf_path = next(pending, None)
+                if pdf_path is None:
+                    break
+                if not Path(pdf_path).exists():
+                    yield DocumentResult(pdf_path, error="File not found")
+                    continue
+                started[pdf_path] = time.perf_counter()
+                futures[pool.submit(plan_document, pdf_path, self.manifest.get(pdf_path))] = (pdf_path, None)
+            if not futures:
+                return
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_path, pages = futures.pop(future)
+                if pages is None:
+                    try:
+                        plan = future.result()
+                    except Exception as e:
+                        yield DocumentResult(pdf_path, error=str(e), seconds=time.perf_counter() - started.pop(pdf_path))
+                        continue
+                    results[pdf_path] = DocumentResult(pdf_path, plan=plan, stored=True)
+                    size = max(1, config.INGEST_STREAM_PAGES)
+                    page_windows = [plan.changed_pages[i:i + size] for i in range(0, len(plan.changed_pages), size)]
+                    if not page_windows and not plan.unchanged:
+                        # Only removed pages: record them so their chunks are deleted
+                        self._store_window(results[pdf_path], [], ([], [], None), final=True)
+                    remaining[pdf_path] = len(page_windows)
+                    windows.extend((pdf_path, window) for window in page_windows)
+                else:
+                    try:
+                        extracted = future.result()
+                    except Exception as e:
+                        # The worker process itself died (e.g. a native crash in a PDF library)
+                        logging.error(f"Worker failed on pages {pages[0]}-{pages[-1]} of {pdf_path}: {e}")
+                        extracted = ([], list(pages), None)
+                    remaining[pdf_path] -= 1
+                    self._store_window(results[pdf_path], pages, extracted, final=remaining[pdf_path] == 0)
+
+                if remaining.get(pdf_path) == 0:
+                    del remaining[pdf_path]
+                    result = results.pop(pdf_path)
+                    result.seconds = time.perf_counter() - started.pop(pdf_path)
+                    result.failed_pages.sort()
+                    if result.peak_rss_mb is not None and not result.skipped:
+                        logging.info(f"  ✓ Stored {result.chunk_count} chunks for {pdf_path}, peak RSS {result.peak_rss_mb:.0f} MB")
+                    yield result
+
+    def _store_window(
+        self, result: DocumentResult, pages: List[int],
+        extracted: Tuple[List[Dict], List[int], Optional[float]], final: bool
+    ) -> None:
+        """Store one extracted window of a document and record it in the manifest"""
+        chunks, failed_pages, peak_mb = extracted
+        if peak_mb is not None:
+            result.peak_rss_mb = max(result.peak_rss_mb or 0.0, peak_mb)
+        try:
+            stored_ids = self.vector_store.add_chunks(chunks)
+        except Exception as e:
+            result.error = result.error or f"Vector store insert failed: {e}"
+            # Nothing of the window was stored, so it keeps its old chunks like a failed extraction
+            chunks, stored_ids, failed_pages = [], [], list(pages)
+        try:
+            plan = result.plan.partial(pages, self.manifest.get(result.path), final=final)
+            stale_ids = self.manifest.record(plan, chunks, stored_ids, failed_pages)
+            self.vector_store.delete_chunks(stale_ids)
+        except Exception as e:
+            # The manifest still has the old fingerprints, so these pages are re-extracted next time
+            result.error = result.error or f"Could not record pages in the manifest: {e}"
+            stale_ids = []
+        result.chunk_count += len(chunks)
+        result.deleted += len(stale_ids)
+        result.failed_pages.extend(failed_pages)
+
+
+__all__ = ["BatchIngestor", "DocumentResult"]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recall@k and p50/p99 query latency of the vector backends.
+
+Usage:
+    python benchmarks/bench_ann_backends.py [--sizes 100000 1000000] [--dim 384] [--queries 200] [--k 10]
+                                            [--nprobe 8 32 64] [--skip-chroma]
+
+Vectors are synthetic clusters (like real embeddings, unlike uniform noise),
+queries are held-out points from the same clusters, and ground truth is an
+exact cosine search in NumPy. Each backend is built in a temporary
+directory, so the real vector DB is untouched. At 1M x 1536 dims the float32
+ground-truth matrix alone needs ~6 GB; use a smaller --dim on small machines.
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.embedding.ann_index import LocalANNBackend
+from src.embedding.vector_backend import ChromaBackend
+from src.utils.config import config
+
+INSERT_BATCH = 5000
+
+
+def make_vectors(count: int, dim: int, clusters: int, rng: np.random.Generator):
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), centers
+
+
+def make_queries(centers: np.ndarray, count: int, rng: np.random.Generator):
+    labels = rng.integers(0, len(centers), size=count)
+    queries = centers[labels] + 0.6 * rng.normal(size=(count, centers.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int):
+    truth = []
+    for query in queries:
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        truth.append(set(top[np.argsort(-scores[top])].tolist()))
+    return truth
+
+
+def build(backend, vectors: np.ndarray):
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), INSERT_BATCH):
+        batch = vectors[offset:offset + INSERT_BATCH]
+        ids = [str(i) for i in range(offset, offset + len(batch))]
+        backend.upsert(ids, batch, [""] * len(batch), [{"page": 0}] * len(batch))
+    return time.perf_counter() - start
+
+
+def measure(backend, queries: np.ndarray, truth, k: int):
+    latencies, hits = [], 0
+    backend.query(queries[0], k)  # warm-up
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = backend.query(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {int(i) for i in results["ids"][0]})
+    latencies = np.asarray(latencies)
+    return hits / (k * len(queries)), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def report(name: str, build_seconds: float, recall: float, p50: float, p99: float):
+    print(f"  {name:<28} build {build_seconds:8.1f}s  recall@k {recall:6.3f}  p50 {p50:8.2f} ms  p99 {p99:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--dtype", default=config.ANN_DTYPE)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for size in args.sizes:
+        vectors, centers = make_vectors(size, args.dim, clusters=max(100, size // 1000), rng=rng)
+        queries = make_queries(centers, args.queries, rng)
+        truth = exact_top_k(vectors, queries, args.k)
+        print(f"{size:,} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+
+        workdir = tempfile.mkdtemp(prefix="bench_ann_")
+        try:
+            local = LocalANNBackend(str(Path(workdir) / "local"), dtype=args.dtype)
+            build_seconds = build(local, vectors)
+            if not local.trained:
+                local.train()
+            for nprobe in args.nprobe:
+                local.nprobe = nprobe
+                report(f"local {args.dtype} nprobe={nprobe}", build_seconds, *measure(local, queries, truth, args.k))
+
+            if not args.skip_chroma:
+                config.VECTOR_DB_PATH = str(Path(workdir) / "chroma")
+                chroma = ChromaBackend("bench")
+                build_seconds = build(chroma, vectors)
+                report("chroma hnsw", build_seconds, *measure(chroma, queries, truth, args.k))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
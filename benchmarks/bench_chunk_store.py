@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: size and load time of the binary chunk store vs. the old indented JSON dump.
+
+Usage:
+    python benchmarks/bench_chunk_store.py [--chunks 50000] [--table-share 0.2]
+
+Synthetic chunks mimic ingestion output: text chunks of ~CHUNK_SIZE
+characters and table chunks carrying both their JSON `content` and the
+`raw_df` dict. Reported for each format: bytes on disk, write time, a full
+load, and a metadata-only load (sources and pages, no text).
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.embedding.vector_store import chunk_ids
+from src.utils.chunk_store import ChunkStore
+from src.utils.config import config
+
+WORDS = "revenue margin quarter growth segment forecast operating cash flow guidance region".split()
+
+
+def make_chunks(count: int, table_share: float, rng: np.random.Generator):
+    chunks = []
+    for i in range(count):
+        page = i // 10 + 1
+        if rng.random() < table_share:
+            rows = [[f"{rng.choice(WORDS)} {rng.integers(1000)}" for _ in range(5)] for _ in range(8)]
+            raw_df = {column: {row: rows[row][column] for row in range(8)} for column in range(5)}
+            chunks.append({
+                "type": "table", "content": json.dumps({"rows": rows}), "table_index": i,
+                "page": page, "source": "data/raw_documents/report.pdf", "raw_df": raw_df
+            })
+        else:
+            text = " ".join(rng.choice(WORDS, size=config.CHUNK_SIZE // 7))
+            chunks.append({"type": "text", "content": text, "page": page, "source": "data/raw_documents/report.pdf"})
+    return chunks
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--table-share", type=float, default=0.2)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.table_share, np.random.default_rng(42))
+    ids = chunk_ids(chunks)
+    print(f"{len(chunks):,} chunks, {args.table_share:.0%} tables")
+    print(f"  {'format':<14} {'MB':>8} {'write s':>8} {'load s':>8} {'metadata s':>11}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_chunks_"))
+    try:
+        json_path = workdir / "chunks.json"
+
+        def write_json():
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(chunks, f, indent=2, ensure_ascii=False)
+
+        def load_json():
+            with open(json_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        _, write_seconds = timed(write_json)
+        _, load_seconds = timed(load_json)
+        # JSON has no way to skip fields, so metadata costs a full load
+        _, metadata_seconds = timed(lambda: [(c["source"], c["page"]) for c in load_json()])
+        print(f"  {'json indent=2':<14} {json_path.stat().st_size / 1e6:>8.1f} {write_seconds:>8.2f} "
+              f"{load_seconds:>8.2f} {metadata_seconds:>11.2f}")
+
+        store_path = workdir / "store"
+        _, write_seconds = timed(lambda: ChunkStore(str(store_path)).append(ids, chunks))
+        store = ChunkStore(str(store_path))
+        _, load_seconds = timed(lambda: list(store.iter_chunks(("content", "metadata", "extra"))))
+        _, metadata_seconds = timed(lambda: [(c["source"], c["page"]) for _, c in store.iter_chunks(("metadata",))])
+        print(f"  {'chunk store':<14} {directory_bytes(store_path) / 1e6:>8.1f} {write_seconds:>8.2f} "
+              f"{load_seconds:>8.2f} {metadata_seconds:>11.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: docs/sec of the local (in-process) embedding backend on CPU.
+
+Usage:
+    python benchmarks/bench_local_embeddings.py [--docs 2000] [--batch-sizes 16 32 64 128]
+
+Documents are synthetic chunk-sized passages (~150 words). The embedding
+cache is bypassed so every document is actually encoded.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.embedding.embedding_backend import LocalEmbeddingBackend
+from src.utils.config import config
+
+WORDS = (
+    "revenue quarter margin table figure growth segment operating income cash flow "
+    "guidance forecast region product customer contract liability asset equity"
+).split()
+
+
+def make_documents(count: int, words: int = 150, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--model", default=config.LOCAL_EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    documents = make_documents(args.docs)
+    print(f"Model: {args.model} on {config.LOCAL_EMBEDDING_DEVICE}, {len(documents)} documents")
+
+    for batch_size in args.batch_sizes:
+        backend = LocalEmbeddingBackend(args.model, batch_size=batch_size)
+        backend.encode(documents[:batch_size])  # warm-up
+        start = time.perf_counter()
+        vectors = backend.encode(documents)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  batch={batch_size:4d}  {elapsed:7.2f}s  {len(documents) / elapsed:8.1f} docs/s  "
+            f"shape={vectors.shape} dtype={vectors.dtype}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one shared PDFDocument vs. every extractor opening the PDF itself.
+
+Usage:
+    python benchmarks/bench_pdf_session.py [path/to/file.pdf] [--pages 500]
+
+Without a path a synthetic document with text and an embedded image on every
+page is generated. OCR and camelot are left out so the numbers isolate the
+cost of opening, walking and decoding pages.
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from typing import Optional
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.ingestion.text_extractor import TextExtractor
+from src.utils.pdf_document import PDFDocument
+from src.utils.pdf_utils import PDFUtils
+
+
+def build_synthetic_pdf(path: str, pages: int) -> None:
+    """Write a PDF with a paragraph of text and a small image on each page"""
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(buf, format="PNG")
+    png = buf.getvalue()
+
+    doc = fitz.open()
+    body = " ".join(f"Revenue line {i} increased by {i % 17} percent." for i in range(60))
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 700), f"Page {page_num + 1}. Figure 1: Sales. {body}")
+        page.insert_image(fitz.Rect(50, 720, 114, 784), stream=png)
+    doc.save(path)
+    doc.close()
+
+
+def walk_images(pdf_path: str, document: Optional[PDFDocument] = None) -> int:
+    """Decode every image the way ImageOCR does before calling tesseract"""
+    doc = document or PDFDocument(pdf_path)
+    count = 0
+    for page_num in doc.pages():
+        for xref in doc.page_image_xrefs(page_num):
+            Image.open(io.BytesIO(doc.extract_image(xref)["image"])).load()
+            count += 1
+    if document is None:
+        doc.close()
+    return count
+
+
+def run_separate(pdf_path: str) -> None:
+    TextExtractor().extract_from_pdf(pdf_path)
+    walk_images(pdf_path)
+    PDFUtils.extract_text_by_page(pdf_path)
+    PDFUtils.get_page_count(pdf_path)
+
+
+def run_shared(pdf_path: str) -> None:
+    with PDFDocument(pdf_path) as document:
+        TextExtractor().extract_from_pdf(pdf_path, document)
+        walk_images(pdf_path, document)
+        PDFUtils.extract_text_by_page(pdf_path, document)
+        PDFUtils.get_page_count(pdf_path, document)
+
+
+def best_of(fn, pdf_path: str, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(pdf_path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="PDF to benchmark (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=500, help="pages in the synthetic PDF")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = str(Path(tmp) / "synthetic.pdf")
+            build_synthetic_pdf(pdf_path, args.pages)
+
+        pages = PDFUtils.get_page_count(pdf_path)
+        separate = best_of(run_separate, pdf_path, args.repeats)
+        shared = best_of(run_shared, pdf_path, args.repeats)
+
+    print(f"Document: {args.pdf or 'synthetic'} ({pages} pages)")
+    print(f"  separate opens : {separate:8.3f}s  {pages / separate:10.1f} pages/s")
+    print(f"  shared session : {shared:8.3f}s  {pages / shared:10.1f} pages/s")
+    print(f"  speedup        : {separate / shared:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
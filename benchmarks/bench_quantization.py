@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Report: memory vs recall of the local index's first-stage quantization.
+
+Usage:
+    python benchmarks/bench_quantization.py [--size 200000] [--dim 1536] [--queries 200] [--k 10]
+                                            [--rescore 1 4 16] [--vectors embeddings.npy]
+
+For each of none / int8 / pq the index is built in a temporary directory,
+then queried with a held-out query set at several re-scoring factors
+(1 = rank on the codes alone). With --vectors, rows of a saved (n, dim)
+embedding matrix are used and the last --queries rows are held out as
+queries; otherwise synthetic clustered vectors are generated.
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.embedding.ann_index import LocalANNBackend
+from src.utils.config import config
+from bench_ann_backends import build, exact_top_k, make_queries, make_vectors, measure
+
+
+def load_vectors(args, rng):
+    if args.vectors:
+        matrix = np.load(args.vectors).astype(np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix[:-args.queries], matrix[-args.queries:]
+    vectors, centers = make_vectors(args.size, args.dim, clusters=max(100, args.size // 1000), rng=rng)
+    return vectors, make_queries(centers, args.queries, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--vectors", help="optional .npy embedding matrix to use instead of synthetic data")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors, queries = load_vectors(args, rng)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(
+        f"{len(vectors):,} vectors x {vectors.shape[1]} dims, {len(queries)} held-out queries, k={args.k}, "
+        f"nprobe={config.ANN_NPROBE}, PQ subvectors={config.ANN_PQ_SUBVECTORS}"
+    )
+    print(f"  {'mode':<6} {'bytes/vec':>9} {'first stage':>12} {'rescore':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for mode in ("none", "int8", "pq"):
+        workdir = tempfile.mkdtemp(prefix="bench_quant_")
+        try:
+            index = LocalANNBackend(workdir, dtype="float32", quantization=mode)
+            start = time.perf_counter()
+            build(index, vectors)
+            if not index.trained:
+                index.train()
+            build_seconds = time.perf_counter() - start
+            stats = index.memory_stats()
+            for factor in (args.rescore if mode != "none" else [1]):
+                index.rescore_factor = factor
+                recall, p50, p99 = measure(index, queries, truth, args.k)
+                print(
+                    f"  {mode:<6} {stats['first_stage_bytes_per_vector']:>9} {stats['first_stage_mb']:>9.1f} MB "
+                    f"{factor:>8} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}"
+                )
+            print(f"  {mode:<6} built in {build_seconds:.1f}s; full vectors {stats['full_mb']:.1f} MB on disk")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
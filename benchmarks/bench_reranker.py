@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cross-encoder rerank latency at 20/50/100 candidates.
+
+Usage:
+    python benchmarks/bench_reranker.py [--candidates 20 50 100] [--repeats 5]
+                                        [--configs baseline tuned dynamic onnx]
+
+Candidates mix prose chunks with long table-JSON chunks, as retrieval
+returns them. "baseline" approximates the old defaults (the model's own
+512-token limit, batch size 32, no score cache). The others use config.RERANK_BATCH_SIZE and
+config.RERANK_MAX_LENGTH, optionally with a quantized model. Each
+configuration reports the median latency of cold calls (empty score
+cache) and of a warm repeat of the same query.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.retrieval.reranker import Reranker
+from src.utils.config import config
+
+WORDS = (
+    "revenue quarter margin table figure growth segment operating income cash flow "
+    "guidance forecast region product customer contract liability asset equity"
+).split()
+
+
+def make_candidates(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        if i % 4 == 3:
+            rows = [{w: rng.randint(0, 10 ** 6) for w in rng.sample(WORDS, 6)} for _ in range(40)]
+            content = json.dumps(rows)
+        else:
+            content = " ".join(rng.choice(WORDS) for _ in range(180))
+        chunks.append({"id": f"chunk-{i}", "content": content, "metadata": {}})
+    return chunks
+
+
+def make_reranker(name: str) -> Reranker:
+    if name == "baseline":
+        return Reranker(batch_size=32, max_length=512, quantization="none", cache_size=0)
+    if name == "tuned":
+        return Reranker(quantization="none")
+    return Reranker(quantization=name)
+
+
+def timed(reranker: Reranker, query: str, chunks):
+    start = time.perf_counter()
+    reranker.rerank(query, [dict(c) for c in chunks], top_k=config.RERANK_TOP_K)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--configs", nargs="+", default=["baseline", "tuned", "dynamic", "onnx"])
+    args = parser.parse_args()
+
+    print(f"Model: {config.RERANK_MODEL}, batch={config.RERANK_BATCH_SIZE}, max_length={config.RERANK_MAX_LENGTH}")
+    for name in args.configs:
+        reranker = make_reranker(name)
+        timed(reranker, "warm-up", make_candidates(8))
+        for count in args.candidates:
+            chunks = make_candidates(count)
+            cold = []
+            for r in range(args.repeats):
+                reranker._scores.clear()
+                cold.append(timed(reranker, f"operating margin by region {r}", chunks))
+            warm = timed(reranker, f"operating margin by region {args.repeats - 1}", chunks)
+            print(
+                f"  {name:<9} {count:4d} candidates  cold p50 {statistics.median(cold):8.1f} ms  "
+                f"max {max(cold):8.1f} ms  warm {warm:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
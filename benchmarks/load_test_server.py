@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Load test: QPS and tail latency of the headless HTTP service.
+
+Usage:
+    python benchmarks/stub_llm_server.py --port 8808 &
+    PERPLEXITY_API_KEY=local LLM_BASE_URL=http://127.0.0.1:8808 EMBEDDING_BASE_URL=http://127.0.0.1:8808 \\
+        python main.py serve --port 8000 &
+    python benchmarks/load_test_server.py [--url http://127.0.0.1:8000] [--requests 500] [--concurrency 32]
+                                          [--unique 0] [--no-generate]
+
+Requests are sent from a fixed number of concurrent clients. By default
+every question is distinct (and tagged per run), so the query cache never
+answers; --unique N cycles through N questions instead. After the run the server's /health
+statistics show how large the embedding and cross-encoder micro-batches
+were.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+import httpx
+import numpy as np
+
+TOPICS = (
+    "revenue growth", "operating margin", "cash flow", "regional sales", "customer churn",
+    "capital expenditure", "headcount", "product roadmap", "risk factors", "guidance"
+)
+
+
+RUN_TAG = uuid.uuid4().hex[:6]
+
+
+def make_question(i: int) -> str:
+    return f"What does the report say about {TOPICS[i % len(TOPICS)]} in period {i} ({RUN_TAG})?"
+
+
+async def client(http: httpx.AsyncClient, url: str, questions, results, args):
+    for i in questions:
+        payload = {"query": make_question(i % args.unique if args.unique else i), "generate": not args.no_generate}
+        start = time.perf_counter()
+        try:
+            response = await http.post(f"{url}/query", json=payload)
+            response.raise_for_status()
+            results.append((time.perf_counter() - start, response.json().get("cached", False), None))
+        except Exception as e:
+            results.append((time.perf_counter() - start, False, str(e)))
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as http:
+        health = (await http.get(f"{args.url}/health")).json()
+        print(f"{args.url}: collection '{health['collection']}' with {health['chunks']} chunks")
+        print(f"{args.requests} requests, {args.concurrency} concurrent clients, generate={not args.no_generate}")
+
+        results = []
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client(http, args.url, range(c, args.requests, args.concurrency), results, args)
+            for c in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+        latencies = np.asarray([r[0] for r in results if r[2] is None]) * 1000
+        errors = [r[2] for r in results if r[2] is not None]
+        print(f"  QPS             {len(latencies) / elapsed:8.1f}")
+        if len(latencies):
+            for p in (50, 95, 99):
+                print(f"  p{p:<2} latency     {np.percentile(latencies, p):8.1f} ms")
+            print(f"  max latency     {latencies.max():8.1f} ms")
+        print(f"  cached          {sum(r[1] for r in results):8d}")
+        print(f"  errors          {len(errors):8d}" + (f"  (first: {errors[0]})" if errors else ""))
+
+        health = (await http.get(f"{args.url}/health")).json()
+        print("Server micro-batching:")
+        print(f"  query embeddings  {json.dumps(health['embedding_batching'])}")
+        print(f"  cross-encoder     {json.dumps(health['reranker']['micro_batching'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--unique", type=int, default=0, help="distinct questions to cycle through (0 = all distinct)")
+    parser.add_argument("--no-generate", action="store_true", help="retrieval only, skip the LLM call")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except httpx.ConnectError:
+        sys.exit(f"Cannot reach {args.url}; start it with `python main.py serve` first")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Local stub of the OpenAI-compatible chat completions and embeddings APIs, for tests and demos.
+
+Usage:
+    python benchmarks/stub_llm_server.py [--port 8808] [--delay 0.03] [--first-token-delay 0.3]
+    LLM_BASE_URL=http://127.0.0.1:8808 streamlit run src/ui/app.py
+
+POST /chat/completions (or /v1/chat/completions) answers with a canned
+response. With "stream": true it is sent word by word as server-sent
+events, like the real API; otherwise as a single completion.
+
+POST /embeddings (or /v1/embeddings) returns deterministic unit vectors
+derived from each input's hash after --embedding-delay seconds per
+request, regardless of batch size; point EMBEDDING_BASE_URL here.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "Answer: This is a stubbed answer generated locally to exercise streaming. "
+    "It echoes the start of your question: {question}\n"
+    "Confidence: Medium\n"
+    "Citations: [Page 1]"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    answer = DEFAULT_ANSWER
+    delay = 0.03
+    first_token_delay = 0.3
+    embedding_delay = 0.02
+    embedding_dim = 1536
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path not in ("/chat/completions", "/v1/chat/completions", "/embeddings", "/v1/embeddings"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if path.endswith("/embeddings"):
+            self._embeddings(request)
+            return
+
+        question = request.get("messages", [{}])[-1].get("content", "")[-80:]
+        text = self.answer.format(question=" ".join(question.split()))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "stub")
+
+        if not request.get("stream"):
+            body = json.dumps({
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+            }).encode("utf-8")
+            time.sleep(self.first_token_delay + self.delay * len(text.split()))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            self._event(completion_id, model, {"content": word if i == 0 else " " + word}, None)
+            time.sleep(self.delay)
+        self._event(completion_id, model, {}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _embeddings(self, request):
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = [{"object": "embedding", "index": i, "embedding": self._vector(text)} for i, text in enumerate(inputs)]
+        body = json.dumps({
+            "object": "list", "data": data, "model": request.get("model", "stub"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0}
+        }).encode("utf-8")
+        time.sleep(self.embedding_delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _vector(self, text):
+        rng = random.Random(hashlib.sha256(" ".join(text.split()).encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.embedding_dim)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [round(v / norm, 6) for v in vector]
+
+    def _event(self, completion_id, model, delta, finish_reason):
+        chunk = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--delay", type=float, default=0.03, help="seconds between streamed words")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--answer", default=DEFAULT_ANSWER, help="canned answer; {question} is replaced")
+    parser.add_argument("--embedding-delay", type=float, default=0.02, help="seconds per embeddings request")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    StubHandler.answer = args.answer
+    StubHandler.delay = args.delay
+    StubHandler.first_token_delay = args.first_token_delay
+    StubHandler.embedding_delay = args.embedding_delay
+    StubHandler.embedding_dim = args.embedding_dim
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub LLM server on http://{args.host}:{args.port} (set LLM_BASE_URL / EMBEDDING_BASE_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
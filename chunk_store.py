@@ -0,0 +1,307 @@
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from contextlib import contextmanager
+import json
+import logging
+import mmap
+import os
+import threading
+import zlib
+
+import numpy as np
+from .config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within one process
+    fcntl = None
+
+_MAGIC = b"RAGCHNK1"
+_READ_BLOCK = 4096  # Index records copied out of the memmap at a time while reading
+COLUMNS = ("content", "metadata", "extra")
+_HEADER = np.dtype([("magic", "S8"), ("record_size", "<u4"), ("generation", "<u4")])
+_RECORD = np.dtype([
+    ("id", "S32"),
+    ("deleted", "u1"),
+    ("offset", "<u8", (len(COLUMNS),)),
+    ("length", "<u4", (len(COLUMNS),))
+])
+
+
+class ChunkStore:
+    """
+    Append-only, column-split store of processed chunks on disk.
+
+    Each column is a file of concatenated values: `content` as UTF-8,
+    the scalar `metadata` fields as compact JSON, and nested fields such as
+    a table's `raw_df` as zlib-compressed JSON in `extra`. A fixed-width index record per
+    chunk (id, tombstone flag, offset and length per column) is appended
+    after the column bytes, so a crash mid-append only leaves unreferenced
+    bytes behind. The last record for an id wins and a tombstone hides it.
+
+    Reads memory-map the index and only the requested columns, so e.g.
+    listing pages never touches chunk text and `raw_df` is never decoded
+    unless asked for. `compact` rewrites the live chunks into a new
+    generation of column files and switches to it by replacing the index.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.PROCESSED_CHUNKS_PATH
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._generation = 0
+        self._records = np.zeros(0, dtype=_RECORD)
+        self._columns: Dict[str, mmap.mmap] = {}
+        # Row numbers of live chunks in append order, and their ids sorted for lookups
+        self._live: Optional[np.ndarray] = None
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        with self._locked():
+            if not os.path.exists(self._index_path) or os.path.getsize(self._index_path) < _HEADER.itemsize:
+                self._write_index(np.zeros(0, dtype=_RECORD), generation=0)
+            self._refresh()
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, "index.bin")
+
+    def _column_path(self, name: str, generation: int = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"{name}.{generation}.bin")
+
+    def count(self) -> int:
+        """Number of live chunks"""
+        self._refresh()
+        return len(self._live_rows())
+
+    def append(self, ids: Sequence[str], chunks: Sequence[Dict]) -> None:
+        """Persist `chunks` under `ids`, superseding earlier chunks with the same id"""
+        if not ids:
+            return
+        values = [[], [], []]
+        for chunk in chunks:
+            metadata, extra = _split_fields(chunk)
+            values[0].append(str(chunk.get("content", "")).encode("utf-8"))
+            values[1].append(_dumps(metadata))
+            values[2].append(zlib.compress(_dumps(extra), 1) if extra else b"")
+
+        records = np.zeros(len(ids), dtype=_RECORD)
+        records["id"] = [chunk_id.encode("ascii") for chunk_id in ids]
+        with self._locked():
+            self._refresh()
+            for column, name in enumerate(COLUMNS):
+                with open(self._column_path(name), "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    lengths = np.fromiter((len(value) for value in values[column]), dtype=np.uint64, count=len(ids))
+                    records["offset"][:, column] = offset + np.concatenate((np.zeros(1, dtype=np.uint64), np.cumsum(lengths)[:-1]))
+                    records["length"][:, column] = lengths
+                    f.write(b"".join(values[column]))
+            self._append_records(records)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Hide chunks by id"""
+        ids = list(ids)
+        if not ids:
+            return
+        records = np.zeros(len(ids), dtype=_RECORD)
+        records["id"] = [chunk_id.encode("ascii") for chunk_id in ids]
+        records["deleted"] = 1
+        with self._locked():
+            self._refresh()
+            self._append_records(records)
+
+    def iter_chunks(self, columns: Sequence[str] = ("content", "metadata")) -> Iterator[Tuple[str, Dict]]:
+        """Yield (chunk id, chunk) for every live chunk, in append order.
+
+        Only the listed `columns` are read and decoded; a chunk is its
+        metadata fields plus `content` and the `extra` fields if requested.
+        """
+        self._refresh()
+        rows = self._live_rows()
+        for start in range(0, len(rows), _READ_BLOCK):
+            yield from self._read(rows[start:start + _READ_BLOCK], columns)
+
+    def get(self, ids: Iterable[str], columns: Sequence[str] = ("content", "metadata")) -> Dict[str, Dict]:
+        """Live chunks by id, reading only `columns`; unknown ids are omitted"""
+        self._refresh()
+        keys = np.array([chunk_id.encode("ascii") for chunk_id in ids], dtype="S32")
+        if not len(keys):
+            return {}
+        sorted_ids, rows = self._sorted_ids()
+        positions = np.minimum(np.searchsorted(sorted_ids, keys), max(len(sorted_ids) - 1, 0))
+        if not len(sorted_ids):
+            return {}
+        hits = sorted_ids[positions] == keys
+        return dict(self._read(rows[positions[hits]], columns))
+
+    def compact(self) -> Dict:
+        """Rewrite only the live chunks, dropping superseded and deleted records"""
+        with self._locked():
+            self._refresh()
+            before = self.stats()["bytes"]
+            live = self._records[self._live_rows()]
+            generation = self._generation + 1
+            records = np.zeros(len(live), dtype=_RECORD)
+            records["id"] = live["id"]
+            for column, name in enumerate(COLUMNS):
+                source = self._maps([name])[name]
+                with open(self._column_path(name, generation), "wb") as f:
+                    offset = 0
+                    for i, (start, length) in enumerate(zip(live["offset"][:, column].tolist(), live["length"][:, column].tolist())):
+                        f.write(source[start:start + length])
+                        records["offset"][i, column] = offset
+                        records["length"][i, column] = length
+                        offset += length
+            self._switch(records, generation)
+            after = self.stats()["bytes"]
+        logging.info(f"Compacted chunk store {self.path}: {len(records)} chunks, {before / 1e6:.1f} -> {after / 1e6:.1f} MB")
+        return {"chunks": len(records), "bytes_before": before, "bytes_after": after}
+
+    def clear(self) -> None:
+        with self._locked():
+            self._refresh()
+            generation = self._generation + 1
+            for name in COLUMNS:
+                open(self._column_path(name, generation), "wb").close()
+            self._switch(np.zeros(0, dtype=_RECORD), generation)
+
+    def stats(self) -> Dict:
+        self._refresh()
+        paths = [self._index_path] + [self._column_path(name) for name in COLUMNS]
+        return {
+            "chunks": len(self._live_rows()),
+            "records": len(self._records),
+            "bytes": sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        }
+
+    def _read(self, rows: np.ndarray, columns: Sequence[str]) -> Iterator[Tuple[str, Dict]]:
+        """Decode `columns` of the given index rows"""
+        maps = self._maps(columns)
+        records = self._records[rows]
+        wanted = [(COLUMNS.index(name), name, maps[name]) for name in COLUMNS if name in maps]
+        offsets, lengths = records["offset"].tolist(), records["length"].tolist()
+        for chunk_id, offset, length in zip(records["id"].tolist(), offsets, lengths):
+            chunk: Dict = {}
+            for column, name, data in wanted:
+                value = data[offset[column]:offset[column] + length[column]]
+                if name == "content":
+                    chunk["content"] = value.decode("utf-8")
+                elif value:
+                    chunk.update(json.loads(zlib.decompress(value) if name == "extra" else value))
+            yield chunk_id.decode("ascii"), chunk
+
+    def _maps(self, columns: Iterable[str]) -> Dict[str, bytes]:
+        """Read-only maps of the column files; slicing them copies only that range"""
+        maps = {}
+        for name in columns:
+            if name not in COLUMNS:
+                raise ValueError(f"Unknown chunk store column: {name!r} (expected one of {COLUMNS})")
+            if name not in self._columns:
+                path = self._column_path(name)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                if size:
+                    with open(path, "rb") as f:
+                        self._columns[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    self._columns[name] = b""
+            maps[name] = self._columns[name]
+        return maps
+
+    def _live_rows(self) -> np.ndarray:
+        if self._live is None:
+            records = self._records
+            # The last record for an id wins; a tombstone hides the chunk
+            _, first_from_end = np.unique(records["id"][::-1], return_index=True)
+            last = np.sort(len(records) - 1 - first_from_end)
+            self._live = last[records["deleted"][last] == 0]
+        return self._live
+
+    def _sorted_ids(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._sorted is None:
+            rows = self._live_rows()
+            ids = self._records["id"][rows]
+            order = np.argsort(ids)
+            self._sorted = (ids[order], rows[order])
+        return self._sorted
+
+    def _refresh(self) -> None:
+        """Remap the index if this or another process appended, compacted or cleared"""
+        stat = os.stat(self._index_path)
+        if (stat.st_ino, stat.st_size) == self._stat:
+            return
+        header = np.fromfile(self._index_path, dtype=_HEADER, count=1)[0]
+        if header["magic"] != _MAGIC or header["record_size"] != _RECORD.itemsize:
+            raise ValueError(f"{self._index_path} is not a chunk store index of this version")
+        count = (stat.st_size - _HEADER.itemsize) // _RECORD.itemsize
+        self._records = (
+            np.memmap(self._index_path, dtype=_RECORD, mode="r", offset=_HEADER.itemsize, shape=(count,))
+            if count else np.zeros(0, dtype=_RECORD)
+        )
+        self._generation = int(header["generation"])
+        self._stat = (stat.st_ino, stat.st_size)
+        # Column bytes are written before the records that point at them, so fresh maps cover every record
+        self._columns = {}
+        self._live = None
+        self._sorted = None
+
+    def _append_records(self, records: np.ndarray) -> None:
+        with open(self._index_path, "r+b") as f:
+            # Drop a record torn by a crash mid-append so the new ones stay aligned
+            size = _HEADER.itemsize + len(self._records) * _RECORD.itemsize
+            f.truncate(size)
+            f.seek(size)
+            f.write(records.tobytes())
+
+    def _switch(self, records: np.ndarray, generation: int) -> None:
+        """Atomically point the index at a new generation of column files, then drop the old ones"""
+        previous = self._generation
+        self._write_index(records, generation)
+        self._refresh()
+        for name in COLUMNS:
+            path = self._column_path(name, previous)
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.warning(f"Could not remove old chunk store file {path}: {e}")
+
+    def _write_index(self, records: np.ndarray, generation: int) -> None:
+        header = np.array([(_MAGIC, _RECORD.itemsize, generation)], dtype=_HEADER)
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(records.tobytes())
+        os.replace(tmp_path, self._index_path)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.path, "lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _split_fields(chunk: Dict) -> Tuple[Dict, Dict]:
+    """Scalar fields (as stored in backend metadata) and nested ones such as raw_df"""
+    metadata, extra = {}, {}
+    for key, value in chunk.items():
+        if key == "content":
+            continue
+        if value is None or isinstance(value, (str, int, float, bool)):
+            metadata[key] = value
+        else:
+            extra[key] = value
+    return metadata, extra
+
+
+def _dumps(value: Dict) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+__all__ = ["ChunkStore", "COLUMNS"]
@@ -14,25 +14,121 @@ class Config:
     RAW_DOCUMENTS_PATH: str = "data/raw_documents"
     PROCESSED_CHUNKS_PATH: str = "data/processed_chunks"
     VECTOR_DB_PATH: str = "data/vector_db"
+    CACHE_PATH: str = "data/cache"
     
     # Model Settings
     EMBEDDING_MODEL: str = "text-embedding-3-small"
     LLM_MODEL: str = "llama-3.1-sonar-large-128k-online"
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://api.perplexity.ai")  # Point at benchmarks/stub_llm_server.py for tests
+    LLM_TIMEOUT: float = 60.0  # Seconds; applies per read while streaming
     CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 50
     
+    # Vector Backend Settings
+    # "chroma" (PersistentClient, HNSW) or "local" (memory-mapped matrix with an IVF layer)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+    ANN_DTYPE: str = "float16"  # Storage type of the local index; float16 halves memory and disk
+    ANN_NLIST: int = 1024  # Max IVF lists (capped at 4 * sqrt(vectors))
+    ANN_NPROBE: int = 32  # IVF lists scanned per query; higher = better recall, slower
+    ANN_TRAIN_MIN: int = 20000  # Below this many vectors the local index searches exactly
+    ANN_EXACT_FILTER_ROWS: int = 50000  # Filtered queries matching at most this many rows are searched exactly
+    ANN_QUANTIZATION: str = "none"  # First-stage codes for the local index: "none", "int8" (1 byte/dim) or "pq"
+    ANN_PQ_SUBVECTORS: int = 96  # PQ bytes per vector (must divide the dimension; rounded down otherwise)
+    ANN_RESCORE_FACTOR: int = 4  # Quantized candidates re-scored at full precision, per requested result
+    
     # Retrieval Settings
+    COLLECTION_NAME: str = "documents"  # Default Chroma collection; pass a per-tenant name to VectorStore to isolate tenants
     TOP_K: int = 5
     RERANK_TOP_K: int = 3
-    SIMILARITY_THRESHOLD: float = 0.7
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_BATCH_SIZE: int = 32  # Query/chunk pairs per cross-encoder forward pass
+    RERANK_MAX_LENGTH: int = 256  # Tokens per pair; longer chunks (e.g. table JSON) are truncated
+    RERANK_CACHE_SIZE: int = 20000  # Cached (query, chunk id) scores
+    RERANK_QUANTIZATION: str = os.getenv("RERANK_QUANTIZATION", "none")  # "none", "dynamic" (int8 torch) or "onnx"
+    SIMILARITY_THRESHOLD: float = 0.7  # Dense similarity (1 - cosine distance) trusted without reranking
+    RERANK_CASCADE: bool = False  # Only let candidates the dense ranking leaves uncertain compete in the reranker
+    RERANK_MARGIN: float = 0.05  # Similarity lead over the cut-off that counts as decisive
+    HYBRID_RETRIEVAL: bool = True  # Fuse BM25 lexical and dense rankings
+    HYBRID_CANDIDATES: int = 4  # Each ranking fetches TOP_K * this many candidates before fusion
+    RRF_K: int = 60  # Reciprocal rank fusion constant
+    LEXICAL_MAX_DF_RATIO: float = 0.5  # Ignore query terms found in more than this share of chunks
+    QUERY_CACHE_ENABLED: bool = True  # Reuse retrieve/rerank results for repeated questions
+    QUERY_CACHE_SIZE: int = 1024  # Cached queries (LRU)
+    QUERY_CACHE_TTL: float = 600.0  # Seconds before a cached result is recomputed
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Estimated tokens of retrieved context sent to the LLM
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8  # Drop chunks whose 5-word shingles are this much contained in packed ones
+    ASYNC_EXECUTOR_WORKERS: int = 8  # Threads for blocking search/rerank work in the async query path
+    ASYNC_HTTP_CONNECTIONS: int = 32  # Pooled connections for concurrent async LLM calls
+    
+    # Server Settings (main.py serve)
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", 8000))
+    SERVER_EXECUTOR_WORKERS: int = 64  # Threads waiting on micro-batches; caps how many requests share a batch
+    MICRO_BATCH_MAX_QUERIES: int = 64  # Query embeddings per batched request
+    MICRO_BATCH_MAX_PAIRS: int = 256  # Query/chunk pairs per batched cross-encoder call
+    MICRO_BATCH_WAIT_MS: float = 5.0  # How long a batch waits for more concurrent requests
+    
+    # Embedding Backend Settings
+    # "remote" (Perplexity/OpenAI API) or "local" (in-process sentence-transformers).
+    # Backends produce different dimensions, so switching requires re-ingesting.
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "remote")
+    LOCAL_EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    LOCAL_EMBEDDING_DEVICE: str = "cpu"
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 64
+    
+    # Embedding Client Settings
+    EMBEDDING_BASE_URL: str = os.getenv("EMBEDDING_BASE_URL", "https://api.perplexity.ai")
+    EMBEDDING_BATCH_SIZE: int = 96  # Max inputs per embeddings request
+    EMBEDDING_BATCH_TOKENS: int = 8000  # Max estimated tokens per embeddings request
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Concurrent requests / pooled connections
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_BACKOFF_BASE: float = 1.0  # Seconds; doubled on every retry
+    EMBEDDING_BACKOFF_MAX: float = 30.0
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 0  # 0 = unlimited
+    EMBEDDING_TOKENS_PER_MINUTE: int = 0  # 0 = unlimited
+    EMBEDDING_TIMEOUT: float = 30.0
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_MB: int = 32  # In-memory LRU per process (~5000 vectors at 1536 dims)
+    EMBEDDING_CACHE_MAX_ROWS: int = 100000  # Vectors kept on disk (~600 MB at 1536 dims); least recently used go first
     
     # OCR Settings
     TESSERACT_CMD: Optional[str] = None  # Set path if needed
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+    OCR_MEMO_SIZE: int = 4096  # Distinct images whose OCR text is remembered in memory
+    OCR_LANG: str = "eng"
+    OCR_TESSERACT_CONFIG: str = ""  # Extra tesseract flags, e.g. "--psm 6"
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MAX_MB: int = 512
+    OCR_MIN_IMAGE_SIDE: int = 32  # Skip icons smaller than this many pixels on either side
+    OCR_MIN_ENTROPY: float = 1.0  # Skip near-uniform fills (grayscale entropy in bits)
+    OCR_TARGET_DPI: int = 300  # Downscale images rendered above this effective DPI
+    OCR_MAX_IMAGE_SIDE: int = 4000  # Cap on the longest side sent to tesseract
+    OCR_BINARIZE: bool = False
+    
+    # Ingestion Settings
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+    PAGE_WORKERS: int = int(os.getenv("PAGE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+    PARALLEL_PAGE_THRESHOLD: int = 50  # Split documents with at least this many pages across PAGE_WORKERS
+    INGEST_STREAM_PAGES: int = 16  # Pages extracted per window while streaming a document
+    INGEST_STREAM_BATCH_CHUNKS: int = 256  # Chunks embedded and written per vector store call
+    CHUNK_STORE_ENABLED: bool = True  # Persist processed chunks under PROCESSED_CHUNKS_PATH for `main.py rebuild`
+    INGEST_JOB_PAGE_BATCH: int = 50  # Pages stored per step of a background job; a resumed job restarts at the next batch
+    INGEST_JOB_POLL_SECONDS: float = 1.0  # Idle workers check the queue this often
+    INGEST_JOB_HEARTBEAT_SECONDS: float = 10.0
+    INGEST_JOB_STALE_SECONDS: float = 120.0  # Running jobs without a heartbeat this long are resumed by another worker
+    INGEST_JOB_MAX_ATTEMPTS: int = 3
+    
+    # Table Extraction Settings
+    TABLE_ENGINE: str = "camelot"  # "camelot" (lattice) or "pymupdf" (native, faster)
+    TABLE_PRESCAN: bool = True  # Only run the table engine on pages that look tabular
+    TABLE_MIN_RULINGS: int = 3  # Rulings a horizontal and a vertical line must each cross to form a table grid
+    TABLE_MIN_ALIGNED_ROWS: int = 3  # Consecutive lines sharing column starts that mark a page as tabular
     
     def __post_init__(self):
         # Create directories if they don't exist
         os.makedirs(self.RAW_DOCUMENTS_PATH, exist_ok=True)
         os.makedirs(self.PROCESSED_CHUNKS_PATH, exist_ok=True)
         os.makedirs(self.VECTOR_DB_PATH, exist_ok=True)
+        os.makedirs(self.CACHE_PATH, exist_ok=True)
 
 config = Config()
\ No newline at end of file
@@ -1,31 +1,45 @@
 from PIL import Image
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
+import numpy as np
 import io
-import pytesseract
-import logging
-from .base_embedder import BaseEmbedder
+from .base_embedder import BaseEmbedder, valid_rows
+from ..ingestion.ocr_engine import OCREngine
+from ..utils.ocr_cache import OCRCache
 
 
 class ImageEmbedder(BaseEmbedder):
-	"""Embed images by extracting text (OCR) and creating text embeddings."""
-
-	def _ocr_image(self, image: Image.Image) -> str:
-		try:
-			text = pytesseract.image_to_string(image)
-			return text.strip()
-		except Exception:
-			return ""
-
-	def embed_images(self, images: List[Image.Image], sources: Optional[List[Dict]] = None) -> List[Dict]:
-		"""Return embeddings for a list of PIL images.
+	"""Embed images by extracting text (OCR) and creating text embeddings.
+
+	OCR goes through an `OCREngine`, the one ingestion uses, so an image
+	keyed by its encoded bytes shares preprocessing and `OCRCache` entries
+	with the same image OCR'd while ingesting a PDF.
+	"""
+
+	def __init__(
+		self, model: Optional[str] = None, ocr_cache: Optional[OCRCache] = None, ocr_engine: Optional[OCREngine] = None
+	):
+		super().__init__(model)
+		self.ocr_engine = ocr_engine or OCREngine(cache=ocr_cache)
+
+	def _ocr_image(self, image: Union[Image.Image, bytes]) -> str:
+		if isinstance(image, Image.Image):
+			# Without the original bytes, only re-encodings of the same pixels share cache entries
+			buffer = io.BytesIO()
+			image.save(buffer, format="PNG")
+			image = buffer.getvalue()
+		return self.ocr_engine.ocr_bytes(image)
+
+	def embed_images(self, images: List[Union[Image.Image, bytes]], sources: Optional[List[Dict]] = None) -> List[Dict]:
+		"""Return embeddings for a list of images.
 
 		Args:
-			images: list of PIL `Image` objects.
+			images: list of PIL `Image` objects or encoded image bytes.
+					Pass the bytes as stored in the PDF to reuse OCR from ingestion.
 			sources: optional list of metadata dicts (one per image) that will
 					 be attached to the returned items.
 
 		Returns:
-			A list of dicts: each contains `embedding` (list[float]), `text`
+			A list of dicts: each contains `embedding` (float32 array), `text`
 			(the OCR'd text or placeholder) and `metadata`.
 		"""
 		texts = []
@@ -43,14 +57,10 @@ class ImageEmbedder(BaseEmbedder):
 			texts.append(text)
 			metadatas.append(metadata)
 
-		# Use the configured client to get embeddings for the extracted texts
-		try:
-			response = self.client.embeddings.create(input=texts, model=self.model)
-			embeddings = [d.embedding for d in response.data]
-		except Exception as e:
-			logging.error(f"Error in ImageEmbedder: {e}", exc_info=True)
-			# In case embedding call fails, return empty embeddings list of same length
-			embeddings = [[] for _ in texts]
+		# Embed the extracted texts
+		vectors = self.embed_array(texts)
+		# float32 rows; an empty array marks an item whose embedding failed
+		embeddings = [v if ok else np.empty(0, dtype=np.float32) for v, ok in zip(vectors, valid_rows(vectors))]
 
 		results = []
 		for text, emb, meta in zip(texts, embeddings, metadatas):
@@ -61,11 +71,12 @@ class ImageEmbedder(BaseEmbedder):
 	def embed_image_bytes(self, image_bytes: bytes, metadata: Optional[Dict] = None) -> Dict:
 		"""Convenience helper to embed a single image provided as raw bytes."""
 		try:
-			image = Image.open(io.BytesIO(image_bytes))
+			Image.open(io.BytesIO(image_bytes))
 		except Exception:
 			raise ValueError("Invalid image bytes provided")
 
-		return self.embed_images([image], sources=[metadata or {}])[0]
+		# Keep the encoded bytes: they are what ingestion's OCR cache is keyed on
+		return self.embed_images([image_bytes], sources=[metadata or {}])[0]
 
 
 __all__ = ["ImageEmbedder"]
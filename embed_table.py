@@ -1,8 +1,8 @@
 
 from typing import List, Dict, Optional
+import numpy as np
 import json
-import logging
-from .base_embedder import BaseEmbedder
+from .base_embedder import BaseEmbedder, valid_rows
 
 
 class TableEmbedder(BaseEmbedder):
@@ -46,12 +46,9 @@ class TableEmbedder(BaseEmbedder):
 			metadata = {k: v for k, v in t.items() if k != "content"}
 			metadatas.append(metadata)
 
-		try:
-			response = self.client.embeddings.create(input=texts, model=self.model)
-			embeddings = [d.embedding for d in response.data]
-		except Exception as e:
-			logging.error(f"Error in TableEmbedder: {e}", exc_info=True)
-			embeddings = [[] for _ in texts]
+		vectors = self.embed_array(texts)
+		# float32 rows; an empty array marks an item whose embedding failed
+		embeddings = [v if ok else np.empty(0, dtype=np.float32) for v, ok in zip(vectors, valid_rows(vectors))]
 
 		results = []
 		for text, emb, meta in zip(texts, embeddings, metadatas):
@@ -1,25 +1,16 @@
 
 from typing import List, Dict, Optional
-import logging
+import numpy as np
 from .base_embedder import BaseEmbedder
 
 
 class TextEmbedder(BaseEmbedder):
 	"""Create embeddings for text content."""
 
-	def embed_texts(self, texts: List[str]) -> List[List[float]]:
-		"""Return embeddings for a list of strings."""
-		if not texts:
-			return []
-
-		try:
-			response = self.client.embeddings.create(input=texts, model=self.model)
-			# Correctly access the embedding from the response object
-			embeddings = [d.embedding for d in response.data]
-			return embeddings
-		except Exception as e:
-			logging.error(f"Error in TextEmbedder: {e}", exc_info=True)
-			return [[] for _ in texts]
+	def embed_texts(self, texts: List[str]) -> np.ndarray:
+		"""Return an (n, dim) float32 array of embeddings for a list of strings."""
+		# Batched, cached and retried by BaseEmbedder; rows that failed are NaN
+		return self.embed_array(texts)
 
 
 __all__ = ["TextEmbedder"]
@@ -0,0 +1,67 @@
+from typing import Dict, List, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+from ..utils.config import config
+
+
+class LocalEmbeddingBackend:
+    """
+    In-process sentence-transformers model, batched on CPU.
+
+    Returns L2-normalised float32 arrays, so cosine search behaves the same
+    as with the remote embeddings. Models are loaded once per process and
+    shared between embedders. `throughput()` reports measured docs/sec.
+    """
+
+    _models: Dict[Tuple[str, str], object] = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_name: str = None, device: str = None, batch_size: int = None):
+        self.model_name = model_name or config.LOCAL_EMBEDDING_MODEL
+        self.device = device or config.LOCAL_EMBEDDING_DEVICE
+        self.batch_size = max(1, batch_size or config.LOCAL_EMBEDDING_BATCH_SIZE)
+        self.model = self._load(self.model_name, self.device)
+        self.documents = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def _load(cls, model_name: str, device: str):
+        from sentence_transformers import SentenceTransformer
+
+        with cls._models_lock:
+            key = (model_name, device)
+            if key not in cls._models:
+                logging.info(f"Loading local embedding model {model_name} on {device}")
+                cls._models[key] = SentenceTransformer(model_name, device=device)
+            return cls._models[key]
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as an (n, dimension) float32 array"""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        start = time.perf_counter()
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        self.seconds += time.perf_counter() - start
+        self.documents += len(texts)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def throughput(self) -> float:
+        """Measured documents per second over everything encoded so far"""
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+__all__ = ["LocalEmbeddingBackend"]
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from ..utils.config import config
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by (model, normalized text hash).
+
+    An in-memory LRU bounded in bytes sits in front of a SQLite file that
+    stores each vector as raw float32 bytes, so boilerplate chunks and
+    repeated questions are embedded once per model and survive restarts.
+    The file keeps at most `max_rows` vectors; the least recently written
+    or read from disk are evicted first, as in `OCRCache`.
+    """
+
+    def __init__(self, path: str = None, memory_bytes: int = None, max_rows: int = None):
+        self.path = path or os.path.join(config.CACHE_PATH, "embedding_cache.sqlite")
+        self.memory_bytes = memory_bytes or config.EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024
+        self.max_rows = max_rows or config.EMBEDDING_CACHE_MAX_ROWS
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "last_used" not in columns:
+            # Caches written before eviction existed; their entries go first
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivially different copies share an entry"""
+        return " ".join(text.split())
+
+    @classmethod
+    def make_key(cls, model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{cls.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 vectors for `texts`, None where missing"""
+        keys = [self.make_key(model, t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        from_disk = set()
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    from_disk.add(key)
+                    self._remember(key, vector)
+            if from_disk:
+                self._touch(from_disk)
+
+            results = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += 1
+                elif key in from_disk:
+                    self.disk_hits += 1
+                else:
+                    self.memory_hits += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List) -> None:
+        """Store vectors (lists or arrays); empty vectors from failed calls are skipped"""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if vector is None or len(vector) == 0:
+                    continue
+                array = np.asarray(vector, dtype=np.float32)
+                key = self.make_key(model, text)
+                self._remember(key, array)
+                rows.append((key, array.tobytes(), time.time()))
+            if not rows:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Could not write embedding cache: {e}")
+                return
+            self._rows += len(rows)
+            if self._rows > self.max_rows:
+                self._evict()
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "memory_mb": self._memory_used / (1024 * 1024),
+            "disk_rows": self._rows
+        }
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_used += vector.nbytes
+        while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.nbytes
+
+    def _touch(self, keys) -> None:
+        """Mark disk entries as used so eviction keeps them"""
+        now = time.time()
+        try:
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in keys])
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Could not update embedding cache: {e}")
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the file is back under 90% of its bound"""
+        # Other processes may have written too; re-count before deleting
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._rows - int(self.max_rows * 0.9)
+        if excess <= 0:
+            return
+        try:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self._conn.commit()
+            self._rows -= excess
+        except sqlite3.Error as e:
+            logging.warning(f"Could not evict from embedding cache: {e}")
+
+
+__all__ = ["EmbeddingCache"]
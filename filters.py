@@ -0,0 +1,64 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+
+@dataclass
+class ChunkFilter:
+    """
+    Restrict retrieval to a subset of stored chunks.
+
+    Every field is optional and the fields combine with AND. Sources are
+    matched exactly against the `source` path recorded at ingest time,
+    `page_range` is inclusive (either end may be None) and `chunk_types`
+    holds chunk types such as "text", "table", "ocr" or "chart_metadata".
+    The filter is pushed down into both the Chroma query (`to_where`) and
+    the lexical index (`to_sql`), so only matching chunks are ever ranked.
+    """
+    sources: Optional[List[str]] = None
+    page_range: Optional[Tuple[Optional[int], Optional[int]]] = None
+    chunk_types: Optional[List[str]] = None
+
+    def to_where(self) -> Optional[Dict]:
+        """Chroma `where` clause, or None when nothing is filtered"""
+        clauses = []
+        if self.sources:
+            clauses.append({"source": {"$in": list(self.sources)}})
+        first, last = self._page_bounds()
+        if first is not None:
+            clauses.append({"page": {"$gte": first}})
+        if last is not None:
+            clauses.append({"page": {"$lte": last}})
+        if self.chunk_types:
+            clauses.append({"type": {"$in": list(self.chunk_types)}})
+
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def to_sql(self, alias: str = "") -> Tuple[str, List]:
+        """SQL condition over source/page/type columns and its parameters ("" when nothing is filtered)"""
+        prefix = f"{alias}." if alias else ""
+        conditions, params = [], []
+        if self.sources:
+            conditions.append(f"{prefix}source IN ({','.join('?' * len(self.sources))})")
+            params.extend(self.sources)
+        first, last = self._page_bounds()
+        if first is not None:
+            conditions.append(f"{prefix}page >= ?")
+            params.append(first)
+        if last is not None:
+            conditions.append(f"{prefix}page <= ?")
+            params.append(last)
+        if self.chunk_types:
+            conditions.append(f"{prefix}type IN ({','.join('?' * len(self.chunk_types))})")
+            params.extend(self.chunk_types)
+        return " AND ".join(conditions), params
+
+    def _page_bounds(self) -> Tuple[Optional[int], Optional[int]]:
+        if not self.page_range:
+            return None, None
+        first, last = self.page_range
+        return (int(first) if first is not None else None, int(last) if last is not None else None)
+
+
+__all__ = ["ChunkFilter"]
@@ -1,54 +1,82 @@
 import pytesseract
-from PIL import Image
-from typing import List, Dict
-import fitz
-import io
+from typing import List, Dict, Optional
 import logging
+from .ocr_engine import OCREngine
+from ..utils.pdf_document import PDFDocument
 
 class ImageOCR:
     """Extract text from images using OCR"""
     
-    def __init__(self, tesseract_cmd=None):
+    def __init__(self, tesseract_cmd=None, engine: Optional[OCREngine] = None, workers: int = None,
+                 strict: bool = False):
         if tesseract_cmd:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self.engine = engine or OCREngine(workers=workers)
+        # Raise if tesseract failed on any image instead of leaving its text out
+        self.strict = strict
     
-    def extract_from_pdf_images(self, pdf_path: str) -> List[Dict]:
-        """Extract text from all images in PDF"""
-        try:
-            doc = fitz.open(pdf_path)
-        except Exception as e:
-            logging.error(f"Failed to open PDF for OCR {pdf_path}: {e}")
-            return []
+    def extract_from_pdf_images(self, pdf_path: str, document: Optional[PDFDocument] = None) -> List[Dict]:
+        """Extract text from all images in PDF.
 
-        ocr_results = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            image_list = page.get_images()
-            
-            for img_index, img in enumerate(image_list):
+        Each distinct image is OCR'd once: repeated xrefs (a logo on every
+        page) and byte-identical images are collapsed before the OCR pool
+        runs, then the text is fanned out to every page that shows it.
+        """
+        owns_document = document is None
+        if owns_document:
+            try:
+                document = PDFDocument(pdf_path)
+            except Exception as e:
+                logging.error(f"Failed to open PDF for OCR {pdf_path}: {e}")
+                return []
+
+        placements = []
+        xref_hashes = {}
+        images = {}
+        display_sizes = {}
+
+        for page_num in document.pages():
+            for img_index, xref in enumerate(document.page_image_xrefs(page_num)):
+                placements.append((page_num, img_index, xref))
+                if xref in xref_hashes:
+                    continue
                 try:
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    
-                    # Convert to PIL Image
-                    image = Image.open(io.BytesIO(image_bytes))
-                    
-                    # Perform OCR
-                    text = pytesseract.image_to_string(image)
-                    
-                    if text.strip():
-                        ocr_results.append({
-                            "type": "ocr",
-                            "content": text.strip(),
-                            "page": page_num + 1,
-                            "image_index": img_index + 1,
-                            "source": pdf_path
-                        })
-                
+                    image_bytes = document.extract_image(xref)["image"]
+                    key = self.engine.content_hash(image_bytes)
+                    xref_hashes[xref] = key
+                    if key not in images:
+                        images[key] = image_bytes
+                        display_sizes[key] = document.image_display_size(page_num, xref)
                 except Exception as e:
-                    logging.warning(f"OCR error on page {page_num + 1}, image {img_index + 1} in {pdf_path}: {e}")
+                    xref_hashes[xref] = None
+                    logging.warning(f"OCR error on page {page_num}, image {img_index + 1} in {pdf_path}: {e}")
+
+        if owns_document:
+            document.close()
+
+        before = dict(self.engine.preprocessor.stats)
+        texts = self.engine.ocr_images(images, display_sizes)
+        failed = sum(1 for text in texts.values() if text is None)
+        if failed and self.strict:
+            raise RuntimeError(f"OCR failed for {failed} of {len(images)} images in {pdf_path}")
+        after = self.engine.preprocessor.stats
+        logging.info(
+            f"    OCR: {len(placements)} placements, {len(images)} distinct images, "
+            f"{after['skipped_small'] - before['skipped_small']} skipped small, "
+            f"{after['skipped_low_entropy'] - before['skipped_low_entropy']} skipped low-entropy, "
+            f"{after['resized'] - before['resized']} resized"
+        )
+
+        ocr_results = []
+        for page_num, img_index, xref in placements:
+            text = texts.get(xref_hashes.get(xref))
+            if text:
+                ocr_results.append({
+                    "type": "ocr",
+                    "content": text,
+                    "page": page_num,
+                    "image_index": img_index + 1,
+                    "source": pdf_path
+                })
         
-        doc.close()
         return ocr_results
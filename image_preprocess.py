@@ -0,0 +1,111 @@
+from PIL import Image
+from typing import List, Optional, Tuple
+import threading
+from ..utils.config import config
+
+
+class ImagePreprocessor:
+    """
+    Decide which images are worth OCR and shrink the rest to what tesseract needs.
+
+    Tiny icons and near-uniform fills are skipped outright. Everything else
+    is converted to grayscale in memory and downscaled so its effective
+    resolution on the page does not exceed `target_dpi` (or `max_side`
+    pixels when the placement is unknown), optionally binarized with Otsu's
+    threshold. Counters in `stats` show how many images each rule touched.
+    """
+
+    def __init__(
+        self,
+        min_side: int = None,
+        min_entropy: float = None,
+        target_dpi: int = None,
+        max_side: int = None,
+        binarize: bool = None
+    ):
+        self.min_side = config.OCR_MIN_IMAGE_SIDE if min_side is None else min_side
+        self.min_entropy = config.OCR_MIN_ENTROPY if min_entropy is None else min_entropy
+        self.target_dpi = config.OCR_TARGET_DPI if target_dpi is None else target_dpi
+        self.max_side = config.OCR_MAX_IMAGE_SIDE if max_side is None else max_side
+        self.binarize = config.OCR_BINARIZE if binarize is None else binarize
+        self._lock = threading.Lock()
+        self.stats = {"seen": 0, "skipped_small": 0, "skipped_low_entropy": 0, "resized": 0, "binarized": 0}
+
+    def signature(self) -> str:
+        """Settings that change the OCR input, for use in cache keys"""
+        return f"pre:{self.min_side}:{self.min_entropy}:{self.target_dpi}:{self.max_side}:{int(self.binarize)}"
+
+    def prepare(self, image: Image.Image, display_size: Optional[Tuple[float, float]] = None) -> Optional[Image.Image]:
+        """Return the image to OCR, or None if it should be skipped.
+
+        `display_size` is the image's placed width and height on the page in
+        points, used to work out its effective DPI.
+        """
+        self._count("seen")
+        width, height = image.size
+        if min(width, height) < self.min_side:
+            self._count("skipped_small")
+            return None
+
+        gray = image.convert("L")
+
+        # Entropy of a thumbnail is close enough and avoids a full-size histogram pass
+        thumb = gray.copy()
+        thumb.thumbnail((256, 256))
+        if thumb.entropy() < self.min_entropy:
+            self._count("skipped_low_entropy")
+            return None
+
+        scale = self._scale_for(width, height, display_size)
+        if scale < 1.0:
+            new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            gray = gray.resize(new_size, Image.Resampling.LANCZOS)
+            self._count("resized")
+
+        if self.binarize:
+            threshold = _otsu_threshold(gray.histogram())
+            gray = gray.point(lambda p: 255 if p > threshold else 0)
+            self._count("binarized")
+
+        return gray
+
+    def _scale_for(self, width: int, height: int, display_size: Optional[Tuple[float, float]]) -> float:
+        scale = 1.0
+        if display_size and display_size[0] > 0 and self.target_dpi:
+            effective_dpi = width / (display_size[0] / 72.0)
+            if effective_dpi > self.target_dpi:
+                scale = self.target_dpi / effective_dpi
+        if self.max_side and max(width, height) * scale > self.max_side:
+            scale = self.max_side / max(width, height)
+        return scale
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Otsu's threshold for a 256-bin grayscale histogram"""
+    total = sum(histogram)
+    if not total:
+        return 128
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg, weight_bg = 0.0, 0
+    best_threshold, best_variance = 128, -1.0
+    for i, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance, best_threshold = variance, i
+    return best_threshold
+
+
+__all__ = ["ImagePreprocessor"]
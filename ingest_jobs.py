@@ -0,0 +1,343 @@
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from pathlib import Path
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from .ingest_pipeline import IngestionPipeline, pool_ocr_workers
+from .ingest_manifest import IngestManifest, plan_document
+from ..utils.config import config
+from ..utils.memory import PeakMemory
+
+_COLUMNS = (
+    "id", "source", "collection", "status", "attempts", "pages_total", "pages_done",
+    "chunks", "deleted", "error", "created", "started", "updated", "finished"
+)
+
+
+@dataclass
+class IngestJob:
+    """One document queued for ingestion into a collection"""
+    id: str
+    source: str
+    collection: str
+    status: str  # "queued", "running", "done" or "failed"
+    attempts: int = 0
+    pages_total: int = 0
+    pages_done: int = 0
+    chunks: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+    created: float = 0.0
+    started: Optional[float] = None
+    updated: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+
+class JobQueue:
+    """
+    Persistent queue of ingestion jobs in SQLite, shared by the UI and the
+    worker processes.
+
+    Jobs for one collection run one at a time, because the collection's
+    manifest and indexes have a single writer. A running job whose worker
+    stops sending heartbeats for `stale_seconds` is put back in the queue
+    and resumed by the next worker, up to `max_attempts` times.
+    """
+
+    def __init__(self, path: str = None, stale_seconds: float = None, max_attempts: int = None):
+        self.path = path or os.path.join(config.VECTOR_DB_PATH, "ingest_jobs.sqlite")
+        self.stale_seconds = stale_seconds or config.INGEST_JOB_STALE_SECONDS
+        self.max_attempts = max_attempts or config.INGEST_JOB_MAX_ATTEMPTS
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Autocommit; multi-statement updates take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, source TEXT NOT NULL, collection TEXT NOT NULL, status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0, pages_total INTEGER NOT NULL DEFAULT 0,
+                pages_done INTEGER NOT NULL DEFAULT 0, chunks INTEGER NOT NULL DEFAULT 0,
+                deleted INTEGER NOT NULL DEFAULT 0, error TEXT, worker TEXT,
+                created REAL NOT NULL, started REAL, updated REAL, finished REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created);
+            CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, pid INTEGER NOT NULL, heartbeat REAL NOT NULL);
+        """)
+
+    def submit(self, source: str, collection: str = None) -> str:
+        """Queue `source` for ingestion; an already queued or running job for it is reused"""
+        collection = collection or config.COLLECTION_NAME
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE source = ? AND collection = ? AND status IN ('queued', 'running')",
+                (source, collection)
+            ).fetchone()
+            if row:
+                return row[0]
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO jobs (id, source, collection, status, created) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, source, collection, time.time())
+            )
+            return job_id
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return IngestJob(*row) if row else None
+
+    def jobs(self, collection: str = None, limit: int = 50) -> List[IngestJob]:
+        """Most recent jobs first, optionally for one collection"""
+        where, params = ("WHERE collection = ?", [collection]) if collection else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs {where} ORDER BY created DESC LIMIT ?", params + [limit]
+            ).fetchall()
+        return [IngestJob(*row) for row in rows]
+
+    def claim(self, worker_id: str) -> Optional[IngestJob]:
+        """Atomically take the oldest runnable job, resuming stale ones first"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                    "error = CASE WHEN attempts >= ? THEN 'Worker stopped responding' ELSE error END, "
+                    "finished = CASE WHEN attempts >= ? THEN ? ELSE finished END, worker = NULL "
+                    "WHERE status = 'running' AND updated < ?",
+                    (self.max_attempts, self.max_attempts, self.max_attempts, now, now - self.stale_seconds)
+                )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' AND collection NOT IN "
+                    "(SELECT collection FROM jobs WHERE status = 'running') ORDER BY created LIMIT 1"
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                        "started = COALESCE(started, ?), updated = ? WHERE id = ?",
+                        (worker_id, now, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row else None
+
+    def update_progress(self, job_id: str, pages_done: int, pages_total: int, chunks: int, deleted: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET pages_done = ?, pages_total = ?, chunks = ?, deleted = ?, updated = ? WHERE id = ?",
+                (pages_done, pages_total, chunks, deleted, time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker = NULL, updated = ?, finished = ? WHERE id = ?",
+                ("failed" if error else "done", error, now, now, job_id)
+            )
+
+    def release(self, job_id: str) -> None:
+        """Put a running job back in the queue, e.g. when its worker is shut down"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+    def heartbeat(self, worker_id: str, job_id: Optional[str] = None) -> None:
+        """Mark the worker, and the job it is running, as alive"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers (id, pid, heartbeat) VALUES (?, ?, ?)", (worker_id, os.getpid(), now)
+            )
+            if job_id is not None:
+                self._conn.execute("UPDATE jobs SET updated = ? WHERE id = ? AND worker = ?", (now, job_id, worker_id))
+
+    def remove_worker(self, worker_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def active_workers(self) -> int:
+        """Workers that sent a heartbeat recently"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat >= ?", (time.time() - self.stale_seconds,)
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class IngestWorker:
+    """
+    Runs queued ingestion jobs until stopped; start one per worker process.
+
+    A document is extracted and stored in batches of
+    `config.INGEST_JOB_PAGE_BATCH` pages, and the ingest manifest is
+    updated after every batch. A job resumed after a crash therefore
+    re-plans the document and only extracts the pages that were not
+    stored yet. `processes` is the number of worker processes sharing the
+    machine; with more than one, each extracts pages serially and gets its
+    share of the OCR workers, so they don't each claim every core.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, poll_interval: float = None, page_batch: int = None,
+                 processes: int = 1):
+        self.queue = queue or JobQueue()
+        self.poll_interval = poll_interval or config.INGEST_JOB_POLL_SECONDS
+        self.page_batch = max(1, page_batch or config.INGEST_JOB_PAGE_BATCH)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        if processes > 1:
+            self.pipeline = IngestionPipeline(page_workers=1, ocr_workers=pool_ocr_workers(processes))
+        else:
+            self.pipeline = IngestionPipeline()
+        self._stores: Dict[str, object] = {}
+        self._current_job: Optional[str] = None
+        self._stop = threading.Event()
+
+    def run(self, once: bool = False) -> None:
+        """Process jobs until `stop` is called (or the queue is empty, with `once`)"""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingest-heartbeat", daemon=True)
+        heartbeat.start()
+        logging.info(f"Ingest worker {self.worker_id} started")
+        try:
+            while not self._stop.is_set():
+                job = self.queue.claim(self.worker_id)
+                if job is None:
+                    if once:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run_job(job)
+        finally:
+            self._stop.set()
+            if self._current_job is not None:
+                # Interrupted mid-document: the next worker resumes it from the last stored batch
+                self.queue.release(self._current_job)
+            self.queue.remove_worker(self.worker_id)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_job(self, job: IngestJob) -> None:
+        self._current_job = job.id
+        logging.info(f"Job {job.id[:8]}: ingesting {job.source} into '{job.collection}' (attempt {job.attempts})")
+        try:
+            with PeakMemory() as memory:
+                self._ingest(job)
+            self.queue.finish(job.id)
+            peak = f", peak RSS {memory.peak_mb:.0f} MB" if memory.peak_mb is not None else ""
+            logging.info(f"Job {job.id[:8]}: done{peak}")
+        except Exception as e:
+            logging.error(f"Job {job.id[:8]}: {job.source} failed: {e}", exc_info=True)
+            self.queue.finish(job.id, error=str(e))
+        # Left set on KeyboardInterrupt/SystemExit so `run` can release the job
+        self._current_job = None
+
+    def _ingest(self, job: IngestJob) -> None:
+        if not os.path.exists(job.source):
+            raise FileNotFoundError(f"File not found: {job.source}")
+
+        vector_store = self._store(job.collection)
+        manifest = IngestManifest(vector_store.manifest_path)
+        manifest.sync(vector_store.count())
+        plan = plan_document(job.source, manifest.get(job.source))
+        if plan.unchanged:
+            self.queue.update_progress(job.id, job.pages_done, job.pages_done, job.chunks, job.deleted)
+            return
+
+        # On a resumed job the pages stored by earlier attempts are no longer in the plan
+        pages = plan.changed_pages
+        pages_done, chunks_stored, deleted = job.pages_done, job.chunks, job.deleted
+        pages_total = pages_done + len(pages)
+        self.queue.update_progress(job.id, pages_done, pages_total, chunks_stored, deleted)
+
+        batches = [pages[i:i + self.page_batch] for i in range(0, len(pages), self.page_batch)] or [[]]
+        failed_pages: List[int] = []
+        for n, batch in enumerate(batches, 1):
+            batch_failed: List[int] = []
+            chunks = self.pipeline.process_document(job.source, pages=batch, failed_pages=batch_failed) if batch else []
+            stored_ids = vector_store.add_chunks(chunks)
+            batch_plan = plan.partial(batch, manifest.get(job.source), final=n == len(batches))
+            stale_ids = manifest.record(batch_plan, chunks, stored_ids, batch_failed)
+            failed_pages.extend(batch_failed)
+            vector_store.delete_chunks(stale_ids)
+
+            pages_done += len(batch)
+            chunks_stored += sum(1 for i in stored_ids if i is not None)
+            deleted += len(stale_ids)
+            self.queue.update_progress(job.id, pages_done, pages_total, chunks_stored, deleted)
+
+        if failed_pages:
+            # The rest of the document is stored; the manifest leaves these pages for the next attempt
+            raise RuntimeError(f"Extraction failed for pages {', '.join(map(str, sorted(failed_pages)))}")
+
+    def _store(self, collection: str):
+        from ..embedding.vector_store import VectorStore
+
+        if collection not in self._stores:
+            self._stores[collection] = VectorStore(collection)
+        vector_store = self._stores[collection]
+        # Another worker process may have written to the collection since
+        vector_store.refresh()
+        return vector_store
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.queue.heartbeat(self.worker_id, self._current_job)
+            except sqlite3.Error as e:
+                logging.warning(f"Ingest worker heartbeat failed: {e}")
+            self._stop.wait(config.INGEST_JOB_HEARTBEAT_SECONDS)
+
+
+def ensure_worker(queue: JobQueue) -> bool:
+    """Start a background `main.py worker` process unless one is alive; True if one was started"""
+    if queue.active_workers() > 0:
+        return False
+    project_root = Path(__file__).resolve().parents[2]
+    subprocess.Popen(
+        [sys.executable, str(project_root / "main.py"), "worker"],
+        cwd=str(project_root),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    return True
+
+
+def run_worker(once: bool = False, processes: int = 1) -> None:
+    """Entry point of a worker process, one of `processes` started together"""
+    worker = IngestWorker(processes=processes)
+    try:
+        worker.run(once=once)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+__all__ = ["IngestJob", "JobQueue", "IngestWorker", "ensure_worker", "run_worker"]
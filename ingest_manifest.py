@@ -0,0 +1,240 @@
+from typing import List, Dict, Iterable, Optional
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from ..utils.config import config
+from ..utils.pdf_document import PDFDocument
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialised within one process
+    fcntl = None
+
+
+@dataclass
+class DocumentPlan:
+    """What needs re-ingesting for one document, compared with the manifest"""
+    source: str
+    file_hash: str
+    page_hashes: Dict[int, str] = field(default_factory=dict)
+    changed_pages: List[int] = field(default_factory=list)
+    removed_pages: List[int] = field(default_factory=list)
+    unchanged: bool = False
+
+    def partial(self, pages: List[int], previous: Optional[Dict], final: bool) -> "DocumentPlan":
+        """Plan that records only `pages` as ingested, for storing a document in page batches.
+
+        Changed pages outside `pages` keep their fingerprint from `previous`
+        (the current manifest entry), or None if they have none yet, so an
+        interrupted run is re-planned to exactly the pages it had not stored
+        yet. The file hash is only recorded with the `final` batch.
+        """
+        batch = set(pages)
+        changed = set(self.changed_pages)
+        old_hashes = {int(p): h for p, h in (previous or {}).get("page_hashes", {}).items()}
+        page_hashes = {}
+        for page, page_hash in self.page_hashes.items():
+            if page in batch or page not in changed:
+                page_hashes[page] = page_hash
+            else:
+                page_hashes[page] = old_hashes.get(page)
+        return DocumentPlan(
+            self.source, self.file_hash if final else None, page_hashes, sorted(batch), list(self.removed_pages)
+        )
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def plan_document(pdf_path: str, previous: Optional[Dict]) -> DocumentPlan:
+    """Work out which pages of a document changed since it was last ingested.
+
+    An identical file is skipped without opening it. Otherwise every page is
+    fingerprinted and only new or modified pages are scheduled.
+    """
+    current_hash = file_hash(pdf_path)
+    if previous and previous.get("file_hash") == current_hash:
+        return DocumentPlan(pdf_path, current_hash, unchanged=True)
+
+    old_pages = {int(p): h for p, h in (previous or {}).get("page_hashes", {}).items()}
+    with PDFDocument(pdf_path) as document:
+        page_hashes = {p: document.page_hash(p) for p in document.pages()}
+
+    changed = [p for p, h in page_hashes.items() if old_pages.get(p) != h]
+    removed = sorted(p for p in old_pages if p not in page_hashes)
+    return DocumentPlan(pdf_path, current_hash, page_hashes, changed, removed)
+
+
+class IngestManifest:
+    """
+    Record of what has been ingested: file hash, per-page fingerprints and
+    the chunk ids stored for every page of each document.
+
+    Lives next to the vector DB as JSON. `record` returns the ids that are no
+    longer produced by the document so the caller can delete them.
+
+    The UI, the CLI and ingest workers may all hold a manifest for the same
+    collection. Every update re-reads the file under a file lock and
+    changes only its own document before writing it back, and reads pick
+    up files replaced by other processes, so no process overwrites another
+    one's entries.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config.VECTOR_DB_PATH, "ingest_manifest.json")
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Dict] = {}
+        self._stat = None
+        self._reload()
+
+    def get(self, source: str) -> Optional[Dict]:
+        self._reload()
+        return self._documents.get(source)
+
+    def sources(self) -> List[str]:
+        """Paths of all recorded documents"""
+        self._reload()
+        return sorted(self._documents)
+
+    def record(
+        self, plan: DocumentPlan, chunks: List[Dict], stored_ids: List[Optional[str]],
+        failed_pages: Iterable[int] = ()
+    ) -> List[str]:
+        """Update the manifest after storing `chunks` for `plan`; returns stale chunk ids.
+
+        `failed_pages` are changed pages that could not be extracted: they
+        keep their old chunk ids and stay unfingerprinted, so the next run
+        retries them instead of treating them as empty.
+        """
+        with self._locked():
+            stale = self._record(plan, chunks, stored_ids, failed_pages)
+            self.save()
+        return stale
+
+    def _record(
+        self, plan: DocumentPlan, chunks: List[Dict], stored_ids: List[Optional[str]], failed_pages: Iterable[int]
+    ) -> List[str]:
+        unextracted = {str(p) for p in failed_pages}
+        previous = self._documents.get(plan.source, {})
+        old_ids = previous.get("chunk_ids", {})
+
+        new_ids: Dict[str, List[str]] = {}
+        unembedded = set()
+        for chunk, chunk_id in zip(chunks, stored_ids):
+            page = str(chunk.get("page"))
+            if chunk_id is None:
+                unembedded.add(page)
+            else:
+                new_ids.setdefault(page, []).append(chunk_id)
+
+        changed = {str(p) for p in plan.changed_pages}
+        page_hashes = {}
+        chunk_ids = {}
+        stale = []
+        for page, page_hash in plan.page_hashes.items():
+            page = str(page)
+            if page not in changed:
+                if page_hash is not None:
+                    page_hashes[page] = page_hash
+                chunk_ids[page] = old_ids.get(page, [])
+                continue
+            if page in unextracted:
+                # Nothing new was stored for the page; keep serving its old chunks until a retry succeeds
+                chunk_ids[page] = old_ids.get(page, [])
+                continue
+            current = new_ids.get(page, [])
+            current_set = set(current)
+            stale.extend(i for i in old_ids.get(page, []) if i not in current_set)
+            chunk_ids[page] = current
+            # A page with failed embeddings is left unfingerprinted so the next run retries it
+            if page not in unembedded:
+                page_hashes[page] = page_hash
+
+        for page in plan.removed_pages:
+            stale.extend(old_ids.get(str(page), []))
+
+        entry = {"file_hash": plan.file_hash, "page_hashes": page_hashes, "chunk_ids": chunk_ids}
+        if len(page_hashes) < len(plan.page_hashes):
+            # Some page still needs a retry (possibly from an earlier batch): force a
+            # page-level comparison next time instead of a whole-file skip
+            entry["file_hash"] = None
+
+        self._documents[plan.source] = entry
+        return stale
+
+    def sync(self, stored_chunk_count: int) -> None:
+        """Forget everything if the vector store was cleared behind our back"""
+        self._reload()
+        if stored_chunk_count == 0 and self._documents:
+            logging.info("Vector store is empty; resetting ingest manifest")
+            self.clear()
+
+    def remove(self, source: str) -> List[str]:
+        """Forget a document; returns all of its chunk ids"""
+        with self._locked():
+            entry = self._documents.pop(source, None)
+            self.save()
+        if not entry:
+            return []
+        return [i for ids in entry.get("chunk_ids", {}).values() for i in ids]
+
+    def clear(self) -> None:
+        with self._locked():
+            self._documents = {}
+            self.save()
+
+    def save(self) -> None:
+        """Write the manifest; call inside `_locked` so other processes' entries are merged first"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._documents, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._stat = self._file_stat()
+
+    def _reload(self) -> None:
+        """Re-read the file if another process has replaced it since it was last read"""
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._documents = json.load(f)
+            self._stat = stat
+        except Exception as e:
+            logging.warning(f"Could not read ingest manifest {self.path}, keeping what was loaded: {e}")
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access across threads and processes, with the latest file contents loaded"""
+        with self._lock:
+            if fcntl is None:
+                self._reload()
+                yield
+                return
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+__all__ = ["IngestManifest", "DocumentPlan", "plan_document"]
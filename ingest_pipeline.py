@@ -1,5 +1,7 @@
-from typing import List, Dict
-import json
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 import logging
 
@@ -8,73 +10,268 @@ from .table_extractor import TableExtractor
 from .image_ocr import ImageOCR
 from .chart_metadata import ChartMetadataExtractor
 from .chunker import Chunker
+from .ingest_manifest import IngestManifest, plan_document
+from ..utils.chunk_store import ChunkStore
 from ..utils.config import config
+from ..utils.memory import PeakMemory
+from ..utils.pdf_document import PDFDocument
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class IngestionPipeline:
-    """Main pipeline for document ingestion"""
+    """Main pipeline for document ingestion.
+
+    `ocr_workers` caps the tesseract processes this pipeline runs at once.
+    It defaults to `config.OCR_WORKERS` (all cores), which is only right for
+    a single process; pipelines inside a process pool get their share from
+    `pool_ocr_workers`.
+    """
     
-    def __init__(self):
+    def __init__(self, page_workers: int = None, ocr_workers: int = None):
         self.text_extractor = TextExtractor()
-        self.table_extractor = TableExtractor()
-        self.ocr = ImageOCR()
+        # Strict extractors raise instead of returning what they found, so failed pages are retried
+        self.table_extractor = TableExtractor(strict=True)
+        self.ocr = ImageOCR(workers=ocr_workers, strict=True)
         self.chart_extractor = ChartMetadataExtractor()
         self.chunker = Chunker()
+        self.page_workers = max(1, page_workers or config.PAGE_WORKERS)
     
-    def process_document(self, pdf_path: str) -> List[Dict]:
-        """Process a single document, making the process more robust with error handling."""
-        doc_path = Path(pdf_path)
-        if not doc_path.exists():
-            logging.error(f"File not found: {pdf_path}")
-            return []
+    def process_document(
+        self, pdf_path: str, pages: Optional[Iterable[int]] = None, failed_pages: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """Process a single document into a list of chunks.
 
+        `pages` limits extraction to those 1-based page numbers, e.g. the
+        pages that changed since the last ingest. Pages that could not be
+        extracted are appended to `failed_pages`, see `iter_pages`. Use
+        `iter_pages` to stream a large document instead of holding all of
+        its chunks.
+        """
         logging.info(f"Processing: {pdf_path}")
-        all_chunks = []
-        
-        try:
-            # 1. Extract text
-            logging.info("  - Extracting text...")
-            text_chunks = self.text_extractor.extract_from_pdf(pdf_path)
-            all_chunks.extend(text_chunks)
-            
-            # 2. Extract tables
-            logging.info("  - Extracting tables...")
-            table_chunks = self.table_extractor.extract_tables_from_pdf(pdf_path)
-            all_chunks.extend(table_chunks)
-            
-            # 3. Extract OCR from images
-            logging.info("  - Running OCR on images...")
-            ocr_chunks = self.ocr.extract_from_pdf_images(pdf_path)
-            all_chunks.extend(ocr_chunks)
-            
-            # 4. Extract chart metadata from text chunks
-            logging.info("  - Extracting chart metadata...")
-            for chunk in text_chunks:
-                charts = self.chart_extractor.extract_chart_info(
-                    chunk["content"], 
-                    chunk["page"], 
-                    chunk["source"]
-                )
-                all_chunks.extend(charts)
+        final_chunks = [
+            chunk for page_chunks in self.iter_pages(pdf_path, pages, failed_pages) for chunk in page_chunks
+        ]
+        logging.info(f"  ✓ Generated {len(final_chunks)} chunks for {pdf_path}")
+        return final_chunks
+
+    def iter_pages(
+        self, pdf_path: str, pages: Optional[Iterable[int]] = None, failed_pages: Optional[List[int]] = None
+    ) -> Iterator[List[Dict]]:
+        """Yield the final chunks of a document one page at a time, in page order.
+
+        Pages are extracted `config.INGEST_STREAM_PAGES` at a time, so memory
+        follows that window rather than the document. Documents with at least
+        `config.PARALLEL_PAGE_THRESHOLD` pages spread their windows over the
+        page workers, with only a few windows in flight. Pages without any
+        content yield nothing.
+
+        A window that fails to extract (an extractor error or a crashed
+        worker) yields nothing either, but its pages are appended to
+        `failed_pages` so the caller can tell them from empty pages and
+        keep what was stored for them before.
+        """
+        pages = None if pages is None else list(pages)
+        failed_pages = [] if failed_pages is None else failed_pages
+        if not Path(pdf_path).exists():
+            logging.error(f"File not found: {pdf_path}")
+            failed_pages.extend(pages or [])
+            return
 
+        try:
+            with PDFDocument(pdf_path, pages=pages) as document:
+                page_list = list(document.pages())
         except Exception as e:
-            logging.error(f"A critical error occurred during extraction for {pdf_path}: {e}", exc_info=True)
-            # Depending on desired behavior, you might want to return here or continue with what was extracted.
-            # For now, we'll continue to the chunking step with what we have.
+            logging.error(f"Failed to open PDF {pdf_path}: {e}", exc_info=True)
+            failed_pages.extend(pages or [])
+            return
+
+        size = max(1, config.INGEST_STREAM_PAGES)
+        windows = [page_list[i:i + size] for i in range(0, len(page_list), size)]
+        if self.page_workers > 1 and len(page_list) >= config.PARALLEL_PAGE_THRESHOLD:
+            extracted_windows = self._extract_windows_parallel(pdf_path, windows)
+        else:
+            extracted_windows = self._extract_windows(pdf_path, windows)
+
+        for window, extracted in extracted_windows:
+            if extracted is None:
+                failed_pages.extend(window)
+                continue
+            by_page: Dict[int, List[Dict]] = defaultdict(list)
+            tables_on_page: Dict[int, int] = defaultdict(int)
+            # Same modality order within a page as before (text, tables, OCR, chart metadata), so chunk ids are stable
+            for kind in ("text", "table", "ocr", "chart_metadata"):
+                for chunk in extracted[kind]:
+                    if kind == "table":
+                        # Table engines number tables per call, i.e. per window. Number them within
+                        # their page instead, which doesn't depend on which pages were re-extracted
+                        tables_on_page[chunk["page"]] += 1
+                        chunk["table_index"] = tables_on_page[chunk["page"]]
+                    # The chunker can decide if a chunk needs splitting
+                    by_page[chunk["page"]].extend(self.chunker.process_chunk(chunk))
+            for page in sorted(by_page):
+                yield by_page[page]
+
+    def extract(self, pdf_path: str, document: PDFDocument) -> Dict[str, List[Dict]]:
+        """Run every extractor over the pages in `document`, grouped by modality.
+
+        Extractor errors are raised rather than logged, so the caller can
+        mark the pages as failed instead of storing them as empty.
+        """
+        extracted = {"text": [], "table": [], "ocr": [], "chart_metadata": []}
         
-        # 5. Chunk all applicable items for better retrieval
-        logging.info("  - Chunking extracted content...")
-        final_chunks = []
-        for chunk in all_chunks:
-            # The chunker can decide if a chunk needs splitting
-            final_chunks.extend(self.chunker.process_chunk(chunk))
+        # 1. Extract text
+        logging.info("  - Extracting text...")
+        extracted["text"] = self.text_extractor.extract_from_pdf(pdf_path, document)
         
-        logging.info(f"  ✓ Generated {len(final_chunks)} chunks for {pdf_path}")
-        return final_chunks
+        # 2. Extract tables
+        logging.info("  - Extracting tables...")
+        extracted["table"] = self.table_extractor.extract_tables_from_pdf(pdf_path, document)
+        
+        # 3. Extract OCR from images
+        logging.info("  - Running OCR on images...")
+        extracted["ocr"] = self.ocr.extract_from_pdf_images(pdf_path, document)
+        
+        # 4. Extract chart metadata from text chunks
+        logging.info("  - Extracting chart metadata...")
+        for chunk in extracted["text"]:
+            charts = self.chart_extractor.extract_chart_info(
+                chunk["content"], 
+                chunk["page"], 
+                chunk["source"]
+            )
+            extracted["chart_metadata"].extend(charts)
+        
+        return extracted
+
+    def _extract_windows(self, pdf_path: str, windows: List[List[int]]) -> Iterator[Tuple[List[int], Optional[Dict]]]:
+        """Extract page windows in this process, sharing one open file.
+
+        Yields (window, extracted), with None for a window that failed.
+        """
+        with PDFDocument(pdf_path) as document:
+            for window in windows:
+                try:
+                    with document.view(window) as view:
+                        extracted = self.extract(pdf_path, view)
+                except Exception as e:
+                    logging.error(f"Extraction failed for pages {window[0]}-{window[-1]} of {pdf_path}: {e}", exc_info=True)
+                    extracted = None
+                yield window, extracted
+
+    def _extract_windows_parallel(self, pdf_path: str, windows: List[List[int]]) -> Iterator[Tuple[List[int], Optional[Dict]]]:
+        """Extract page windows on worker processes, yielding (window, extracted) in page order.
+
+        At most two windows per worker are in flight, so extracted pages
+        don't pile up while the consumer is busy embedding. A window whose
+        extraction failed comes back as None.
+        """
+        logging.info(f"  - Extracting {len(windows)} page windows on {self.page_workers} workers...")
+        with ProcessPoolExecutor(max_workers=self.page_workers) as pool:
+            pending = iter(windows)
+            ocr_workers = pool_ocr_workers(self.page_workers)
+            in_flight = deque(
+                (window, pool.submit(_extract_page_range, pdf_path, window, ocr_workers))
+                for window in islice(pending, self.page_workers * 2)
+            )
+            while in_flight:
+                window, future = in_flight.popleft()
+                following = next(pending, None)
+                if following is not None:
+                    in_flight.append((following, pool.submit(_extract_page_range, pdf_path, following, ocr_workers)))
+                try:
+                    extracted = future.result()
+                except Exception as e:
+                    logging.error(f"Extraction failed for pages {window[0]}-{window[-1]} of {pdf_path}: {e}", exc_info=True)
+                    extracted = None
+                yield window, extracted
+
+    def ingest(self, pdf_path: str, vector_store, manifest: Optional[IngestManifest] = None) -> Dict:
+        """Incrementally ingest a document into `vector_store`.
+
+        Unchanged files are skipped, only changed pages are re-extracted and
+        re-embedded, and chunks that no longer exist are deleted. Chunks
+        stream page by page into the store in batches of about
+        `config.INGEST_STREAM_BATCH_CHUNKS`, so neither the document's chunks
+        nor their embeddings are ever held at once. Pages that failed to
+        extract keep their previously stored chunks and are retried by the
+        next ingest; the result lists them in `failed_pages` and reports the
+        peak RSS while ingesting.
+        """
+        with PeakMemory() as memory:
+            result = self._ingest(pdf_path, vector_store, manifest)
+        result["peak_rss_mb"] = memory.peak_mb
+        if memory.peak_mb is not None and not result["skipped"]:
+            logging.info(
+                f"  ✓ Stored {result['chunks']} chunks for {pdf_path}, peak RSS {memory.peak_mb:.0f} MB"
+                f"{'' if memory.exact else ' (process lifetime)'}"
+            )
+        return result
+
+    def _ingest(self, pdf_path: str, vector_store, manifest: Optional[IngestManifest]) -> Dict:
+        manifest = manifest or IngestManifest(vector_store.manifest_path)
+        manifest.sync(vector_store.count())
+        plan = plan_document(pdf_path, manifest.get(pdf_path))
+        if plan.unchanged:
+            logging.info(f"  ✓ {pdf_path} unchanged since last ingest, skipping")
+            return {"skipped": True, "chunks": 0, "changed_pages": 0, "deleted": 0, "failed_pages": []}
+
+        logging.info(f"Processing: {pdf_path}")
+        placements: List[Dict] = []
+        stored_ids: List[Optional[str]] = []
+        failed_pages: List[int] = []
+        pages = self.iter_pages(pdf_path, plan.changed_pages, failed_pages)
+        for batch in batch_pages(pages, config.INGEST_STREAM_BATCH_CHUNKS):
+            stored_ids.extend(vector_store.add_chunks(batch))
+            # The manifest only needs each chunk's page; the chunk itself is dropped here
+            placements.extend({"page": chunk.get("page")} for chunk in batch)
+        stale_ids = manifest.record(plan, placements, stored_ids, failed_pages)
+        vector_store.delete_chunks(stale_ids)
+        if failed_pages:
+            logging.warning(f"  ✗ {len(failed_pages)} pages of {pdf_path} failed to extract and will be retried")
+        return {
+            "skipped": False,
+            "chunks": len(placements),
+            "changed_pages": len(plan.changed_pages),
+            "deleted": len(stale_ids),
+            "failed_pages": sorted(failed_pages)
+        }
     
     def save_chunks(self, chunks: List[Dict], output_path: str):
-        """Save processed chunks to JSON"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+        """Append processed chunks to the binary chunk store in the `output_path` directory"""
+        from ..embedding.vector_store import chunk_ids
+
+        ChunkStore(output_path).append(chunk_ids(chunks), chunks)
         logging.info(f"  ✓ Saved {len(chunks)} chunks to {output_path}")
+
+
+def batch_pages(pages: Iterable[List[Dict]], max_chunks: int) -> Iterator[List[Dict]]:
+    """Group per-page chunk lists into batches of about `max_chunks`, never splitting a page.
+
+    Chunk ids number the chunks within a page per `add_chunks` call, so a
+    page must always be stored in one call.
+    """
+    batch: List[Dict] = []
+    for page_chunks in pages:
+        batch.extend(page_chunks)
+        if len(batch) >= max_chunks:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pool_ocr_workers(pool_size: int) -> int:
+    """OCR threads per process when `pool_size` processes share the `config.OCR_WORKERS` budget"""
+    return max(1, config.OCR_WORKERS // max(1, pool_size))
+
+
+# Serial pipeline reused by each page-range worker process
+_range_pipeline: Optional[IngestionPipeline] = None
+
+
+def _extract_page_range(pdf_path: str, pages: Iterable[int], ocr_workers: int = 1) -> Dict[str, List[Dict]]:
+    global _range_pipeline
+    if _range_pipeline is None:
+        _range_pipeline = IngestionPipeline(page_workers=1, ocr_workers=ocr_workers)
+    with PDFDocument(pdf_path, pages=pages) as document:
+        return _range_pipeline.extract(pdf_path, document)
@@ -0,0 +1,215 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter, defaultdict
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from .filters import ChunkFilter
+from ..utils.config import config
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compounds such as part numbers are kept whole and also split"""
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        parts = _PART_RE.findall(match)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index over chunk contents.
+
+    Postings are stored in SQLite clustered by term, so a query only reads
+    the posting lists of its own terms instead of rescoring every chunk.
+    Document frequencies, document lengths and corpus totals are maintained
+    incrementally as chunks are added and deleted. Each chunk's source,
+    page and type are stored alongside it so a `ChunkFilter` restricts the
+    scan before scoring.
+    """
+
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path or os.path.join(config.VECTOR_DB_PATH, "lexical_index.sqlite")
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            # Derived data: an index in an older layout is dropped and rebuilt by the vector store
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS postings;
+                DROP TABLE IF EXISTS docs;
+                DROP TABLE IF EXISTS terms;
+                DROP TABLE IF EXISTS stats;
+            """)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chunk_id TEXT UNIQUE NOT NULL,
+                length INTEGER NOT NULL,
+                source TEXT,
+                page INTEGER,
+                type TEXT
+            );
+            CREATE INDEX IF NOT EXISTS docs_source ON docs(source, page);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO stats VALUES ('docs', 0), ('total_length', 0);
+        """)
+        self._conn.commit()
+
+    def count(self) -> int:
+        return self._stat("docs")
+
+    def add(self, chunk_ids: List[str], texts: List[str], metadatas: Optional[List[Dict]] = None) -> None:
+        """Index chunks; re-adding an existing chunk id replaces its postings"""
+        if not chunk_ids:
+            return
+        metadatas = metadatas or [{}] * len(chunk_ids)
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            df_updates = Counter()
+            total_length = 0
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                cursor = self._conn.execute(
+                    "INSERT INTO docs (chunk_id, length, source, page, type) VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, length, metadata.get("source"), metadata.get("page"), metadata.get("type"))
+                )
+                doc_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in counts.items()]
+                )
+                df_updates.update(counts.keys())
+                total_length += length
+            self._bump_terms(df_updates)
+            self._bump_stat("docs", len(chunk_ids))
+            self._bump_stat("total_length", total_length)
+            self._conn.commit()
+
+    def delete(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._delete_locked(list(chunk_ids))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript("""
+                DELETE FROM postings;
+                DELETE FROM docs;
+                DELETE FROM terms;
+                UPDATE stats SET value = 0;
+            """)
+            self._conn.commit()
+
+    def search(self, query: str, top_k: int = 10, chunk_filter: Optional[ChunkFilter] = None) -> List[Tuple[str, float]]:
+        """BM25 top-k as (chunk_id, score), best first, over chunks matching `chunk_filter`"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = self._stat("docs")
+            if not n_docs:
+                return []
+            avg_length = self._stat("total_length") / n_docs
+
+            placeholders = ",".join("?" * len(terms))
+            dfs = dict(self._conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms
+            ).fetchall())
+            # Very common terms carry almost no signal but have huge posting lists
+            query_terms = [t for t in terms if t in dfs and dfs[t] / n_docs <= config.LEXICAL_MAX_DF_RATIO]
+            if not query_terms and dfs:
+                query_terms = [min(dfs, key=dfs.get)]
+
+            condition, filter_params = chunk_filter.to_sql("d") if chunk_filter is not None else ("", [])
+            sql = "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id WHERE p.term = ?"
+            if condition:
+                sql += f" AND {condition}"
+
+            scores: Dict[int, float] = defaultdict(float)
+            for term in query_terms:
+                df = dfs[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                rows = self._conn.execute(sql, [term] + filter_params)
+                for doc_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            if not best:
+                return []
+            ids = dict(self._conn.execute(
+                f"SELECT doc_id, chunk_id FROM docs WHERE doc_id IN ({','.join('?' * len(best))})",
+                [doc_id for doc_id, _ in best]
+            ).fetchall())
+        return [(ids[doc_id], score) for doc_id, score in best]
+
+    def _delete_locked(self, chunk_ids: List[str]) -> None:
+        removed_docs, removed_length = 0, 0
+        df_updates = Counter()
+        for chunk_id in chunk_ids:
+            row = self._conn.execute("SELECT doc_id, length FROM docs WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is None:
+                continue
+            doc_id, length = row
+            terms = [t for (t,) in self._conn.execute("SELECT term FROM postings WHERE doc_id = ?", (doc_id,))]
+            df_updates.update({t: -1 for t in terms})
+            self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            removed_docs += 1
+            removed_length += length
+        if removed_docs:
+            self._bump_terms(df_updates)
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            self._bump_stat("docs", -removed_docs)
+            self._bump_stat("total_length", -removed_length)
+
+    def _bump_terms(self, df_updates: Counter) -> None:
+        self._conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+            list(df_updates.items())
+        )
+
+    def _stat(self, key: str) -> int:
+        return self._conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()[0]
+
+    def _bump_stat(self, key: str, delta: int) -> None:
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = ?", (delta, key))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank)"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, 1):
+            scores[chunk_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+__all__ = ["LexicalIndex", "reciprocal_rank_fusion", "tokenize"]
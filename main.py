@@ -11,6 +11,111 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+
+def run_batch_ingest(args):
+    """Ingest PDFs across a process pool and store the chunks as each one finishes"""
+    import argparse
+    from src.ingestion.batch_ingest import BatchIngestor
+    from src.embedding.vector_store import VectorStore
+
+    parser = argparse.ArgumentParser(prog="main.py ingest", description="Batch-ingest PDF documents")
+    parser.add_argument("paths", nargs="+", help="PDF files or directories containing PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: config.INGEST_WORKERS)")
+    parser.add_argument("--collection", default=None, help="target collection, e.g. one per tenant (default: config.COLLECTION_NAME)")
+    opts = parser.parse_args(args)
+
+    ingestor = BatchIngestor(vector_store=VectorStore(opts.collection), workers=opts.workers)
+    pdf_paths = ingestor.expand_paths(opts.paths)
+    if not pdf_paths:
+        print("No PDF documents found.")
+        return
+
+    print(f"Ingesting {len(pdf_paths)} document(s) with {ingestor.workers} worker(s)...")
+
+    def report(done, total, result):
+        if not result.ok:
+            status = f"✗ {result.error}"
+        elif result.skipped:
+            status = "✓ unchanged, skipped"
+        else:
+            status = f"✓ {result.chunk_count} chunks in {result.seconds:.1f}s"
+            if result.peak_rss_mb is not None:
+                status += f", peak RSS {result.peak_rss_mb:.0f} MB"
+        print(f"[{done}/{total}] {result.path}: {status}")
+
+    summary = ingestor.ingest(pdf_paths, progress=report)
+    print(
+        f"Done: {summary['succeeded']} ingested, {summary['skipped']} unchanged, {summary['failed']} failed, "
+        f"{summary['chunks']} chunks stored, {summary['deleted']} stale chunks removed."
+    )
+
+
+def run_workers(args):
+    """Run background ingestion workers that process jobs queued by the UI or API"""
+    import argparse
+    import multiprocessing
+    from src.ingestion.ingest_jobs import run_worker
+
+    parser = argparse.ArgumentParser(prog="main.py worker", description="Run background ingestion workers")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (jobs for one collection still run one at a time)")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    opts = parser.parse_args(args)
+
+    if opts.workers <= 1:
+        run_worker(once=opts.once)
+        return
+    # Each process gets its share of the page and OCR workers
+    processes = [multiprocessing.Process(target=run_worker, args=(opts.once, opts.workers)) for _ in range(opts.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+def run_rebuild(args):
+    """Re-embed a collection from the persisted chunks, e.g. after switching the embedding backend"""
+    import argparse
+    from src.embedding.vector_store import VectorStore
+
+    parser = argparse.ArgumentParser(prog="main.py rebuild", description="Rebuild the vector store from processed chunks on disk")
+    parser.add_argument("--collection", default=None, help="collection to rebuild (default: config.COLLECTION_NAME)")
+    parser.add_argument("--compact", action="store_true", help="drop superseded and deleted chunks from disk first")
+    opts = parser.parse_args(args)
+
+    vector_store = VectorStore(opts.collection)
+    if vector_store.chunk_store is None:
+        print("The chunk store is disabled (config.CHUNK_STORE_ENABLED); re-ingest the documents instead.")
+        return
+    if opts.compact:
+        compacted = vector_store.chunk_store.compact()
+        print(f"Compacted chunk store: {compacted['bytes_before'] / 1e6:.1f} MB -> {compacted['bytes_after'] / 1e6:.1f} MB")
+
+    print(f"Rebuilding collection '{vector_store.collection_name}' from {vector_store.chunk_store.count()} chunks...")
+    result = vector_store.rebuild()
+    print(f"Done: {result['stored']} chunks stored, {result['failed']} failed.")
+
+
+def run_server(args):
+    """Serve the headless HTTP API (query, ingest, health) with uvicorn"""
+    import argparse
+    import uvicorn
+    from src.api.server import create_app
+    from src.utils.config import config
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Run the headless HTTP query/ingest service")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--collection", default=None, help="collection to serve (default: config.COLLECTION_NAME)")
+    opts = parser.parse_args(args)
+
+    # One process: micro-batching only pays off when requests share the same models
+    uvicorn.run(create_app(opts.collection), host=opts.host, port=opts.port, workers=1)
+
+
 if __name__ == "__main__":
     # Check for critical environment variables
     if not os.getenv("PERPLEXITY_API_KEY"):
@@ -22,10 +127,26 @@ if __name__ == "__main__":
         # Use sys.executable to ensure we're using the interpreter from the correct environment
         # Running as a module helps Python resolve the paths correctly.
         subprocess.run([sys.executable, "-m", "streamlit", "run", "src/ui/app.py"])
+    elif len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        run_batch_ingest(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "worker":
+        run_workers(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        run_server(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        run_rebuild(sys.argv[2:])
     else:
         script_name = "main.py" if "main.py" in sys.argv[0] else "app.py"
 
         print("Invalid command. To run the UI, use:")
         print(f"python {script_name} ui")
         print("Or directly:")
-        print("streamlit run src/ui/app.py")
\ No newline at end of file
+        print("streamlit run src/ui/app.py")
+        print("To ingest PDFs (files or directories) in parallel, use:")
+        print(f"python {script_name} ingest <path> [<path> ...] [--workers N] [--collection NAME]")
+        print("To run background ingestion workers for documents uploaded in the UI, use:")
+        print(f"python {script_name} worker [--workers N] [--once]")
+        print("To run the headless HTTP API, use:")
+        print(f"python {script_name} serve [--host HOST] [--port PORT] [--collection NAME]")
+        print("To re-embed a collection from processed chunks without re-extracting, use:")
+        print(f"python {script_name} rebuild [--collection NAME] [--compact]")
\ No newline at end of file
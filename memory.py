@@ -0,0 +1,69 @@
+from typing import Optional
+import sys
+
+
+class PeakMemory:
+    """
+    Peak resident memory (RSS) of this process over a block of work.
+
+    On Linux the kernel's high-water mark is reset on entry (via
+    /proc/self/clear_refs), so `peak_mb` is the peak of this block alone.
+    Elsewhere it falls back to the lifetime peak from `resource`, which is
+    only an upper bound for the block; `exact` tells the two apart.
+
+    The mark belongs to the whole process: only measure one block at a
+    time per process. Blocks that overlap in other threads (e.g. ingests
+    on a server's executor) reset each other's peak, and each reports the
+    process peak since the latest reset.
+
+        with PeakMemory() as memory:
+            ingest(...)
+        logging.info(f"peak RSS {memory.peak_mb:.0f} MB")
+    """
+
+    def __init__(self):
+        self.start_mb: Optional[float] = None
+        self.peak_mb: Optional[float] = None
+        self.exact = False
+
+    def __enter__(self) -> "PeakMemory":
+        self.exact = _reset_high_water_mark()
+        self.start_mb = _status_mb("VmRSS")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.peak_mb = _status_mb("VmHWM") if self.exact else _lifetime_peak_mb()
+
+
+def _reset_high_water_mark() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _status_mb(field: str) -> Optional[float]:
+    """A memory field of /proc/self/status (reported in kB) in MB"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _lifetime_peak_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+__all__ = ["PeakMemory"]
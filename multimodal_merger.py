@@ -1,5 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Set, Tuple
 from collections import defaultdict
+import json
+
+from ..utils.config import config
+from ..utils.tokens import estimate_tokens
 
 class MultiModalMerger:
     """Merge and organize chunks from different modalities"""
@@ -24,24 +28,128 @@ class MultiModalMerger:
         
         return dict(type_groups)
     
-    def create_context(self, chunks: List[Dict]) -> str:
+    def create_context(self, chunks: List[Dict], token_budget: int = None) -> str:
         """Create formatted context from chunks"""
+        return self.build_context(chunks, token_budget)["context"]
+    
+    def build_context(self, chunks: List[Dict], token_budget: int = None) -> Dict:
+        """Pack deduplicated, compacted chunks into the context in rank order.
+
+        Chunks whose text is mostly contained in an already packed chunk
+        (sentence-window overlap, chart_metadata slices of page text) are
+        dropped, and overlap at the edge of a packed chunk from the same
+        source is trimmed. Tables are rendered as header-once pipe rows
+        instead of indented JSON records. Chunks are added greedily while
+        they fit in `token_budget` (default `config.CONTEXT_TOKEN_BUDGET`).
+        Returns the context with its estimated token count and what was dropped.
+        """
+        token_budget = token_budget or config.CONTEXT_TOKEN_BUDGET
         context_parts = []
+        packed_words: List[Tuple[str, List[str], Set[Tuple[str, ...]]]] = []
+        tokens = 0
+        duplicates = over_budget = 0
+        separator_tokens = estimate_tokens(_SEPARATOR)
         
-        for i, chunk in enumerate(chunks, 1):
+        for chunk in chunks:
             metadata = chunk['metadata']
-            chunk_type = metadata.get('type', 'text')
-            page = metadata.get('page', 'Unknown')
+            content = self._render_content(chunk)
+            words = content.split()
+            shingles = _shingles(words)
+            source = metadata.get('source')
+            
+            if any(_containment(shingles, other) >= config.CONTEXT_DEDUP_THRESHOLD for _, _, other in packed_words):
+                duplicates += 1
+                continue
+            kept = words
+            if metadata.get('type') != 'table':
+                for other_source, other_words, _ in packed_words:
+                    if other_source == source:
+                        kept = _trim_overlap(other_words, kept)
+            if not kept:
+                duplicates += 1
+                continue
+            body = content if len(kept) == len(words) else ' '.join(kept)
             
-            if chunk_type == 'table':
-                header = f"[Table {i}]\nPage: {page}"
-            elif chunk_type == 'ocr':
-                header = f"[OCR Extract {i}]\nPage: {page}, Figure: {metadata.get('image_index', 'N/A')}"
-            elif chunk_type == 'chart_metadata':
-                header = f"[Chart Metadata {i}]\nPage: {page}\nTitle: {metadata.get('title', 'N/A')}"
-            else:
-                header = f"[Text Chunk {i}]\nPage: {page}, Section: {metadata.get('section', 'N/A')}"
+            part = f"{self._header(metadata, len(context_parts) + 1)}\nContent: {body}\n"
+            part_tokens = estimate_tokens(part) + (separator_tokens if context_parts else 0)
+            if tokens + part_tokens > token_budget:
+                over_budget += 1
+                continue
             
-            context_parts.append(f"{header}\nContent: {chunk['content']}\n")
+            context_parts.append(part)
+            packed_words.append((source, words, shingles))
+            tokens += part_tokens
+        
+        return {
+            "context": _SEPARATOR.join(context_parts),
+            "tokens": tokens,
+            "chunks_used": len(context_parts),
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget
+        }
+    
+    def _header(self, metadata: Dict, i: int) -> str:
+        chunk_type = metadata.get('type', 'text')
+        page = metadata.get('page', 'Unknown')
+        
+        if chunk_type == 'table':
+            return f"[Table {i}]\nPage: {page}"
+        elif chunk_type == 'ocr':
+            return f"[OCR Extract {i}]\nPage: {page}, Figure: {metadata.get('image_index', 'N/A')}"
+        elif chunk_type == 'chart_metadata':
+            return f"[Chart Metadata {i}]\nPage: {page}\nTitle: {metadata.get('title', 'N/A')}"
+        else:
+            return f"[Text Chunk {i}]\nPage: {page}, Section: {metadata.get('section', 'N/A')}"
+    
+    def _render_content(self, chunk: Dict) -> str:
+        """Tables as compact pipe rows with the header once; other content as-is"""
+        content = chunk['content']
+        if chunk['metadata'].get('type') != 'table':
+            return content
+        try:
+            records = json.loads(content)
+        except (TypeError, ValueError):
+            return " ".join(content.split())
+        if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+            return json.dumps(records, separators=(",", ":"))
         
-        return "\n-------------------\n".join(context_parts)
\ No newline at end of file
+        columns = list(dict.fromkeys(key for record in records for key in record))
+        lines = [" | ".join(str(c) for c in columns)]
+        for record in records:
+            lines.append(" | ".join(" ".join(str(record.get(c, "")).split()) for c in columns))
+        return "\n".join(lines)
+
+
+_SEPARATOR = "\n-------------------\n"
+_SHINGLE = 5
+
+
+def _shingles(words: List[str]) -> Set[Tuple[str, ...]]:
+    lowered = [w.lower() for w in words]
+    if len(lowered) < _SHINGLE:
+        return {tuple(lowered)} if lowered else set()
+    return {tuple(lowered[i:i + _SHINGLE]) for i in range(len(lowered) - _SHINGLE + 1)}
+
+
+def _containment(shingles: Set[Tuple[str, ...]], other: Set[Tuple[str, ...]]) -> float:
+    """Share of this chunk's shingles that already appear in `other`"""
+    if not shingles:
+        return 1.0
+    return len(shingles & other) / len(shingles)
+
+
+def _trim_overlap(packed: List[str], words: List[str], min_overlap: int = 8) -> List[str]:
+    """Remove a leading or trailing run of `words` that repeats an edge of `packed`"""
+    # Leading: words start with a suffix of packed (next sentence window)
+    key = words[:min_overlap]
+    if len(key) == min_overlap:
+        for start in range(max(0, len(packed) - len(words)), len(packed) - min_overlap + 1):
+            if packed[start:start + min_overlap] == key and packed[start:] == words[:len(packed) - start]:
+                return words[len(packed) - start:]
+    # Trailing: words end with a prefix of packed (previous sentence window)
+    key = packed[:min_overlap]
+    if len(key) == min_overlap:
+        for end in range(len(words) - min_overlap, max(-1, len(words) - len(packed) - 1), -1):
+            if words[end:end + min_overlap] == key and words[end:] == packed[:len(words) - end]:
+                return words[:end]
+    return words
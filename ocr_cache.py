@@ -0,0 +1,105 @@
+from typing import Dict, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .config import config
+
+
+class OCRCache:
+    """
+    Persistent, content-addressed store of OCR results.
+
+    Entries are keyed by the hash of the image plus the tesseract language
+    and config, so changing OCR settings never returns stale text. The
+    SQLite file is safe to share between worker processes; once it grows
+    past `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or os.path.join(config.CACHE_PATH, "ocr_cache.sqlite")
+        self.max_bytes = max_bytes or config.OCR_CACHE_MAX_MB * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_last_used ON ocr(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr").fetchone()[0]
+
+    @staticmethod
+    def make_key(content_hash: str, lang: str = None, tesseract_config: str = None) -> str:
+        """Cache key for an image hash under the given tesseract settings"""
+        lang = config.OCR_LANG if lang is None else lang
+        tesseract_config = config.OCR_TESSERACT_CONFIG if tesseract_config is None else tesseract_config
+        return hashlib.sha256(f"{content_hash}|{lang}|{tesseract_config}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE ocr SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(key) + len(text.encode("utf-8"))
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ocr (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Could not write OCR cache entry: {e}")
+                return
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back under 90% of its bound"""
+        # Other processes may have written too; re-read the real size before deleting
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute("SELECT key, size FROM ocr ORDER BY last_used LIMIT 256").fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM ocr WHERE key = ?", [(k,) for k, _ in rows])
+            self._total_bytes -= sum(size for _, size in rows)
+        self._conn.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._total_bytes
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM ocr")
+            self._conn.commit()
+            self._total_bytes = 0
+
+
+__all__ = ["OCRCache"]
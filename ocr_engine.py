@@ -0,0 +1,168 @@
+import pytesseract
+from PIL import Image
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import logging
+import os
+import threading
+from .image_preprocess import ImagePreprocessor
+from ..utils.config import config
+from ..utils.ocr_cache import OCRCache
+
+
+class OCREngine:
+    """
+    Run tesseract over many images concurrently, OCR-ing each distinct image once.
+
+    Images are identified by a hash of their bytes. Results are remembered
+    (up to `memo_size` entries) across calls, so a logo shared by many
+    documents handled by the same engine is only recognised the first time,
+    and are looked up in the persistent `OCRCache` before tesseract runs.
+    Images pass through an `ImagePreprocessor` first, which may skip them or
+    hand tesseract a smaller grayscale copy.
+    Each tesseract call is a subprocess, so a thread pool is enough to keep
+    several of them busy at once.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        memo_size: int = None,
+        cache: Optional[OCRCache] = None,
+        preprocessor: Optional[ImagePreprocessor] = None
+    ):
+        self.workers = max(1, workers or config.OCR_WORKERS)
+        self.memo_size = memo_size or config.OCR_MEMO_SIZE
+        self.lang = config.OCR_LANG
+        self.tesseract_config = config.OCR_TESSERACT_CONFIG
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"images": 0, "unique": 0, "memo_hits": 0, "cache_hits": 0, "ocr_calls": 0}
+
+        self.cache = cache
+        if self.cache is None and config.OCR_CACHE_ENABLED:
+            try:
+                self.cache = OCRCache()
+            except Exception as e:
+                logging.warning(f"OCR cache unavailable, continuing without it: {e}")
+
+        if self.workers > 1 or self.workers < config.OCR_WORKERS:
+            # Parallel tesseract processes (in this engine or across a process pool sharing
+            # the OCR_WORKERS budget) fight over cores if each also uses OpenMP threads
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    @staticmethod
+    def content_hash(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def ocr_images(
+        self,
+        images: Dict[str, bytes],
+        display_sizes: Optional[Dict[str, Tuple[float, float]]] = None
+    ) -> Dict[str, Optional[str]]:
+        """OCR images keyed by content hash; returns stripped text per hash.
+
+        `display_sizes` optionally gives each image's placed size on the page
+        in points, so oversized scans can be downscaled to the target DPI.
+        Text is None for an image tesseract failed on; it is neither cached
+        nor remembered, so the next call retries it.
+        """
+        display_sizes = display_sizes or {}
+        results = {}
+        pending = {}
+
+        with self._lock:
+            self.stats["images"] += len(images)
+            for key, image_bytes in images.items():
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    results[key] = self._memo[key]
+                    self.stats["memo_hits"] += 1
+                else:
+                    pending[key] = image_bytes
+            self.stats["unique"] += len(pending)
+
+        if self.cache is not None:
+            for key in list(pending):
+                text = self.cache.get(self._cache_key(key))
+                if text is not None:
+                    results[key] = text
+                    del pending[key]
+                    with self._lock:
+                        self.stats["cache_hits"] += 1
+                        self._remember(key, text)
+
+        if not pending:
+            return results
+
+        if self.workers == 1 or len(pending) == 1:
+            texts = {key: self._ocr(key, data, display_sizes.get(key)) for key, data in pending.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                futures = {
+                    key: pool.submit(self._ocr, key, data, display_sizes.get(key))
+                    for key, data in pending.items()
+                }
+                texts = {key: future.result() for key, future in futures.items()}
+
+        for key, text in texts.items():
+            if text is None:
+                # Failed OCR is not remembered, so the next run retries it
+                results[key] = None
+                continue
+            if self.cache is not None:
+                self.cache.put(self._cache_key(key), text)
+            with self._lock:
+                self._remember(key, text)
+            results[key] = text
+        return results
+
+    def ocr_bytes(self, image_bytes: bytes) -> str:
+        """OCR a single image given as raw bytes; empty if OCR failed"""
+        key = self.content_hash(image_bytes)
+        return self.ocr_images({key: image_bytes})[key] or ""
+
+    def metrics(self) -> Dict:
+        """Engine counters, pre-OCR filter counters and persistent cache hit/miss counters"""
+        metrics = dict(self.stats)
+        metrics["preprocess"] = dict(self.preprocessor.stats)
+        if self.cache is not None:
+            metrics["cache"] = self.cache.stats()
+        return metrics
+
+    def _cache_key(self, key: str) -> str:
+        settings = f"{self.tesseract_config}|{self.preprocessor.signature()}"
+        return self.cache.make_key(key, self.lang, settings)
+
+    def _ocr(self, key: str, image_bytes: bytes, display_size: Optional[Tuple[float, float]] = None) -> Optional[str]:
+        try:
+            try:
+                image = self.preprocessor.prepare(Image.open(io.BytesIO(image_bytes)), display_size)
+            except Exception as e:
+                # Undecodable bytes stay undecodable, so this is a result rather than a failure to retry
+                logging.warning(f"Could not decode image {key[:12]} for OCR: {e}")
+                return ""
+            if image is None:
+                # Filtered out as an icon or blank fill; an empty result is still cacheable
+                return ""
+            text = pytesseract.image_to_string(image, lang=self.lang, config=self.tesseract_config)
+        except Exception as e:
+            logging.warning(f"OCR failed for image {key[:12]}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self.stats["ocr_calls"] += 1
+        return text.strip()
+
+    def _remember(self, key: str, text: str) -> None:
+        self._memo[key] = text
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+
+__all__ = ["OCREngine"]
@@ -0,0 +1,107 @@
+import fitz  # PyMuPDF
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PDFDocument:
+    """
+    A PDF opened once and shared by every extractor.
+
+    Page text, image xrefs and page geometry are read lazily and cached, so
+    text extraction, OCR and chart detection walk each page a single time
+    instead of re-opening and re-decoding the file per extractor.
+    Page numbers are 1-based, matching the `page` field on chunks.
+
+    Passing `pages` restricts the view to those page numbers, so a worker
+    can extract one slice of a large document without touching the rest.
+    `view` does the same on an already open file; a view's page caches
+    are its own and are freed with it, so a streaming reader's memory
+    follows its window rather than the whole document.
+    """
+
+    def __init__(self, pdf_path: str, pages: Optional[Iterable[int]] = None, doc: Optional[fitz.Document] = None):
+        self.path = pdf_path
+        self._owns_doc = doc is None
+        self.doc = fitz.open(pdf_path) if doc is None else doc
+        self._page_numbers = None
+        if pages is not None:
+            self._page_numbers = [p for p in sorted(set(pages)) if 1 <= p <= len(self.doc)]
+        self._text: Dict[int, str] = {}
+        self._images: Dict[int, List[int]] = {}
+        self._geometry: Dict[int, Tuple[float, float]] = {}
+
+    @property
+    def page_count(self) -> int:
+        """Total pages in the file, regardless of the page view"""
+        return len(self.doc)
+
+    def pages(self) -> Iterable[int]:
+        """1-based page numbers in this view, in order"""
+        if self._page_numbers is not None:
+            return self._page_numbers
+        return range(1, self.page_count + 1)
+
+    def view(self, pages: Iterable[int]) -> "PDFDocument":
+        """A view of `pages` sharing this open file; closing it leaves the file open"""
+        return PDFDocument(self.path, pages=pages, doc=self.doc)
+
+    def page(self, page_num: int) -> fitz.Page:
+        return self.doc[page_num - 1]
+
+    def page_text(self, page_num: int) -> str:
+        """Plain text of a page, decoded at most once"""
+        if page_num not in self._text:
+            self._text[page_num] = self.page(page_num).get_text()
+        return self._text[page_num]
+
+    def page_image_xrefs(self, page_num: int) -> List[int]:
+        """Xrefs of the images placed on a page, in page order"""
+        if page_num not in self._images:
+            self._images[page_num] = [img[0] for img in self.page(page_num).get_images()]
+        return self._images[page_num]
+
+    def page_size(self, page_num: int) -> Tuple[float, float]:
+        """Page width and height in points"""
+        if page_num not in self._geometry:
+            rect = self.page(page_num).rect
+            self._geometry[page_num] = (rect.width, rect.height)
+        return self._geometry[page_num]
+
+    def image_display_size(self, page_num: int, xref: int) -> Optional[Tuple[float, float]]:
+        """Width and height in points at which an image is drawn on a page, if known"""
+        try:
+            rects = self.page(page_num).get_image_rects(xref)
+        except Exception:
+            return None
+        if not rects:
+            return None
+        return (rects[0].width, rects[0].height)
+
+    def page_hash(self, page_num: int) -> str:
+        """Fingerprint of a page's drawing commands and the images it places"""
+        digest = hashlib.sha256(self.page(page_num).read_contents())
+        for xref in self.page_image_xrefs(page_num):
+            try:
+                digest.update(hashlib.sha256(self.doc.xref_stream_raw(xref)).digest())
+            except Exception:
+                digest.update(str(xref).encode("utf-8"))
+        return digest.hexdigest()
+
+    def extract_image(self, xref: int) -> Dict:
+        """Raw image bytes and format for an xref (not cached to keep memory flat)"""
+        return self.doc.extract_image(xref)
+
+    def close(self) -> None:
+        if self.doc is not None:
+            if self._owns_doc:
+                self.doc.close()
+            self.doc = None
+
+    def __enter__(self) -> "PDFDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+__all__ = ["PDFDocument"]
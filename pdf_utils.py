@@ -1,52 +1,50 @@
 import fitz  # PyMuPDF
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from PIL import Image
 import io
+from .pdf_document import PDFDocument
 
 class PDFUtils:
     """Utilities for PDF processing"""
     
     @staticmethod
-    def extract_text_by_page(pdf_path: str) -> Dict[int, str]:
+    def extract_text_by_page(pdf_path: str, document: Optional[PDFDocument] = None) -> Dict[int, str]:
         """Extract text from each page"""
-        doc = fitz.open(pdf_path)
-        text_by_page = {}
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text_by_page[page_num + 1] = page.get_text()
+        doc = document or PDFDocument(pdf_path)
+        text_by_page = {page_num: doc.page_text(page_num) for page_num in doc.pages()}
         
-        doc.close()
+        if document is None:
+            doc.close()
         return text_by_page
     
     @staticmethod
-    def extract_images(pdf_path: str) -> List[Dict[str, Any]]:
-        """Extract images from PDF"""
-        doc = fitz.open(pdf_path)
-        images = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            image_list = page.get_images()
-            
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                
-                images.append({
-                    "page": page_num + 1,
-                    "index": img_index,
-                    "image": Image.open(io.BytesIO(image_bytes)),
-                    "ext": base_image["ext"]
-                })
-        
-        doc.close()
-        return images
+    def iter_images(pdf_path: str, document: Optional[PDFDocument] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the images of a PDF one at a time, decoding each only when it is reached"""
+        doc = document or PDFDocument(pdf_path)
+        try:
+            for page_num in doc.pages():
+                for img_index, xref in enumerate(doc.page_image_xrefs(page_num)):
+                    base_image = doc.extract_image(xref)
+                    yield {
+                        "page": page_num,
+                        "index": img_index,
+                        "image": Image.open(io.BytesIO(base_image["image"])),
+                        "ext": base_image["ext"]
+                    }
+        finally:
+            if document is None:
+                doc.close()
+
+    @staticmethod
+    def extract_images(pdf_path: str, document: Optional[PDFDocument] = None) -> List[Dict[str, Any]]:
+        """Extract images from PDF (all decoded at once; prefer `iter_images` for large files)"""
+        return list(PDFUtils.iter_images(pdf_path, document))
     
     @staticmethod
-    def get_page_count(pdf_path: str) -> int:
+    def get_page_count(pdf_path: str, document: Optional[PDFDocument] = None) -> int:
         """Get total number of pages"""
+        if document is not None:
+            return document.page_count
         doc = fitz.open(pdf_path)
         count = len(doc)
         doc.close()
@@ -0,0 +1,79 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from dataclasses import asdict
+import hashlib
+import json
+import threading
+import time
+
+from ..embedding.filters import ChunkFilter
+from ..utils.config import config
+
+
+class QueryCache:
+    """
+    In-memory LRU of query results with a time-to-live.
+
+    Keys combine the normalized query, filters, result sizes and the
+    collection version, so any add, delete or clear on the collection
+    makes earlier entries unreachable without explicit invalidation.
+    """
+
+    def __init__(self, max_items: int = None, ttl_seconds: float = None):
+        self.max_items = max_items or config.QUERY_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.QUERY_CACHE_TTL
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case, whitespace and trailing punctuation don't change the answer"""
+        return " ".join(query.lower().split()).rstrip("?!. ")
+
+    @classmethod
+    def make_key(cls, query: str, filters: Optional[ChunkFilter], version: str, **params) -> str:
+        payload = {
+            "query": cls.normalize(query),
+            "filters": asdict(filters) if filters is not None else None,
+            "version": version,
+            **params
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._items[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "items": len(self._items)
+        }
+
+
+__all__ = ["QueryCache"]
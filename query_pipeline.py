@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+import copy
+import logging
+
+from .query_cache import QueryCache
+from ..embedding.filters import ChunkFilter
+from ..utils.config import config
+
+
+class QueryPipeline:
+    """
+    Retrieve, rerank and build the context for a question.
+
+    Results are cached in a `QueryCache` keyed by the collection version,
+    so a repeated question skips embedding, search and the cross-encoder
+    until the collection changes or the entry expires.
+    """
+
+    def __init__(self, retriever, reranker, merger, cache: Optional[QueryCache] = None):
+        self.retriever = retriever
+        self.reranker = reranker
+        self.merger = merger
+        self.cache = cache if cache is not None else (QueryCache() if config.QUERY_CACHE_ENABLED else None)
+
+    def run(self, query: str, filters: Optional[ChunkFilter] = None, top_k: int = None) -> Dict:
+        """Returns {"chunks", "context", "context_tokens", "cached"} for the question"""
+        top_k = top_k or config.TOP_K
+        key = self._cache_key(query, filters, top_k)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        chunks = self.retriever.retrieve(query, top_k=top_k, filters=filters)
+        return self._finish(query, chunks, key)
+
+    def _cache_key(self, query: str, filters: Optional[ChunkFilter], top_k: int) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return QueryCache.make_key(
+            query, filters, self.retriever.vector_store.version,
+            top_k=top_k, rerank_top_k=config.RERANK_TOP_K
+        )
+
+    def _cached(self, key: Optional[str]) -> Optional[Dict]:
+        cached = self.cache.get(key) if key is not None else None
+        if cached is None:
+            return None
+        # Callers may annotate chunks; never hand out the cached objects
+        return {**copy.deepcopy(cached), "cached": True}
+
+    def _finish(self, query: str, chunks: List[Dict], key: Optional[str]) -> Dict:
+        """Rerank retrieved chunks, build the context and cache the result"""
+        if chunks and config.RERANK_CASCADE:
+            chunks = self.reranker.rerank_cascade(query, chunks)
+        elif chunks:
+            chunks = self.reranker.rerank(query, chunks)
+        context = self.merger.build_context(chunks)
+        logging.info(
+            f"Context: {context['tokens']} tokens from {context['chunks_used']}/{len(chunks)} chunks "
+            f"({context['duplicates_dropped']} duplicate, {context['over_budget_dropped']} over budget)"
+        )
+        result = {"chunks": chunks, "context": context["context"], "context_tokens": context["tokens"]}
+
+        # Empty results are often transient (e.g. the embedding call failed); don't pin them
+        if key is not None and chunks:
+            self.cache.put(key, copy.deepcopy(result))
+        return {**result, "cached": False}
+
+
+__all__ = ["QueryPipeline"]
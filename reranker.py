@@ -1,13 +1,129 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
 from sentence_transformers import CrossEncoder
 from ..utils.config import config
+from ..utils.micro_batcher import MicroBatcher
 
 class Reranker:
-    """Rerank retrieved chunks for better relevance"""
+    """Rerank retrieved chunks for better relevance.
+
+    Pairs are scored in batches of `config.RERANK_BATCH_SIZE` with inputs
+    truncated to `config.RERANK_MAX_LENGTH` tokens. Long table JSON is cut
+    before tokenization, so its cost doesn't grow with table size. Scores
+    are cached per (query hash, chunk id), so a chunk that was already
+    scored for the same question is never sent to the model again.
+    `config.RERANK_QUANTIZATION` can swap in a dynamically quantized
+    ("dynamic") or ONNX ("onnx") CPU model.
+
+    `rerank_cascade` only sends candidates whose dense similarity leaves
+    their place in the top-k uncertain to the cross-encoder. After
+    `enable_micro_batching`, pairs from concurrent callers share forward
+    passes.
+    """
+
+    # Loaded models are shared by every Reranker in the process
+    _models: Dict[Tuple[str, int, str], CrossEncoder] = {}
+    _models_lock = threading.Lock()
     
-    def __init__(self, model_name: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2'):
-        self.model = CrossEncoder(model_name)
+    def __init__(self, model_name: str = None, batch_size: int = None, max_length: int = None,
+                 quantization: str = None, cache_size: int = None):
+        self.model_name = model_name or config.RERANK_MODEL
+        self.batch_size = max(1, batch_size or config.RERANK_BATCH_SIZE)
+        self.max_length = max_length or config.RERANK_MAX_LENGTH
+        self.quantization = quantization or config.RERANK_QUANTIZATION
+        self.cache_size = cache_size if cache_size is not None else config.RERANK_CACHE_SIZE
+        self.model = self._load(self.model_name, self.max_length, self.quantization)
+
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.pairs_scored = 0
+        self.seconds = 0.0
+        self.cascade_paths = {"skipped": 0, "partial": 0, "full": 0}
+        self.pairs_skipped = 0
+        self.batcher = None
+
+    @classmethod
+    def _load(cls, model_name: str, max_length: int, quantization: str) -> CrossEncoder:
+        key = (model_name, max_length, quantization)
+        with cls._models_lock:
+            if key not in cls._models:
+                cls._models[key] = cls._build(model_name, max_length, quantization)
+            return cls._models[key]
+
+    @staticmethod
+    def _build(model_name: str, max_length: int, quantization: str) -> CrossEncoder:
+        if quantization == "onnx":
+            try:
+                return CrossEncoder(model_name, max_length=max_length, device="cpu", backend="onnx")
+            except (TypeError, ValueError, ImportError) as e:
+                # Older sentence-transformers or no onnxruntime: fall back to dynamic quantization
+                logging.warning(f"ONNX cross-encoder unavailable ({e}); using dynamic quantization instead")
+                quantization = "dynamic"
+
+        model = CrossEncoder(model_name, max_length=max_length, device="cpu" if quantization == "dynamic" else None)
+        if quantization == "dynamic":
+            import torch
+
+            model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif quantization not in (None, "", "none"):
+            raise ValueError(f"Unknown rerank quantization: {quantization!r} (expected 'none', 'dynamic' or 'onnx')")
+        return model
     
+    def score(self, query: str, chunks: List[Dict]) -> np.ndarray:
+        """Cross-encoder relevance score per chunk, reusing cached scores"""
+        query_hash = hashlib.sha256(" ".join(query.split()).encode("utf-8")).hexdigest()[:16]
+        scores = np.empty(len(chunks), dtype=np.float32)
+        pending: List[int] = []
+
+        with self._lock:
+            for i, chunk in enumerate(chunks):
+                key = (query_hash, chunk.get('id'))
+                if chunk.get('id') is not None and key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[i] = self._scores[key]
+                    self.cache_hits += 1
+                else:
+                    pending.append(i)
+
+        if pending:
+            # Characters beyond ~4 per token would be truncated anyway; skip tokenizing them
+            max_chars = self.max_length * 4
+            pairs = [[query, chunks[i]['content'][:max_chars]] for i in pending]
+            start = time.perf_counter()
+            fresh = self.batcher.submit(pairs) if self.batcher is not None else self._predict(pairs)
+            self.seconds += time.perf_counter() - start
+            self.pairs_scored += len(pairs)
+            scores[pending] = fresh
+
+            with self._lock:
+                for i in pending:
+                    if chunks[i].get('id') is None:
+                        continue
+                    self._scores[(query_hash, chunks[i]['id'])] = float(scores[i])
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        return scores
+    
+    def enable_micro_batching(self, max_pairs: int = None, max_wait: float = None) -> None:
+        """Score pairs from concurrent `score` calls (one per thread) in shared batches"""
+        self.batcher = MicroBatcher(
+            self._predict,
+            max_batch=max_pairs or config.MICRO_BATCH_MAX_PAIRS,
+            max_wait=max_wait if max_wait is not None else config.MICRO_BATCH_WAIT_MS / 1000,
+            name="rerank-batcher"
+        )
+
+    def _predict(self, pairs: List[List[str]]) -> np.ndarray:
+        return self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+
     def rerank(self, query: str, chunks: List[Dict], top_k: int = None) -> List[Dict]:
         """Rerank chunks based on query relevance"""
         top_k = top_k or config.RERANK_TOP_K
@@ -15,11 +131,8 @@ class Reranker:
         if not chunks:
             return []
         
-        # Prepare pairs for cross-encoder
-        pairs = [[query, chunk['content']] for chunk in chunks]
-        
         # Get relevance scores
-        scores = self.model.predict(pairs)
+        scores = self.score(query, chunks)
         
         # Add scores to chunks
         for chunk, score in zip(chunks, scores):
@@ -28,4 +141,69 @@ class Reranker:
         # Sort by score and return top-k
         chunks.sort(key=lambda x: x['rerank_score'], reverse=True)
         
-        return chunks[:top_k]
\ No newline at end of file
+        return chunks[:top_k]
+
+    def rerank_cascade(self, query: str, chunks: List[Dict], top_k: int = None,
+                       threshold: float = None, margin: float = None) -> List[Dict]:
+        """Rerank only where the dense ranking is undecided.
+
+        Similarity is 1 - cosine distance. A chunk at or above `threshold`
+        that leads the first chunk outside the top-k by at least `margin` is
+        kept without competing for a slot. A chunk more than `margin` below
+        the k-th best is dropped without scoring. Everything in between, including
+        lexical-only hits that have no distance, is reranked for the
+        remaining slots.
+
+        Kept chunks are still scored (at most `top_k` pairs), so every
+        returned chunk has a cross-encoder `rerank_score` and the result is
+        sorted by it, as with `rerank`.
+        """
+        top_k = top_k or config.RERANK_TOP_K
+        threshold = config.SIMILARITY_THRESHOLD if threshold is None else threshold
+        margin = config.RERANK_MARGIN if margin is None else margin
+
+        if not chunks:
+            return []
+
+        similarities = [1.0 - c['distance'] if c.get('distance') is not None else None for c in chunks]
+        known = sorted((s for s in similarities if s is not None), reverse=True)
+        kth = known[top_k - 1] if len(known) >= top_k else float("-inf")
+        first_out = known[top_k] if len(known) > top_k else float("-inf")
+
+        confident, uncertain = [], []
+        for chunk, similarity in zip(chunks, similarities):
+            if similarity is not None and similarity >= threshold and similarity - first_out >= margin:
+                confident.append((similarity, chunk))
+            elif similarity is not None and similarity < kth - margin:
+                continue
+            else:
+                uncertain.append(chunk)
+
+        confident = [chunk for _, chunk in sorted(confident, key=lambda item: item[0], reverse=True)][:top_k]
+        slots = top_k - len(confident)
+        if slots <= 0 or not uncertain:
+            path = "skipped"
+            uncertain = []
+        else:
+            path = "full" if len(uncertain) == len(chunks) else "partial"
+        selected = self.rerank(query, confident, top_k=len(confident)) if confident else []
+        if uncertain:
+            selected += self.rerank(query, uncertain, top_k=slots)
+        selected.sort(key=lambda x: x['rerank_score'], reverse=True)
+
+        with self._lock:
+            self.cascade_paths[path] += 1
+            self.pairs_skipped += len(chunks) - len(confident) - len(uncertain)
+        return selected
+
+    def stats(self) -> Dict:
+        lookups = self.cache_hits + self.pairs_scored
+        return {
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "pairs_per_second": self.pairs_scored / self.seconds if self.seconds else 0.0,
+            "cascade_paths": dict(self.cascade_paths),
+            "pairs_skipped": self.pairs_skipped,
+            "micro_batching": self.batcher.stats() if self.batcher is not None else None
+        }
@@ -1,19 +1,68 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..embedding.vector_store import VectorStore
+from ..embedding.filters import ChunkFilter
+from ..embedding.lexical_index import reciprocal_rank_fusion
 from ..utils.config import config
 
 class Retriever:
-    """Retrieve relevant chunks from vector store"""
+    """Retrieve relevant chunks from vector store.
+
+    With `config.HYBRID_RETRIEVAL` the dense ranking is fused with a BM25
+    ranking from the lexical index by reciprocal rank fusion, so exact
+    terms such as part numbers or table cell values are not lost.
+
+    A `ChunkFilter` (source, page range, chunk type) is pushed down into
+    both rankings, so only matching chunks compete for the top-k.
+    """
     
-    def __init__(self):
-        self.vector_store = VectorStore()
+    def __init__(self, collection_name: Optional[str] = None, vector_store: Optional[VectorStore] = None):
+        self.vector_store = vector_store or VectorStore(collection_name)
     
-    def retrieve(self, query: str, top_k: int = None) -> List[Dict]:
-        """Retrieve top-k relevant chunks"""
+    def retrieve(self, query: str, top_k: int = None, filters: Optional[ChunkFilter] = None) -> List[Dict]:
+        """Retrieve top-k relevant chunks, optionally restricted by `filters`"""
         top_k = top_k or config.TOP_K
         
-        results = self.vector_store.query(query, top_k)
+        if self.vector_store.lexical_index is None:
+            return self.format_dense(self.vector_store.query(query, top_k, filters))
+
+        candidates = self.candidate_count(top_k)
+        dense = self.format_dense(self.vector_store.query(query, candidates, filters))
+        lexical = self.vector_store.lexical_query(query, candidates, filters)
+        return self.fuse(dense, lexical, top_k)
+
+    @staticmethod
+    def candidate_count(top_k: int) -> int:
+        """Candidates fetched from each ranking before fusion"""
+        return top_k * max(1, config.HYBRID_CANDIDATES)
+
+    def fuse(self, dense: List[Dict], lexical: List[tuple], top_k: int) -> List[Dict]:
+        """Fuse formatted dense results with lexical (id, score) pairs into the top-k chunks"""
+        fused = reciprocal_rank_fusion(
+            [[chunk['id'] for chunk in dense], [chunk_id for chunk_id, _ in lexical]],
+            k=config.RRF_K
+        )[:top_k]
+
+        by_id = {chunk['id']: chunk for chunk in dense}
+        lexical_scores = dict(lexical)
+        # Chunks found only lexically still need their content and metadata
+        stored = self.vector_store.get_chunks([chunk_id for chunk_id, _ in fused if chunk_id not in by_id])
+
+        chunks = []
+        for chunk_id, score in fused:
+            if chunk_id in by_id:
+                chunk = by_id[chunk_id]
+            elif chunk_id in stored:
+                chunk = {'id': chunk_id, **stored[chunk_id], 'distance': None}
+            else:
+                continue
+            chunk['lexical_score'] = lexical_scores.get(chunk_id)
+            chunk['fusion_score'] = score
+            chunks.append(chunk)
         
+        return chunks
+
+    @staticmethod
+    def format_dense(results: Dict) -> List[Dict]:
         # Format results
         chunks = []
         for i in range(len(results['ids'][0])):
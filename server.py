@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from ..embedding.filters import ChunkFilter
+from ..embedding.vector_store import VectorStore
+from ..ingestion.batch_ingest import BatchIngestor
+from ..ingestion.ingest_jobs import JobQueue, ensure_worker
+from ..retrieval.async_pipeline import AsyncQueryPipeline
+from ..retrieval.multimodal_merger import MultiModalMerger
+from ..retrieval.reranker import Reranker
+from ..retrieval.retriever import Retriever
+from ..utils.config import config
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+    sources: Optional[List[str]] = None
+    page_range: Optional[Tuple[Optional[int], Optional[int]]] = None
+    chunk_types: Optional[List[str]] = None
+    generate: bool = True  # False returns retrieval results only
+
+    def chunk_filter(self) -> Optional[ChunkFilter]:
+        if not (self.sources or self.page_range or self.chunk_types):
+            return None
+        return ChunkFilter(sources=self.sources, page_range=self.page_range, chunk_types=self.chunk_types)
+
+
+class IngestRequest(BaseModel):
+    paths: List[str] = Field(..., min_length=1)  # PDF files or directories, as seen by the server
+
+
+def _public_chunk(chunk: Dict) -> Dict:
+    """JSON-safe view of a retrieved chunk"""
+    public = {"id": chunk.get("id"), "content": chunk.get("content"), "metadata": chunk.get("metadata") or {}}
+    for key in ("distance", "lexical_score", "fusion_score", "rerank_score"):
+        if chunk.get(key) is not None:
+            public[key] = float(chunk[key])
+    return public
+
+
+def create_app(collection_name: Optional[str] = None) -> FastAPI:
+    """
+    Headless HTTP service over one collection.
+
+    Endpoints:
+        POST /query         retrieve, rerank and (unless "generate": false) answer
+        POST /query/stream  same, streaming the answer as plain text
+        POST /ingest        queue server-side PDF paths as background ingest jobs
+        GET  /jobs/{id}     status and progress of an ingest job
+        GET  /health        collection size and cache/batching statistics
+
+    Query embeddings and cross-encoder scoring are micro-batched across
+    concurrent requests (`MICRO_BATCH_*` settings). Ingestion goes through
+    the `JobQueue` like the UI's, so `main.py worker` processes remain the
+    collection's only writers; the backend is reopened before a query
+    whenever they have changed the collection.
+    """
+    state: Dict = {}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        vector_store = VectorStore(collection_name)
+        vector_store.enable_query_batching()
+        reranker = Reranker()
+        reranker.enable_micro_batching()
+        state["vector_store"] = vector_store
+        state["reranker"] = reranker
+        executor = ThreadPoolExecutor(max_workers=config.SERVER_EXECUTOR_WORKERS)
+        state["executor"] = executor
+        state["pipeline"] = AsyncQueryPipeline(
+            Retriever(vector_store=vector_store), reranker, MultiModalMerger(), executor=executor
+        )
+        state["job_queue"] = JobQueue()
+        # Serialises reopening the backend after another process wrote to the collection
+        state["refresh_lock"] = asyncio.Lock()
+        logging.info(f"Serving collection '{vector_store.collection_name}' ({vector_store.count()} chunks)")
+        try:
+            yield
+        finally:
+            await state["pipeline"].aclose()
+            executor.shutdown(wait=False)
+
+    app = FastAPI(title="MultiDoc-IntelliAgent", lifespan=lifespan)
+
+    async def refresh() -> None:
+        """Pick up chunks written by ingest workers before answering"""
+        vector_store: VectorStore = state["vector_store"]
+        async with state["refresh_lock"]:
+            await asyncio.get_running_loop().run_in_executor(state["executor"], vector_store.refresh)
+
+    @app.post("/query")
+    async def query(request: QueryRequest) -> Dict:
+        await refresh()
+        pipeline: AsyncQueryPipeline = state["pipeline"]
+        start = time.perf_counter()
+        if request.generate:
+            result = await pipeline.answer(request.query, request.chunk_filter(), request.top_k)
+        else:
+            result = await pipeline.run(request.query, request.chunk_filter(), request.top_k)
+        return {
+            "answer": result.get("answer"),
+            "chunks": [_public_chunk(c) for c in result["chunks"]],
+            "context_tokens": result["context_tokens"],
+            "cached": result["cached"],
+            "timing": {**result.get("timing", {}), "server": time.perf_counter() - start}
+        }
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest) -> StreamingResponse:
+        await refresh()
+        pipeline: AsyncQueryPipeline = state["pipeline"]
+        stream = pipeline.stream_answer(request.query, request.chunk_filter(), request.top_k)
+        await stream.__anext__()  # retrieval result; only the answer text is streamed
+
+        async def tokens():
+            async for token in stream:
+                yield token
+
+        return StreamingResponse(tokens(), media_type="text/plain; charset=utf-8")
+
+    @app.post("/ingest")
+    async def ingest(request: IngestRequest) -> Dict:
+        vector_store: VectorStore = state["vector_store"]
+        job_queue: JobQueue = state["job_queue"]
+        pdf_paths = BatchIngestor.expand_paths(request.paths)
+        if not pdf_paths:
+            raise HTTPException(status_code=400, detail="No PDF documents found")
+
+        # Workers may run from another directory, so jobs name absolute paths
+        sources = [str(Path(path).resolve()) for path in pdf_paths]
+        jobs = [{"id": job_queue.submit(source, vector_store.collection_name), "source": source} for source in sources]
+        ensure_worker(job_queue)
+        return {"jobs": jobs}
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str) -> Dict:
+        job = state["job_queue"].get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return {
+            "id": job.id,
+            "source": job.source,
+            "status": job.status,
+            "pages_done": job.pages_done,
+            "pages_total": job.pages_total,
+            "chunks": job.chunks,
+            "deleted": job.deleted,
+            "error": job.error
+        }
+
+    @app.get("/health")
+    async def health() -> Dict:
+        vector_store: VectorStore = state["vector_store"]
+        pipeline: AsyncQueryPipeline = state["pipeline"]
+        return {
+            "status": "ok",
+            "collection": vector_store.collection_name,
+            "chunks": vector_store.count(),
+            "query_cache": pipeline.cache.stats() if pipeline.cache is not None else None,
+            "embedding_batching": vector_store.query_batcher.stats(),
+            "reranker": state["reranker"].stats()
+        }
+
+    return app
+
+
+__all__ = ["create_app"]
@@ -0,0 +1,138 @@
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import logging
+import threading
+import time
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from ..utils.config import config
+
+_DEFAULT_BASE_URL = "https://api.perplexity.ai"
+
+_shared_client: Optional[OpenAI] = None
+_shared_lock = threading.Lock()
+
+
+def _api_key() -> str:
+    # A local stub server (LLM_BASE_URL) needs no real key
+    return config.PERPLEXITY_API_KEY or ("local" if config.LLM_BASE_URL != _DEFAULT_BASE_URL else "")
+
+
+def _messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _get_client() -> Optional[OpenAI]:
+    global _shared_client
+    api_key = _api_key()
+    if not api_key:
+        return None
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = OpenAI(
+                api_key=api_key,
+                base_url=config.LLM_BASE_URL,
+                http_client=httpx.Client(timeout=config.LLM_TIMEOUT)
+            )
+        return _shared_client
+
+
+class StreamingLLM:
+    """
+    Chat completions streamed token by token from the Perplexity
+    (OpenAI-compatible) API.
+
+    `stream` yields text deltas as they arrive so the UI can render the
+    answer while it is generated; `generate` joins them for callers that
+    need the whole completion. One instance is shared by concurrent
+    sessions, so time to first token and total time are written to a
+    caller-supplied `timing` dict rather than kept on the instance.
+    """
+
+    def __init__(self, model: str = None):
+        self.model = model or config.LLM_MODEL
+        self.client = _get_client()
+
+    def stream(self, prompt: str, system_prompt: str = None,
+               timing: Optional[Dict[str, float]] = None) -> Iterator[str]:
+        """Yield the completion incrementally as text deltas"""
+        if self.client is None:
+            logging.error("StreamingLLM: no LLM client configured (PERPLEXITY_API_KEY missing)")
+            return
+
+        timing = timing if timing is not None else {}
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model, messages=_messages(prompt, system_prompt), stream=True
+        )
+        try:
+            for event in response:
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta.content
+                if delta:
+                    if "first_token" not in timing:
+                        timing["first_token"] = time.perf_counter() - start
+                    yield delta
+        finally:
+            response.close()
+            timing["total"] = time.perf_counter() - start
+
+    def generate(self, prompt: str, system_prompt: str = None, timing: Optional[Dict[str, float]] = None) -> str:
+        """Full completion text"""
+        return "".join(self.stream(prompt, system_prompt, timing))
+
+
+class AsyncStreamingLLM:
+    """
+    asyncio counterpart of `StreamingLLM` for many concurrent answers.
+
+    Requests go through the given pooled `httpx.AsyncClient`, which must
+    belong to the running event loop. Timings are written to a
+    caller-supplied dict, as in `StreamingLLM`.
+    """
+
+    def __init__(self, model: str = None, http_client: Optional[httpx.AsyncClient] = None):
+        self.model = model or config.LLM_MODEL
+        api_key = _api_key()
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=config.LLM_BASE_URL,
+            http_client=http_client or httpx.AsyncClient(timeout=config.LLM_TIMEOUT)
+        ) if api_key else None
+
+    async def stream(self, prompt: str, system_prompt: str = None,
+                     timing: Optional[Dict[str, float]] = None) -> AsyncIterator[str]:
+        """Yield the completion incrementally as text deltas"""
+        if self.client is None:
+            logging.error("AsyncStreamingLLM: no LLM client configured (PERPLEXITY_API_KEY missing)")
+            return
+
+        timing = timing if timing is not None else {}
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=self.model, messages=_messages(prompt, system_prompt), stream=True
+        )
+        try:
+            async for event in response:
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta.content
+                if delta:
+                    if "first_token" not in timing:
+                        timing["first_token"] = time.perf_counter() - start
+                    yield delta
+        finally:
+            await response.close()
+            timing["total"] = time.perf_counter() - start
+
+    async def generate(self, prompt: str, system_prompt: str = None, timing: Optional[Dict[str, float]] = None) -> str:
+        """Full completion text"""
+        return "".join([token async for token in self.stream(prompt, system_prompt, timing)])
+
+
+__all__ = ["StreamingLLM", "AsyncStreamingLLM"]
@@ -1,38 +1,113 @@
 import camelot
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
+from .table_prescan import looks_tabular
+from ..utils.config import config
+from ..utils.pdf_document import PDFDocument
 
 import logging
 class TableExtractor:
     """Extract tables from documents and convert to JSON"""
     
-    def extract_tables_from_pdf(self, pdf_path: str) -> List[Dict]:
-        """Extract tables using Camelot"""
+    def __init__(self, engine: str = None, prescan: bool = None, strict: bool = False):
+        self.engine = engine or config.TABLE_ENGINE
+        self.prescan = config.TABLE_PRESCAN if prescan is None else prescan
+        # Raise engine errors instead of logging them and returning the tables found so far
+        self.strict = strict
+    
+    def extract_tables_from_pdf(self, pdf_path: str, document: Optional[PDFDocument] = None) -> List[Dict]:
+        """Extract tables with the configured engine ("camelot" or "pymupdf").
+
+        A cheap PyMuPDF pre-scan picks the pages that look tabular (ruling
+        lines or aligned text columns), and only those pages are handed to
+        the table engine. Pages without a text layer are never candidates.
+        """
         tables = []
+        owns_document = document is None
         
         try:
-            # Extract tables from all pages
-            table_list = camelot.read_pdf(pdf_path, pages='all', flavor='lattice')
+            if owns_document:
+                document = PDFDocument(pdf_path)
+
+            candidate_pages = self.candidate_pages(document)
+            if not candidate_pages:
+                return tables
+
+            if self.engine == "pymupdf":
+                tables = self._extract_with_pymupdf(pdf_path, document, candidate_pages)
+            else:
+                tables = self._extract_with_camelot(pdf_path, candidate_pages)
+        
+        except Exception as e:
+            if self.strict:
+                raise
+            logging.warning(f"Could not extract tables from {pdf_path}: {e}")
+        
+        finally:
+            if owns_document and document is not None:
+                document.close()
+        
+        return tables
+
+    def candidate_pages(self, document: PDFDocument) -> List[int]:
+        """Pages worth running table detection on"""
+        pages = [p for p in document.pages() if document.page_text(p).strip()]
+        if not self.prescan:
+            return pages
+        candidates = [p for p in pages if looks_tabular(document.page(p))]
+        logging.info(f"    Table pre-scan: {len(candidates)} of {len(pages)} text pages look tabular")
+        return candidates
+
+    def _extract_with_camelot(self, pdf_path: str, pages: List[int]) -> List[Dict]:
+        tables = []
+        table_list = camelot.read_pdf(pdf_path, pages=",".join(str(p) for p in pages), flavor='lattice')
+        
+        for i, table in enumerate(table_list):
+            df = table.df
             
-            for i, table in enumerate(table_list):
-                df = table.df
-                
-                # Convert to JSON structure
-                table_json = self._dataframe_to_json(df)
+            # Convert to JSON structure
+            table_json = self._dataframe_to_json(df)
+            
+            tables.append({
+                "type": "table",
+                "content": table_json,
+                "table_index": i + 1,
+                "page": int(table.page),
+                "source": pdf_path,
+                "raw_df": df.to_dict()
+            })
+        
+        return tables
+
+    def _extract_with_pymupdf(self, pdf_path: str, document: PDFDocument, pages: List[int]) -> List[Dict]:
+        """Native PyMuPDF table finder: no rasterization, much faster than camelot lattice"""
+        tables = []
+        
+        for page_num in pages:
+            try:
+                found = document.page(page_num).find_tables()
+            except Exception as e:
+                if self.strict:
+                    raise
+                logging.warning(f"PyMuPDF table detection failed on page {page_num} of {pdf_path}: {e}")
+                continue
+            
+            for table in found.tables:
+                rows = [["" if cell is None else cell for cell in row] for row in table.extract()]
+                if not rows:
+                    continue
+                df = pd.DataFrame(rows)
                 
                 tables.append({
                     "type": "table",
-                    "content": table_json,
-                    "table_index": i + 1,
-                    "page": table.page,
+                    "content": self._dataframe_to_json(df.copy()),
+                    "table_index": len(tables) + 1,
+                    "page": page_num,
                     "source": pdf_path,
                     "raw_df": df.to_dict()
                 })
         
-        except Exception as e:
-            logging.warning(f"Could not extract tables from {pdf_path}: {e}")
-        
         return tables
     
     def _dataframe_to_json(self, df: pd.DataFrame) -> str:
@@ -0,0 +1,122 @@
+from typing import List, Sequence, Tuple
+import logging
+
+from ..utils.config import config
+
+# (fixed coordinate, start, end) of an axis-aligned ruling, in points
+Segment = Tuple[float, float, float]
+
+_TOLERANCE = 2.0  # Points by which rulings may miss each other and still cross
+_MIN_SEGMENT = 4.0  # Shorter strokes are glyph or decoration parts, not rulings
+_MAX_SEGMENTS = 4000  # Vector art beyond this many strokes is not scanned for a grid
+
+
+def looks_tabular(page) -> bool:
+    """Cheap check on a PyMuPDF page: does it carry a ruled grid or aligned text columns?"""
+    horizontal, vertical = ruling_segments(page.get_drawings())
+    if has_ruling_grid(horizontal, vertical):
+        return True
+    return has_text_columns(page.get_text("words"))
+
+
+def ruling_segments(drawings) -> Tuple[List[Segment], List[Segment]]:
+    """Horizontal (y, x0, x1) and vertical (x, y0, y1) strokes from `page.get_drawings()`"""
+    horizontal, vertical = [], []
+    for drawing in drawings:
+        for item in drawing.get("items", []):
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1:
+                    horizontal.append((p1.y, min(p1.x, p2.x), max(p1.x, p2.x)))
+                elif abs(p1.x - p2.x) < 1:
+                    vertical.append((p1.x, min(p1.y, p2.y), max(p1.y, p2.y)))
+            elif item[0] == "re":
+                rect = item[1]
+                # Thin filled rectangles are how many generators draw rules
+                if rect.y1 - rect.y0 < 2:
+                    horizontal.append(((rect.y0 + rect.y1) / 2, rect.x0, rect.x1))
+                elif rect.x1 - rect.x0 < 2:
+                    vertical.append(((rect.x0 + rect.x1) / 2, rect.y0, rect.y1))
+                else:
+                    horizontal += [(rect.y0, rect.x0, rect.x1), (rect.y1, rect.x0, rect.x1)]
+                    vertical += [(rect.x0, rect.y0, rect.y1), (rect.x1, rect.y0, rect.y1)]
+    keep = lambda segments: [s for s in segments if s[2] - s[1] >= _MIN_SEGMENT]
+    return keep(horizontal), keep(vertical)
+
+
+def has_ruling_grid(horizontal: Sequence[Segment], vertical: Sequence[Segment], min_crossings: int = None) -> bool:
+    """True if some horizontal ruling crosses `min_crossings` distinct verticals and vice versa.
+
+    A table with two rows and two columns has inner rulings that each cross
+    three others; a lone rectangle (page border, header band, boxed
+    callout) only ever crosses two.
+    """
+    min_crossings = min_crossings or config.TABLE_MIN_RULINGS
+    if len(horizontal) + len(vertical) > _MAX_SEGMENTS:
+        logging.debug(f"Skipping ruling grid check over {len(horizontal) + len(vertical)} strokes")
+        return False
+
+    def crosses(h: Segment, v: Segment) -> bool:
+        return (h[1] - _TOLERANCE <= v[0] <= h[2] + _TOLERANCE
+                and v[1] - _TOLERANCE <= h[0] <= v[2] + _TOLERANCE)
+
+    def most_crossed(lines: Sequence[Segment], others: Sequence[Segment], is_horizontal: bool) -> int:
+        best = 0
+        for line in lines:
+            positions = {
+                round(other[0] / _TOLERANCE)
+                for other in others
+                if (crosses(line, other) if is_horizontal else crosses(other, line))
+            }
+            best = max(best, len(positions))
+        return best
+
+    return (most_crossed(horizontal, vertical, True) >= min_crossings
+            and most_crossed(vertical, horizontal, False) >= min_crossings)
+
+
+def has_text_columns(words: Sequence[tuple], min_rows: int = None) -> bool:
+    """True if consecutive lines share at least two column starts away from the left margin.
+
+    `words` are `page.get_text("words")` tuples. A column start is a word
+    preceded on its line by a gap wider than the text height, far more than
+    a word space, so justified or ragged prose never has one. Together with
+    the line start that makes three or more aligned columns, and they must
+    repeat over `min_rows` consecutive lines.
+    """
+    min_rows = min_rows or config.TABLE_MIN_ALIGNED_ROWS
+    run: List[float] = []
+    rows = 0
+    for starts in _column_starts(words):
+        shared = [x for x in run if any(abs(x - other) <= _TOLERANCE * 2 for other in starts)]
+        if len(shared) >= 2:
+            run, rows = shared, rows + 1
+        else:
+            run, rows = starts, 1
+        if len(run) >= 2 and rows >= min_rows:
+            return True
+    return False
+
+
+def _column_starts(words: Sequence[tuple]) -> List[List[float]]:
+    """Per text line, top to bottom: x positions of words that follow a wide gap"""
+    by_middle = sorted(words, key=lambda w: (w[1] + w[3]) / 2)
+    lines: List[List[tuple]] = []
+    for word in by_middle:
+        middle, height = (word[1] + word[3]) / 2, word[3] - word[1]
+        if lines and abs(middle - (lines[-1][0][1] + lines[-1][0][3]) / 2) <= height / 2:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+
+    starts = []
+    for line in lines:
+        line.sort(key=lambda w: w[0])
+        starts.append([
+            word[0] for previous, word in zip(line, line[1:])
+            if word[0] - previous[2] > max(word[3] - word[1], previous[3] - previous[1])
+        ])
+    return starts
+
+
+__all__ = ["looks_tabular", "ruling_segments", "has_ruling_grid", "has_text_columns"]
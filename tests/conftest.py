@@ -0,0 +1,27 @@
+"""
+Make the `src` package importable for the tests.
+
+In the project layout the modules live under `src/<package>/` and import
+each other as `src.<package>.<module>` or relatively (`..utils.config`).
+A checkout that keeps the modules flat in the repository root has no `src`
+directory, so there `src` and its subpackages are mapped onto the root.
+"""
+
+from pathlib import Path
+import sys
+import types
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGES = ("api", "embedding", "generation", "ingestion", "retrieval", "ui", "utils")
+
+if (ROOT / "src").is_dir():
+    sys.path.insert(0, str(ROOT))
+elif "src" not in sys.modules:
+    src = types.ModuleType("src")
+    src.__path__ = []
+    sys.modules["src"] = src
+    for name in PACKAGES:
+        package = types.ModuleType(f"src.{name}")
+        package.__path__ = [str(ROOT)]
+        sys.modules[package.__name__] = package
+        setattr(src, name, package)
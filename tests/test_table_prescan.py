@@ -0,0 +1,71 @@
+import random
+from collections import namedtuple
+
+from src.ingestion.table_prescan import looks_tabular
+
+Point = namedtuple("Point", "x y")
+Rect = namedtuple("Rect", "x0 y0 x1 y1")
+
+
+class FakePage:
+    """Just the PyMuPDF page calls the pre-scan makes"""
+
+    def __init__(self, words, drawings=()):
+        self.words = words
+        self.drawings = list(drawings)
+
+    def get_drawings(self):
+        return self.drawings
+
+    def get_text(self, kind):
+        assert kind == "words"
+        return self.words
+
+
+def prose_words(seed, lines=48, left=72.0, right=540.0, height=10.0):
+    """Single-column ragged prose: word spaces only, like ordinary body text"""
+    rng = random.Random(seed)
+    words = []
+    for line in range(lines):
+        y0 = 72.0 + line * height * 1.3
+        x = left
+        for n in range(40):
+            width = rng.uniform(8, 45)
+            if x + width > right:
+                break
+            words.append((x, y0, x + width, y0 + height, "word", 0, line, n))
+            x += width + rng.uniform(2.5, 3.5)
+    return words
+
+
+def table_words(rows=6, columns=(72.0, 200.0, 320.0, 440.0), height=10.0):
+    words = []
+    for row in range(rows):
+        y0 = 300.0 + row * height * 1.5
+        for n, x in enumerate(columns):
+            words.append((x, y0, x + 40, y0 + height, "cell", n, 0, 0))
+    return words
+
+
+def line(x0, y0, x1, y1):
+    return ("l", Point(x0, y0), Point(x1, y1))
+
+
+def test_prose_pages_are_not_tabular():
+    assert not any(looks_tabular(FakePage(prose_words(seed))) for seed in range(200))
+
+
+def test_border_rectangle_is_not_a_table():
+    border = {"items": [("re", Rect(36, 36, 576, 756))]}
+    header_band = {"items": [("re", Rect(36, 36, 576, 80))]}
+    assert not looks_tabular(FakePage(prose_words(0), [border]))
+    assert not looks_tabular(FakePage(prose_words(1), [border, header_band]))
+
+
+def test_ruled_grid_is_tabular():
+    grid = {"items": [line(72, y, 472, y) for y in (300, 320, 340)] + [line(x, 300, x, 340) for x in (72, 272, 472)]}
+    assert looks_tabular(FakePage(prose_words(2), [grid]))
+
+
+def test_aligned_text_columns_are_tabular():
+    assert looks_tabular(FakePage(prose_words(3, lines=10) + table_words()))
@@ -1,27 +1,32 @@
-from typing import List, Dict
-import fitz
+from typing import List, Dict, Optional
+from ..utils.pdf_document import PDFDocument
 
 class TextExtractor:
     """Extract text content from documents"""
     
-    def extract_from_pdf(self, pdf_path: str) -> List[Dict]:
-        """Extract text chunks from PDF with metadata"""
-        doc = fitz.open(pdf_path)
+    def extract_from_pdf(self, pdf_path: str, document: Optional[PDFDocument] = None) -> List[Dict]:
+        """Extract text chunks from PDF with metadata.
+
+        Pass an already open `document` to reuse its parsed pages; otherwise
+        the PDF is opened and closed here.
+        """
+        owns_document = document is None
+        doc = document or PDFDocument(pdf_path)
         chunks = []
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text()
+        for page_num in doc.pages():
+            text = doc.page_text(page_num)
             
             if text.strip():
                 chunks.append({
                     "type": "text",
                     "content": text,
-                    "page": page_num + 1,
+                    "page": page_num,
                     "source": pdf_path
                 })
         
-        doc.close()
+        if owns_document:
+            doc.close()
         return chunks
     
     def extract_paragraphs(self, text: str, page: int, source: str) -> List[Dict]:
@@ -0,0 +1,13 @@
+from typing import Iterable
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def estimate_total_tokens(texts: Iterable[str]) -> int:
+    return sum(estimate_tokens(t) for t in texts)
+
+
+__all__ = ["estimate_tokens", "estimate_total_tokens"]
@@ -0,0 +1,98 @@
+from typing import Any, Dict, List, Optional
+import os
+
+import numpy as np
+from .filters import ChunkFilter
+from ..utils.config import config
+
+
+class BaseVectorBackend:
+    """
+    Storage and nearest-neighbour search for one collection of chunks.
+
+    `VectorStore` handles ids, embeddings and the lexical index; a backend
+    only stores (id, embedding, document, metadata) rows and searches them
+    by cosine distance. Query results use Chroma's nested-list shape so
+    callers don't depend on the backend in use.
+    """
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def query(self, embedding: np.ndarray, n_results: int, chunk_filter: Optional[ChunkFilter] = None) -> Dict[str, Any]:
+        """Nearest rows as {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}"""
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None, offset: int = 0) -> Dict[str, List]:
+        """Rows by id, or a page of all rows, as {"ids": [...], "documents": [...], "metadatas": [...]}"""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class ChromaBackend(BaseVectorBackend):
+    """Chroma `PersistentClient` collection with an HNSW cosine index"""
+
+    def __init__(self, collection_name: str):
+        import chromadb
+
+        self.collection_name = collection_name
+        self.client = chromadb.PersistentClient(path=config.VECTOR_DB_PATH)
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings.tolist(),
+            metadatas=metadatas
+        )
+
+    def query(self, embedding, n_results, chunk_filter=None):
+        return self.collection.query(
+            query_embeddings=[embedding.tolist()],
+            n_results=n_results,
+            where=chunk_filter.to_where() if chunk_filter is not None else None
+        )
+
+    def get(self, ids=None, limit=None, offset=0):
+        if ids is not None:
+            return self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        return self.collection.get(include=["documents", "metadatas"], limit=limit, offset=offset)
+
+    def delete(self, ids):
+        self.collection.delete(ids=list(ids))
+
+    def count(self):
+        return self.collection.count()
+
+    def clear(self):
+        self.client.delete_collection(self.collection_name)
+        self.collection = self.client.create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+
+def make_backend(collection_name: str, kind: Optional[str] = None) -> BaseVectorBackend:
+    """Backend selected by `config.VECTOR_BACKEND`: "chroma" or "local" (memory-mapped IVF)"""
+    kind = kind or config.VECTOR_BACKEND
+    if kind == "local":
+        from .ann_index import LocalANNBackend
+        return LocalANNBackend(os.path.join(config.VECTOR_DB_PATH, f"ann_{collection_name}"))
+    if kind != "chroma":
+        raise ValueError(f"Unknown vector backend: {kind!r} (expected 'chroma' or 'local')")
+    return ChromaBackend(collection_name)
+
+
+__all__ = ["BaseVectorBackend", "ChromaBackend", "make_backend"]
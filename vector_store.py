@@ -1,97 +1,301 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import hashlib
+import os
+from itertools import islice
 import uuid
 from src.utils.config import config
-from openai import OpenAI
+from src.embedding.base_embedder import BaseEmbedder, valid_rows
+from src.embedding.filters import ChunkFilter
+from src.embedding.lexical_index import LexicalIndex
+from src.embedding.vector_backend import BaseVectorBackend, make_backend
+from src.utils.chunk_store import ChunkStore
+from src.utils.micro_batcher import MicroBatcher
+import numpy as np
 import logging
 
 class VectorStore:
-    """Vector store using ChromaDB with Perplexity embeddings"""
+    """Vector store using ChromaDB with Perplexity embeddings.
 
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=config.VECTOR_DB_PATH)
-        self.collection = self.client.get_or_create_collection(
-            name="documents",
-            metadata={"hnsw:space": "cosine"}
+    Storage and ANN search go through a `BaseVectorBackend`: Chroma by
+    default, or the memory-mapped IVF index with
+    `config.VECTOR_BACKEND = "local"`. Each store holds one collection
+    (`config.COLLECTION_NAME` by default). Passing a per-tenant `collection_name` keeps tenants in
+    separate collections, each with its own lexical index and ingest
+    manifest, so a tenant's queries never search other tenants' chunks.
+    Added chunks are also persisted to a `ChunkStore` under
+    `config.PROCESSED_CHUNKS_PATH`, from which `rebuild` re-embeds the
+    collection without re-extracting any document.
+    """
+
+    def __init__(self, collection_name: Optional[str] = None, backend: Optional[BaseVectorBackend] = None):
+        self.collection_name = collection_name or config.COLLECTION_NAME
+        self.backend = backend or make_backend(self.collection_name)
+        self._reopenable = backend is None
+        # Collection version the backend reflects; see refresh()
+        self._loaded_version = self.version
+        # Shared batched/retrying embedding engine (remote API or local model)
+        self.embedder = BaseEmbedder()
+        # Set by enable_query_batching; coalesces concurrent query embeddings
+        self.query_batcher: Optional[MicroBatcher] = None
+        # BM25 inverted index kept in step with the collection, next to the Chroma files
+        self.lexical_index = LexicalIndex(self.side_path("lexical_index.sqlite")) if config.HYBRID_RETRIEVAL else None
+        if self.lexical_index is not None and self.lexical_index.count() == 0 and self.backend.count() > 0:
+            self.rebuild_lexical_index()
+        # Processed chunks on disk, so the collection can be rebuilt without re-extracting
+        self.chunk_store = (
+            ChunkStore(os.path.join(config.PROCESSED_CHUNKS_PATH, self.collection_name))
+            if config.CHUNK_STORE_ENABLED else None
         )
-        # Use Perplexity API client
-        if config.PERPLEXITY_API_KEY and config.PERPLEXITY_API_KEY != "test_key":
-            self.embedding_client = OpenAI(api_key=config.PERPLEXITY_API_KEY, base_url="https://api.perplexity.ai")
-        else:
-            # Set to None if key is missing, allows for testing without real keys
-            self.embedding_client = None
-
-    def add_chunks(self, chunks: List[Dict]) -> None:
-        """Add chunks to vector store"""
+
+    def add_chunks(self, chunks: List[Dict], ids: Optional[List[str]] = None) -> List[Optional[str]]:
+        """Add or update chunks in the vector store.
+
+        Ids are derived from source, page, position on the page and content,
+        so re-ingesting an unchanged document overwrites instead of
+        duplicating. New chunks are persisted to the chunk store, including
+        any whose embedding fails; `ids` is only passed when restoring
+        chunks from it. Chunks are embedded and written
+        `config.INGEST_STREAM_BATCH_CHUNKS` at a time, so only one slice of
+        embeddings is held at once. Returns the id stored for each chunk, or
+        None where the embedding failed and the chunk was not stored.
+        """
         if not chunks:
-            return
-
-        ids = []
-        documents = []
-        metadatas = []
-
-        for chunk in chunks:
-            chunk_id = str(uuid.uuid4())
-            ids.append(chunk_id)
-            documents.append(chunk["content"])
-            # Store all chunk fields except content in metadata
-            metadata = {k: v for k, v in chunk.items() if k != "content"}
-            metadatas.append(metadata)
-
-        # Generate embeddings
-        embeddings = self._get_embeddings(documents)
-
-        # Filter out chunks where embedding failed
-        valid_indices = [i for i, emb in enumerate(embeddings) if emb]
-        if not valid_indices: return
-
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
+            return []
+
+        restoring = ids is not None
+        ids = list(ids) if restoring else chunk_ids(chunks)
+        documents = [chunk["content"] for chunk in chunks]
+        # Store all chunk fields except content in metadata
+        metadatas = [self._metadata_for(chunk) for chunk in chunks]
+        if self.chunk_store is not None and not restoring:
+            self.chunk_store.append(ids, chunks)
+
+        stored: List[Optional[str]] = [None] * len(chunks)
+        step = max(1, config.INGEST_STREAM_BATCH_CHUNKS)
+        for start in range(0, len(chunks), step):
+            # Generate embeddings
+            embeddings = self._get_embeddings(documents[start:start + step])
+
+            # Filter out chunks where embedding failed
+            valid_offsets = np.flatnonzero(valid_rows(embeddings))
+            if not len(valid_offsets):
+                continue
+            valid_indices = (valid_offsets + start).tolist()
+
+            self.backend.upsert(
+                [ids[i] for i in valid_indices],
+                embeddings[valid_offsets],
+                [documents[i] for i in valid_indices],
+                [metadatas[i] for i in valid_indices]
+            )
+            if self.lexical_index is not None:
+                self.lexical_index.add(
+                    [ids[i] for i in valid_indices],
+                    [documents[i] for i in valid_indices],
+                    [metadatas[i] for i in valid_indices]
+                )
+            for i in valid_indices:
+                stored[i] = ids[i]
+
+        if any(chunk_id is not None for chunk_id in stored):
+            self._bump_version()
+        return stored
+
+    def side_path(self, filename: str) -> str:
+        """Path of a file kept next to the Chroma DB for this collection"""
+        if self.collection_name != config.COLLECTION_NAME:
+            stem, ext = os.path.splitext(filename)
+            filename = f"{stem}_{self.collection_name}{ext}"
+        return os.path.join(config.VECTOR_DB_PATH, filename)
+
+    @property
+    def manifest_path(self) -> str:
+        return self.side_path("ingest_manifest.json")
+
+    @property
+    def version(self) -> str:
+        """Token that changes whenever chunks are added, deleted or cleared, from any process"""
+        try:
+            with open(self.side_path("collection_version"), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return "0"
+
+    def _bump_version(self) -> None:
+        path = self.side_path("collection_version")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        token = uuid.uuid4().hex
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+        self._loaded_version = token
+
+    def refresh(self) -> bool:
+        """Reopen the backend if another process (e.g. an ingest worker) changed the collection.
+
+        Backends keep index state in memory, so writes from other processes
+        are only visible after reopening. Returns True if it was reopened.
+        """
+        version = self.version
+        if version == self._loaded_version:
+            return False
+        if self._reopenable:
+            self.backend = make_backend(self.collection_name)
+        self._loaded_version = version
+        return True
+
+    def count(self) -> int:
+        """Number of stored chunks"""
+        return self.backend.count()
+
+    def delete_chunks(self, ids: List[str]) -> None:
+        """Delete chunks by id"""
+        if ids:
+            self.backend.delete(list(ids))
+            if self.lexical_index is not None:
+                self.lexical_index.delete(ids)
+            if self.chunk_store is not None:
+                self.chunk_store.delete(ids)
+            self._bump_version()
 
-    def query(self, query: str, n_results: int = 5) -> Dict[str, Any]:
-        """Query the vector store"""
-        embeddings = self._get_embeddings([query])
-        query_embedding = embeddings[0] if embeddings else None
+    def get_chunks(self, ids: List[str]) -> Dict[str, Dict]:
+        """Stored content and metadata by id; unknown ids are omitted"""
+        if not ids:
+            return {}
+        results = self.backend.get(ids=list(ids))
+        return {
+            chunk_id: {"content": document, "metadata": metadata}
+            for chunk_id, document, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+        }
 
-        # Validate embedding result shape — chromadb expects non-empty numeric vectors
-        if not query_embedding:
+    def lexical_query(self, query: str, n_results: int = 5, chunk_filter: Optional[ChunkFilter] = None) -> List[tuple]:
+        """BM25 ranking as (id, score) pairs, best first"""
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, n_results, chunk_filter)
+
+    def rebuild_lexical_index(self, page_size: int = 1000) -> None:
+        """Re-index every stored chunk, e.g. for a collection built before hybrid retrieval"""
+        total = self.backend.count()
+        logging.info(f"Building lexical index for {total} stored chunks")
+        self.lexical_index.clear()
+        for offset in range(0, total, page_size):
+            page = self.backend.get(limit=page_size, offset=offset)
+            self.lexical_index.add(page["ids"], page["documents"], page["metadatas"])
+
+    @staticmethod
+    def _metadata_for(chunk: Dict) -> Dict:
+        """Backend metadata only holds scalars; drop content and nested fields such as raw_df"""
+        return {
+            k: v for k, v in chunk.items()
+            if k != "content" and isinstance(v, (str, int, float, bool))
+        }
+
+    def query(self, query: str, n_results: int = 5, chunk_filter: Optional[ChunkFilter] = None) -> Dict[str, Any]:
+        """Query the vector store, searching only chunks that match `chunk_filter`"""
+        return self.query_by_embedding(self.embed_query(query), n_results, chunk_filter)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """(1, dim) query embedding; the row is NaN if embedding failed"""
+        if self.query_batcher is not None:
+            return self.query_batcher.submit([query])
+        return self._get_embeddings([query])
+
+    def enable_query_batching(self, max_queries: int = None, max_wait: float = None) -> None:
+        """Embed queries from concurrent `query`/`embed_query` calls in shared requests"""
+        self.query_batcher = MicroBatcher(
+            self._get_embeddings,
+            max_batch=max_queries or config.MICRO_BATCH_MAX_QUERIES,
+            max_wait=max_wait if max_wait is not None else config.MICRO_BATCH_WAIT_MS / 1000,
+            name="query-embedding-batcher"
+        )
+
+    def query_by_embedding(self, embeddings: np.ndarray, n_results: int = 5,
+                           chunk_filter: Optional[ChunkFilter] = None) -> Dict[str, Any]:
+        """Search with an already computed (1, dim) query embedding"""
+        # Validate embedding result shape — backends expect non-empty numeric vectors
+        if not valid_rows(embeddings).any():
             # Return empty-but-shaped response to avoid downstream errors
             return {"ids": [[]], "documents": [[]], "metadatas": [[]]}
 
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results
-            )
+            results = self.backend.query(embeddings[0], n_results, chunk_filter)
         except Exception:
             # On query failure, return empty-shaped response
             return {"ids": [[]], "documents": [[]], "metadatas": [[]]}
 
         return results
 
-    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Get embeddings using the configured client (Perplexity)"""
-        # If test key is set, return mock embeddings to avoid network calls
-        if not self.embedding_client:
-            return [[0.1] * 1536 for _ in texts]
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Get embeddings as an (n, dim) float32 array; rows that failed are NaN"""
+        # If test key is set and no local model is configured, return mock embeddings to avoid network calls
+        if not self.embedder.available:
+            return np.full((len(texts), 1536), 0.1, dtype=np.float32)
 
-        try:
-            response = self.embedding_client.embeddings.create(input=texts, model=config.EMBEDDING_MODEL)
-            return [data.embedding for data in response.data]
-        except Exception as e:
-            # On failure, return empty embeddings of correct length
-            logging.error(f"Error getting embeddings: {e}", exc_info=True)
-            return [[] for _ in texts]
+        return self.embedder.embed_array(texts)
 
     def clear(self) -> None:
         """Clear all documents"""
-        self.client.delete_collection("documents")
-        self.collection = self.client.create_collection(
-            name="documents",
-            metadata={"hnsw:space": "cosine"}
-        )
\ No newline at end of file
+        self.backend.clear()
+        if self.lexical_index is not None:
+            self.lexical_index.clear()
+        if self.chunk_store is not None:
+            self.chunk_store.clear()
+        self._bump_version()
+
+    def rebuild(self) -> Dict[str, int]:
+        """Re-embed the collection from the chunk store, without re-extracting documents.
+
+        Use after switching `config.EMBEDDING_BACKEND` or
+        `config.VECTOR_BACKEND`. Stored vectors and the lexical index are
+        replaced; chunk ids are kept, so the ingest manifest stays valid.
+        Chunks whose embedding fails again are counted as failed.
+        """
+        if self.chunk_store is None:
+            logging.error("Chunk store is disabled (config.CHUNK_STORE_ENABLED); nothing to rebuild from")
+            return {"chunks": 0, "stored": 0, "failed": 0}
+
+        total = self.chunk_store.count()
+        if total < self.count():
+            # Chunks ingested before the chunk store existed can only come back by re-ingesting
+            logging.error(
+                f"Chunk store holds {total} chunks but the collection has {self.count()}; "
+                f"re-ingest the documents instead of rebuilding"
+            )
+            return {"chunks": total, "stored": 0, "failed": 0}
+        logging.info(f"Rebuilding collection '{self.collection_name}' from {total} persisted chunks")
+        self.backend.clear()
+        if self.lexical_index is not None:
+            self.lexical_index.clear()
+
+        stored = 0
+        step = max(1, config.INGEST_STREAM_BATCH_CHUNKS)
+        chunks = self.chunk_store.iter_chunks(("content", "metadata"))
+        while True:
+            batch = list(islice(chunks, step))
+            if not batch:
+                break
+            batch_ids, batch_chunks = zip(*batch)
+            stored += sum(chunk_id is not None for chunk_id in self.add_chunks(list(batch_chunks), ids=list(batch_ids)))
+        self._bump_version()
+        if stored < total:
+            logging.warning(f"{total - stored} chunks could not be embedded during the rebuild")
+        return {"chunks": total, "stored": stored, "failed": total - stored}
+
+
+def chunk_ids(chunks: List[Dict]) -> List[str]:
+    """Ids for chunks stored together; positions count per (source, page) within `chunks`"""
+    ids = []
+    ordinals = {}
+    for chunk in chunks:
+        page_key = (chunk.get("source"), chunk.get("page"))
+        ordinals[page_key] = ordinals.get(page_key, -1) + 1
+        ids.append(make_chunk_id(chunk, ordinals[page_key]))
+    return ids
+
+
+def make_chunk_id(chunk: Dict, ordinal: int) -> str:
+    """Deterministic id from source, page, position on the page and content hash"""
+    content_hash = hashlib.sha256(chunk["content"].encode("utf-8")).hexdigest()
+    key = f"{chunk.get('source')}|{chunk.get('page')}|{ordinal}|{content_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
\ No newline at end of file